@@ -61,6 +61,8 @@ LOCAL_APPS = [
     "itou.job_applications",
     "itou.approvals",
     "itou.eligibility",
+    "itou.stats",
+    "itou.emails",
     # www.
     "itou.www.apply",
     "itou.www.autocomplete",
@@ -102,7 +104,15 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Session.
 # ------------------------------------------------------------------------------
 
-SESSION_SAVE_EVERY_REQUEST = True
+# Sessions are saved only when their data change, their expiry date is refreshed
+# at most every `ITOU_SESSION_REFRESH_INTERVAL` seconds (see `itou.utils.sessions`).
+# Use `itou.utils.sessions.cached_db` to read sessions from a shared cache
+# (requires `CACHES` to be configured).
+SESSION_ENGINE = os.environ.get("SESSION_ENGINE", "itou.utils.sessions.db")
+
+SESSION_SAVE_EVERY_REQUEST = False
+
+ITOU_SESSION_REFRESH_INTERVAL = 60 * 60
 
 # Templates.
 # ------------------------------------------------------------------------------
@@ -234,7 +244,11 @@ LOGGING = {
 # https://anymail.readthedocs.io/en/stable/esps/mailjet/
 # ------------------------------------------------------------------------------
 
-EMAIL_BACKEND = "anymail.backends.mailjet.EmailBackend"
+# Emails are stored in an outbox table within the current transaction and
+# sent by the `send_outbox_emails` management command.
+EMAIL_BACKEND = "itou.emails.backends.OutboxEmailBackend"
+
+OUTBOX_EMAIL_BACKEND = "anymail.backends.mailjet.EmailBackend"
 
 ANYMAIL = {
     "MAILJET_API_KEY": os.environ["API_MAILJET_KEY"],
@@ -282,6 +296,8 @@ BOOTSTRAP4 = {
 # Base Adresse Nationale (BAN).
 # https://adresse.data.gouv.fr/faq
 API_BAN_BASE_URL = "https://api-adresse.data.gouv.fr"
+# Path of a SQLite file used to cache geocoding results (e.g. between imports).
+API_BAN_CACHE_FILE = os.environ.get("API_BAN_CACHE_FILE")
 
 # https://api.gouv.fr/api/api-geo.html#doc_tech
 API_GEO_BASE_URL = "https://geo.api.gouv.fr"
@@ -321,6 +337,12 @@ ITOU_SESSION_CURRENT_PRESCRIBER_ORG_KEY = "current_prescriber_organization"
 ITOU_SESSION_CURRENT_SIAE_KEY = "current_siae"
 ITOU_SESSION_JOB_APPLICATION_KEY = "job_application"
 
+# Search appellations in an in-memory prefix index instead of PostgreSQL
+# full text search (no stemming, see `itou.jobs.index`).
+ITOU_APPELLATIONS_IN_MEMORY_INDEX = (
+    os.environ.get("ITOU_APPELLATIONS_IN_MEMORY_INDEX", "False") == "True"
+)
+
 # Some external libraries, as PDF Shift, need access to static files
 # but they can't access them when working locally.
 # Use the staging domain name when this case arises.
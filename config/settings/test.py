@@ -7,6 +7,7 @@ STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
 
 # Prevent calls to external APIs.
 API_BAN_BASE_URL = None
+API_BAN_CACHE_FILE = None
 API_INSEE_KEY = None
 API_INSEE_SECRET = None
 API_EMPLOI_STORE_KEY = None
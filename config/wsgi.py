@@ -14,3 +14,21 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.prod")
 
 application = get_wsgi_application()
+
+# Build in-memory indexes before uWSGI forks its workers (unless `lazy-apps`
+# is enabled) so that workers don't build them on their first request.
+from django.conf import settings  # noqa
+from django.db import DatabaseError, connections  # noqa
+
+from itou.cities.index import get_cities_index  # noqa
+from itou.jobs.index import get_appellations_index  # noqa
+
+try:
+    get_cities_index()
+    if settings.ITOU_APPELLATIONS_IN_MEMORY_INDEX:
+        get_appellations_index()
+except DatabaseError:
+    # E.g. migrations not applied yet: indexes are built on first use.
+    pass
+# Forked workers must not share the database connection.
+connections.close_all()
@@ -72,6 +72,7 @@ class ApprovalAdmin(admin.ModelAdmin):
         if not obj.pk:
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+        models.Approval.sync_number_sequence(obj.number)
 
     def is_valid(self, obj):
         return obj.is_valid
@@ -116,7 +117,8 @@ class PoleEmploiApprovalAdmin(admin.ModelAdmin):
         "last_name",
         "birth_name",
     )
-    list_filter = (IsValidFilter,)
+    list_filter = (IsValidFilter, "import_source")
+    readonly_fields = ("import_source", "import_fingerprint")
     date_hierarchy = "start_at"
 
     def is_valid(self, obj):
@@ -124,3 +126,27 @@ class PoleEmploiApprovalAdmin(admin.ModelAdmin):
 
     is_valid.boolean = True
     is_valid.short_description = _("En cours de validité")
+
+
+@admin.register(models.PoleEmploiApprovalImport)
+class PoleEmploiApprovalImportAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "file_name",
+        "import_source",
+        "is_delta",
+        "started_at",
+        "finished_at",
+        "rows_count",
+        "created_count",
+        "updated_count",
+        "deleted_count",
+    )
+    list_filter = ("import_source", "is_delta")
+    date_hierarchy = "started_at"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -9,7 +9,7 @@ from django.shortcuts import render
 from django.urls import reverse
 from django.utils.translation import gettext as _
 
-from itou.approvals.models import Approval
+from itou.approvals.models import Approval, PoleEmploiApproval
 from itou.approvals.admin_forms import ManuallyAddApprovalForm
 from itou.job_applications.models import JobApplication, JobApplicationWorkflow
 
@@ -53,14 +53,17 @@ def manually_add_approval(
     initial = {
         "start_at": job_application.hiring_start_at,
         "end_at": Approval.get_default_end_date(job_application.hiring_start_at),
-        "number": Approval.get_next_number(job_application.hiring_start_at),
         "user": job_application.job_seeker.pk,
         "created_by": request.user.pk,
     }
+    if request.method != "POST":
+        # Only a preview: the number is reserved once the form is submitted.
+        initial["number"] = Approval.get_next_number(job_application.hiring_start_at)
     form = ManuallyAddApprovalForm(initial=initial, data=request.POST or None)
 
     if request.method == "POST" and form.is_valid():
         approval = form.save()
+        Approval.sync_number_sequence(approval.number)
         job_application.approval = approval
         job_application.save()
         job_application.send_approval_number_by_email_manually(deliverer=request.user)
@@ -86,6 +89,9 @@ def manually_add_approval(
         "form": form,
         "job_application": job_application,
         "opts": opts,
+        "pe_approvals": PoleEmploiApproval.objects.find_for_name(
+            job_application.job_seeker
+        ),
         "title": _("Ajout manuel d'un numéro d'agrément"),
         **admin_site.each_context(request),
     }
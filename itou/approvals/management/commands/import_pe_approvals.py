@@ -1,12 +1,19 @@
+import csv
 import datetime
+import hashlib
+import io
 import logging
 import os
+import re
+from functools import lru_cache
 
 import openpyxl
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
 
-from itou.approvals.models import PoleEmploiApproval
+from itou.approvals.models import PoleEmploiApproval, PoleEmploiApprovalImport
 
 
 CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -14,22 +21,273 @@ CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
 # The content of `{CURRENT_DIR}/data/` must be git ignored.
 XLSX_FILE_PATH = f"{CURRENT_DIR}/data"
 
+# Columns loaded with `COPY`, in this order.
+COPY_COLUMNS = (
+    "pe_structure_code",
+    "pole_emploi_id",
+    "number",
+    "first_name",
+    "last_name",
+    "birth_name",
+    "birthdate",
+    "start_at",
+    "end_at",
+    "first_name_normalized",
+    "last_name_normalized",
+    "birth_name_normalized",
+)
+
+# Columns of the staging table: `import_fingerprint` is computed while streaming.
+STAGING_COLUMNS = COPY_COLUMNS + ("import_fingerprint",)
+
+STAGING_TABLE = "pe_approvals_staging"
+
+# In CSV format, `COPY` reads unquoted empty values as NULL: text columns
+# must keep them as empty strings (e.g. the birth name is often missing).
+NOT_NULL_COLUMNS = tuple(
+    column
+    for column in STAGING_COLUMNS
+    if column not in ("birthdate", "start_at", "end_at")
+)
+
+
+def get_fingerprint(row):
+    """
+    A hash of the imported values of an approval, used to detect changes
+    between two imports of the same source.
+    """
+    return hashlib.md5("|".join(str(value) for value in row).encode()).hexdigest()
+
+
+class CsvStream(io.TextIOBase):
+    """
+    A read-only file-like object that renders rows as CSV lazily,
+    so that `COPY` can consume an iterator in constant memory.
+    """
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ""
+        self.line = io.StringIO()
+        self.writer = csv.writer(self.line)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                row = next(self.rows)
+            except StopIteration:
+                break
+            self.writer.writerow(row)
+            self.buffer += self.line.getvalue()
+            self.line.seek(0)
+            self.line.truncate()
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+def iter_file_rows(file_path):
+    """
+    Yield tuples of raw values from a XLSX or a CSV file, header excluded.
+    """
+    if file_path.lower().endswith(".csv"):
+        with open(file_path, newline="", encoding="utf-8-sig") as f:
+            dialect = csv.Sniffer().sniff(f.readline(), delimiters=",;\t")
+            f.seek(0)
+            reader = csv.reader(f, dialect)
+            next(reader, None)
+            for row in reader:
+                yield tuple(row)
+        return
+
+    # https://openpyxl.readthedocs.io/en/latest/optimized.html#read-only-mode
+    wb = openpyxl.load_workbook(file_path, read_only=True)
+    ws = wb.active
+    rows = ws.iter_rows(values_only=True)
+    next(rows, None)
+    yield from rows
+    wb.close()
+
+
+# Reasons why a row is not imported.
+SKIPPED_EMPTY = "empty"
+SKIPPED_INVALID_STRUCTURE_CODE = "invalid_structure_code"
+SKIPPED_INVALID_POLE_EMPLOI_ID = "invalid_pole_emploi_id"
+SKIPPED_INVALID_NAME = "invalid_name"
+SKIPPED_INVALID_NUMBER = "invalid_number"
+SKIPPED_INVALID_DATE = "invalid_date"
+SKIPPED_CANCELED = "canceled"
+
+# Number of rows validated at once, column by column.
+PARSE_CHUNK_SIZE = 10000
+
+# Number of columns of the file.
+ROW_LENGTH = 10
+
+DATE_FORMAT = "%d/%m/%y"
+
+# `CODE_STRUCT_AFFECT_BENE`: 4 or 5 chars.
+STRUCTURE_CODE_REGEX = re.compile(r"\S{4,5}")
+# `ID_REGIONAL_BENE`, known as "Identifiant Pôle emploi":
+# 7 digits followed by an alphanumeric char.
+POLE_EMPLOI_ID_REGEX = re.compile(r"[0-9]{7}[^\W_]")
+# `NUM_AGR_DEC`: PE sometimes adds a 3 chars suffix to a 12 chars number.
+NUMBER_REGEX = re.compile(r"\S{12}(\S{3})?")
+# Names must not contain consecutive spaces.
+NAME_REGEX = re.compile(r"(?!.*  ).*")
+
+
+@lru_cache(maxsize=None)
+def parse_date(value):
+    """
+    Files contain a few thousand distinct dates at most: each of them
+    is parsed only once per process.
+    """
+    try:
+        return datetime.datetime.strptime(value, DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def clean_column(values):
+    return [str(value).strip() if value is not None else "" for value in values]
+
+
+def parse_chunk(first_line, rows):
+    """
+    Validate a list of raw rows column by column.
+
+    Returns a `(rows count, approvals, skipped rows)` tuple:
+    - approvals are tuples of values in `COPY_COLUMNS` order
+    - skipped rows are `(line number, reason, raw row)` tuples
+    """
+    approvals = []
+    skipped_rows = []
+
+    lines = []
+    rows_to_parse = []
+    for line, row in enumerate(rows, start=first_line):
+        if not row or len(row) < ROW_LENGTH or not row[0]:
+            # It should only concern the last XLSX line.
+            skipped_rows.append((line, SKIPPED_EMPTY, row))
+        else:
+            lines.append(line)
+            rows_to_parse.append(row)
+    if not rows_to_parse:
+        return len(rows), approvals, skipped_rows
+
+    columns = list(zip(*rows_to_parse))
+    pole_emploi_ids = clean_column(columns[0])
+    last_names = clean_column(columns[2])
+    birth_names = clean_column(columns[3])
+    first_names = clean_column(columns[4])
+    structure_codes = clean_column(columns[6])
+    numbers = [number.replace(" ", "") for number in clean_column(columns[7])]
+    birthdates = [parse_date(value) for value in clean_column(columns[5])]
+    start_dates = [parse_date(value) for value in clean_column(columns[8])]
+    end_dates = [parse_date(value) for value in clean_column(columns[9])]
+
+    # The first failed check of each row gives the reason why it's skipped.
+    reasons = [None] * len(rows_to_parse)
+    checks = [
+        (
+            structure_codes,
+            STRUCTURE_CODE_REGEX.fullmatch,
+            SKIPPED_INVALID_STRUCTURE_CODE,
+        ),
+        (
+            pole_emploi_ids,
+            POLE_EMPLOI_ID_REGEX.fullmatch,
+            SKIPPED_INVALID_POLE_EMPLOI_ID,
+        ),
+        (last_names, NAME_REGEX.fullmatch, SKIPPED_INVALID_NAME),
+        (first_names, NAME_REGEX.fullmatch, SKIPPED_INVALID_NAME),
+        (birth_names, NAME_REGEX.fullmatch, SKIPPED_INVALID_NAME),
+        (numbers, NUMBER_REGEX.fullmatch, SKIPPED_INVALID_NUMBER),
+        (start_dates, bool, SKIPPED_INVALID_DATE),
+        (end_dates, bool, SKIPPED_INVALID_DATE),
+        (birthdates, bool, SKIPPED_INVALID_DATE),
+    ]
+    for values, is_valid, reason in checks:
+        for i, value in enumerate(values):
+            if reasons[i] is None and not is_valid(value):
+                reasons[i] = reason
+
+    for i, reason in enumerate(reasons):
+        # Same start and end dates means that the approval has been canceled.
+        if reason is None and start_dates[i] == end_dates[i]:
+            reason = SKIPPED_CANCELED
+        if reason:
+            skipped_rows.append((lines[i], reason, rows_to_parse[i]))
+            continue
+        approvals.append(
+            (
+                structure_codes[i],
+                pole_emploi_ids[i],
+                numbers[i],
+                first_names[i],
+                last_names[i],
+                birth_names[i],
+                birthdates[i],
+                start_dates[i],
+                end_dates[i],
+                PoleEmploiApproval.format_name_as_pole_emploi(first_names[i]),
+                PoleEmploiApproval.format_name_as_pole_emploi(last_names[i]),
+                PoleEmploiApproval.format_name_as_pole_emploi(birth_names[i]),
+            )
+        )
+
+    skipped_rows.sort(key=lambda skipped_row: skipped_row[0])
+    return len(rows), approvals, skipped_rows
+
+
+def iter_chunks(rows, chunk_size):
+    """
+    Yield `(first line number, rows)` tuples, the header being line 1.
+    """
+    chunk = []
+    first_line = 2
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield first_line, chunk
+            first_line += len(chunk)
+            chunk = []
+    if chunk:
+        yield first_line, chunk
+
 
 class Command(BaseCommand):
     """
     Import Pole emploi's approvals (or `agrément` in French) into the database.
 
+    Both XLSX and CSV files (with the same columns) are accepted.
+    Rows are streamed to PostgreSQL with `COPY` into a staging table
+    and then merged on `number`: existing approvals are left untouched.
+
+    With `--delta`, the file is considered as the full current state of a
+    given `--source` (e.g. a region): approvals of this source that are no
+    longer in the file are deleted and approvals whose values changed since
+    the previous import (based on `import_fingerprint`) are updated.
+    A summary of each run is stored in `PoleEmploiApprovalImport`.
+
     To debug:
         django-admin import_pe_approvals --file-name=2020_02_12_base_agrements_aura.xlsx --dry-run
         django-admin import_pe_approvals --file-name=2020_02_12_base_agrements_aura.xlsx --dry-run --verbosity=2
 
     To populate the database:
         django-admin import_pe_approvals --file-name=2020_02_12_base_agrements_aura.xlsx
+        django-admin import_pe_approvals --file-name=2020_02_12_base_agrements_aura.csv
+
+    To apply only the changes since the previous import of the same source:
+        django-admin import_pe_approvals --file-name=2020_03_12_base_agrements_aura.xlsx --delta --source=aura
     """
 
-    help = (
-        "Import the content of the Pole emploi's approvals xlsx file into the database."
-    )
+    help = "Import the content of the Pole emploi's approvals xlsx or csv file into the database."
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -37,7 +295,7 @@ class Command(BaseCommand):
             dest="file_name",
             required=True,
             action="store",
-            help=f"Name of the XLSX file to import (must be located in {XLSX_FILE_PATH})",
+            help=f"Name of the XLSX or CSV file to import (must be located in {XLSX_FILE_PATH})",
         )
         parser.add_argument(
             "--dry-run",
@@ -45,6 +303,28 @@ class Command(BaseCommand):
             action="store_true",
             help="Only print data to import",
         )
+        parser.add_argument(
+            "--source",
+            dest="source",
+            default="",
+            action="store",
+            help="Name of the source of the file, e.g. a region (required with --delta)",
+        )
+        parser.add_argument(
+            "--delta",
+            dest="delta",
+            action="store_true",
+            help="Also update changed approvals and delete removed approvals of --source",
+        )
+        parser.add_argument(
+            "--rejected-rows-file-name",
+            dest="rejected_rows_file_name",
+            action="store",
+            help=(
+                f"Name of the CSV report of rejected rows (created in {XLSX_FILE_PATH}), "
+                "defaults to `<file name>_rejected.csv`"
+            ),
+        )
 
     def set_logger(self, verbosity):
         """
@@ -60,143 +340,199 @@ class Command(BaseCommand):
         if verbosity > 1:
             self.logger.setLevel(logging.DEBUG)
 
-    def handle(self, file_name, dry_run=False, **options):
+    def parse_rows(self, rows):
+        """
+        Validate raw rows and yield tuples of values in `COPY_COLUMNS` order.
+
+        Reading a XLSX file with openpyxl takes about 95% of the parsing time
+        and can't be split: a sheet is a zipped XML stream that can't be read
+        from the middle. Validation is therefore not worth a process pool.
+        """
+        results = (parse_chunk(*chunk) for chunk in iter_chunks(rows, PARSE_CHUNK_SIZE))
+
+        count_rows = 0
+        for chunk_size, approvals, skipped_rows in results:
+
+            previous_count_rows = count_rows
+            count_rows += chunk_size
+            if count_rows // 100000 > previous_count_rows // 100000:
+                self.stdout.write(f"Creating approvals… {count_rows} rows read")
+
+            for line, reason, row in skipped_rows:
+                self.report_skipped_row(line, reason, row)
+
+            for approval in approvals:
+                number = approval[2]
+                # Keep track of unique suffixes added by PE at the end of a 12 chars number
+                # that increases the length to 15 chars.
+                if len(number) > 12:
+                    suffix = number[12:]
+                    self.unique_approval_suffixes[suffix] = (
+                        self.unique_approval_suffixes.get(suffix, 0) + 1
+                    )
+                self.count_approvals += 1
+                yield approval
+
+    def report_skipped_row(self, line, reason, row):
+        """
+        Canceled approvals are expected, other skipped rows are written
+        to the rejected rows report.
+        """
+        if reason == SKIPPED_CANCELED:
+            self.count_canceled_approvals += 1
+            self.logger.debug("-" * 80)
+            self.logger.debug("Canceled approval found, skipping…")
+            self.logger.debug("%s - %s - %s", row[7], row[2], row[4])
+            return
+        self.count_invalid_approvals += 1
+        self.rejected_rows_writer.writerow([line, reason, *(row or [])])
+
+    def copy_to_staging_table(self, cursor, approvals):
+        """
+        Stream approvals into a temporary table dropped at the end of the transaction.
+        """
+        columns = ", ".join(STAGING_COLUMNS)
+        # Same column types, without any constraint nor index.
+        cursor.execute(
+            f"""
+            CREATE TEMPORARY TABLE {STAGING_TABLE} ON COMMIT DROP AS
+            SELECT {columns} FROM {PoleEmploiApproval._meta.db_table} WITH NO DATA
+            """
+        )
+        not_null_columns = ", ".join(NOT_NULL_COLUMNS)
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} ({columns}) FROM STDIN "
+            f"WITH (FORMAT csv, FORCE_NOT_NULL ({not_null_columns}))",
+            CsvStream((*row, get_fingerprint(row)) for row in approvals),
+        )
+        cursor.execute(f"CREATE INDEX ON {STAGING_TABLE} (number)")
+        cursor.execute(f"ANALYZE {STAGING_TABLE}")
+
+    def merge_staging_table(self, cursor, source):
+        """
+        Insert new approvals, those whose `number` already exists are ignored.
+        Returns the number of inserted rows.
+        """
+        columns = ", ".join(STAGING_COLUMNS)
+        cursor.execute(
+            f"""
+            INSERT INTO {PoleEmploiApproval._meta.db_table} ({columns}, import_source, created_at)
+            SELECT {columns}, %s, NOW() FROM {STAGING_TABLE}
+            ON CONFLICT (number) DO NOTHING
+            """,
+            [source],
+        )
+        return cursor.rowcount
+
+    def delete_removed_approvals(self, cursor, source):
+        """
+        Delete approvals of `source` which are no longer in the file.
+        Returns the number of deleted rows.
+        """
+        cursor.execute(
+            f"""
+            DELETE FROM {PoleEmploiApproval._meta.db_table} AS approval
+            WHERE approval.import_source = %s
+            AND NOT EXISTS (
+                SELECT 1 FROM {STAGING_TABLE} AS staging
+                WHERE staging.number = approval.number
+            )
+            """,
+            [source],
+        )
+        return cursor.rowcount
+
+    def update_changed_approvals(self, cursor, source):
+        """
+        Update approvals of `source` whose fingerprint changed.
+
+        Approvals imported without any source (i.e. before delta imports
+        existed) are claimed by `source` so that their removal is detected
+        next time.
+
+        Returns the number of updated rows.
+        """
+        assignments = ", ".join(
+            f"{column} = staging.{column}" for column in STAGING_COLUMNS
+        )
+        cursor.execute(
+            f"""
+            UPDATE {PoleEmploiApproval._meta.db_table} AS approval
+            SET {assignments}, import_source = %s
+            FROM (
+                SELECT DISTINCT ON (number) * FROM {STAGING_TABLE} ORDER BY number
+            ) AS staging
+            WHERE approval.number = staging.number
+            AND approval.import_source IN (%s, '')
+            AND (
+                approval.import_source <> %s
+                OR approval.import_fingerprint <> staging.import_fingerprint
+            )
+            """,
+            [source, source, source],
+        )
+        return cursor.rowcount
+
+    def handle(
+        self,
+        file_name,
+        dry_run=False,
+        source="",
+        delta=False,
+        rejected_rows_file_name=None,
+        **options,
+    ):
+
+        if delta and not source:
+            raise CommandError("--source is required with --delta.")
 
         self.set_logger(options.get("verbosity"))
 
+        self.count_approvals = 0
+        self.count_canceled_approvals = 0
+        self.count_invalid_approvals = 0
+        self.unique_approval_suffixes = {}
+        summary = PoleEmploiApprovalImport(
+            file_name=file_name, import_source=source, is_delta=delta
+        )
+
         count_before = PoleEmploiApproval.objects.count()
-        count_canceled_approvals = 0
-        unique_approval_suffixes = {}
 
-        XLSX_FILE = f"{XLSX_FILE_PATH}/{file_name}"
-        file_size_in_bytes = os.path.getsize(XLSX_FILE)
+        FILE = f"{XLSX_FILE_PATH}/{file_name}"
+        file_size_in_bytes = os.path.getsize(FILE)
         self.stdout.write(
             f"Opening a {file_size_in_bytes >> 20} MB file… (this will take some time)"
         )
 
-        bulk_create_queue = []
-        chunk_size = 5000
-
-        # https://openpyxl.readthedocs.io/en/latest/optimized.html#read-only-mode
-        wb = openpyxl.load_workbook(XLSX_FILE, read_only=True)
-        ws = wb.active
-
-        self.stdout.write(f"Ready.")
-        self.stdout.write(f"Creating approvals… 0%")
-
-        last_progress = 0
-        for i, row in enumerate(ws.rows):
-
-            if i == 0:
-                # Skip XLSX header.
-                continue
-
-            if not row[0].value:
-                # It should only concern the last XLSX line.
-                self.stderr.write("EmptyCell found, skipping…")
-                self.stderr.write(str(row))
-                continue
-
-            progress = int((100 * i) / ws.max_row)
-            if progress > last_progress + 5:
-                self.stdout.write(f"Creating approvals… {progress}%")
-                last_progress = progress
-
-            CODE_STRUCT_AFFECT_BENE = str(row[6].value)
-            assert len(CODE_STRUCT_AFFECT_BENE) in [4, 5]
-
-            # This is known as "Identifiant Pôle emploi".
-            ID_REGIONAL_BENE = row[0].value.strip()
-            assert len(ID_REGIONAL_BENE) == 8
-            # Check the format of ID_REGIONAL_BENE.
-            # First 7 chars should be digits.
-            assert ID_REGIONAL_BENE[:7].isdigit()
-            # Last char should be alphanumeric.
-            assert ID_REGIONAL_BENE[7:].isalnum()
-
-            NOM_USAGE_BENE = row[2].value.strip()
-            assert "  " not in NOM_USAGE_BENE
-            # max length 29
-
-            PRENOM_BENE = row[4].value.strip()
-            assert "  " not in PRENOM_BENE
-            # max length 13
-
-            NOM_NAISS_BENE = row[3].value.strip()
-            assert "  " not in NOM_NAISS_BENE
-            # max length 25
-
-            NUM_AGR_DEC = row[7].value.strip().replace(" ", "")
-            assert " " not in NUM_AGR_DEC
-            if len(NUM_AGR_DEC) not in [12, 15]:
-                self.stderr.write("-" * 80)
-                self.stderr.write("Invalid number, skipping…")
-                self.stderr.write(CODE_STRUCT_AFFECT_BENE)
-                self.stderr.write(ID_REGIONAL_BENE)
-                self.stderr.write(NOM_USAGE_BENE)
-                self.stderr.write(PRENOM_BENE)
-                self.stderr.write(NOM_NAISS_BENE)
-                self.stderr.write(NUM_AGR_DEC)
-                continue
-
-            # Keep track of unique suffixes added by PE at the end of a 12 chars number
-            # that increases the length to 15 chars.
-            if len(NUM_AGR_DEC) > 12:
-                suffix = NUM_AGR_DEC[12:]
-                unique_approval_suffixes[suffix] = (
-                    unique_approval_suffixes.get(suffix, 0) + 1
-                )
-
-            DATE_DEB_AGR_DEC = datetime.datetime.strptime(
-                row[8].value.strip(), "%d/%m/%y"
-            ).date()
-
-            DATE_FIN_AGR_DEC = datetime.datetime.strptime(
-                row[9].value.strip(), "%d/%m/%y"
-            ).date()
-
-            # Same start and end dates means that the approval has been canceled.
-            if DATE_DEB_AGR_DEC == DATE_FIN_AGR_DEC:
-                count_canceled_approvals += 1
-                self.logger.debug("-" * 80)
-                self.logger.debug("Canceled approval found, skipping…")
-                self.logger.debug(
-                    "%s - %s - %s", NUM_AGR_DEC, NOM_USAGE_BENE, PRENOM_BENE
-                )
-                continue
-
-            DATE_NAISS_BENE = datetime.datetime.strptime(
-                row[5].value.strip(), "%d/%m/%y"
-            ).date()
-
-            if not dry_run:
-                pe_approval = PoleEmploiApproval()
-                pe_approval.pe_structure_code = CODE_STRUCT_AFFECT_BENE
-                pe_approval.pole_emploi_id = ID_REGIONAL_BENE
-                pe_approval.number = NUM_AGR_DEC
-                pe_approval.first_name = PRENOM_BENE
-                pe_approval.last_name = NOM_USAGE_BENE
-                pe_approval.birth_name = NOM_NAISS_BENE
-                pe_approval.birthdate = DATE_NAISS_BENE
-                pe_approval.start_at = DATE_DEB_AGR_DEC
-                pe_approval.end_at = DATE_FIN_AGR_DEC
-                bulk_create_queue.append(pe_approval)
-                if len(bulk_create_queue) > chunk_size:
-                    # Setting the ignore_conflicts parameter to True tells the
-                    # database to ignore failure to insert any rows that fail
-                    # constraints such as duplicate unique values.
-                    # This allows us to update the database when a new source
-                    # file is available.
-                    PoleEmploiApproval.objects.bulk_create(
-                        bulk_create_queue, ignore_conflicts=True
+        if not rejected_rows_file_name:
+            rejected_rows_file_name = f"{os.path.splitext(file_name)[0]}_rejected.csv"
+        REJECTED_ROWS_FILE = f"{XLSX_FILE_PATH}/{rejected_rows_file_name}"
+        rejected_rows_file = open(REJECTED_ROWS_FILE, "w", newline="")
+        self.rejected_rows_writer = csv.writer(rejected_rows_file, delimiter=";")
+        self.rejected_rows_writer.writerow(["line", "reason"])
+
+        approvals = self.parse_rows(iter_file_rows(FILE))
+
+        if dry_run:
+            with rejected_rows_file:
+                for _ in approvals:
+                    pass
+        else:
+            with rejected_rows_file, transaction.atomic(), connection.cursor() as cursor:
+                self.copy_to_staging_table(cursor, approvals)
+                if delta:
+                    summary.deleted_count = self.delete_removed_approvals(
+                        cursor, source
                     )
-                    bulk_create_queue = []
-
-        # Create any remaining objects.
-        if not dry_run and bulk_create_queue:
-            PoleEmploiApproval.objects.bulk_create(
-                bulk_create_queue, ignore_conflicts=True
-            )
+                    summary.updated_count = self.update_changed_approvals(
+                        cursor, source
+                    )
+                summary.created_count = self.merge_staging_table(cursor, source)
+                summary.rows_count = self.count_approvals
+                summary.canceled_count = self.count_canceled_approvals
+                summary.invalid_count = self.count_invalid_approvals
+                summary.finished_at = timezone.now()
+                summary.save()
 
         count_after = PoleEmploiApproval.objects.count()
 
@@ -204,6 +540,13 @@ class Command(BaseCommand):
         self.stdout.write(f"Before: {count_before}")
         self.stdout.write(f"After: {count_after}")
         self.stdout.write(f"New ojects: {count_after - count_before}")
-        self.stdout.write(f"Skipped {count_canceled_approvals} canceled approvals")
-        self.stdout.write(f"Unique suffixes: {unique_approval_suffixes}")
+        if delta:
+            self.stdout.write(f"Created: {summary.created_count}")
+            self.stdout.write(f"Updated: {summary.updated_count}")
+            self.stdout.write(f"Deleted: {summary.deleted_count}")
+        self.stdout.write(f"Skipped {self.count_canceled_approvals} canceled approvals")
+        self.stdout.write(
+            f"Skipped {self.count_invalid_approvals} invalid rows, see {REJECTED_ROWS_FILE}"
+        )
+        self.stdout.write(f"Unique suffixes: {self.unique_approval_suffixes}")
         self.stdout.write("Done.")
@@ -0,0 +1,109 @@
+# Generated by Django 2.2.10 on 2020-03-02 10:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("approvals", "0009_auto_20200222_1128")]
+
+    operations = [
+        migrations.CreateModel(
+            name="PoleEmploiApprovalImport",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("file_name", models.CharField(max_length=255, verbose_name="Fichier")),
+                (
+                    "import_source",
+                    models.CharField(
+                        blank=True, max_length=50, verbose_name="Source de l'import"
+                    ),
+                ),
+                (
+                    "is_delta",
+                    models.BooleanField(
+                        default=False, verbose_name="Import différentiel"
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Date de début"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Date de fin"
+                    ),
+                ),
+                (
+                    "rows_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Lignes valides"
+                    ),
+                ),
+                (
+                    "canceled_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Agréments annulés ignorés"
+                    ),
+                ),
+                (
+                    "invalid_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Lignes invalides ignorées"
+                    ),
+                ),
+                (
+                    "created_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Agréments créés"
+                    ),
+                ),
+                (
+                    "updated_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Agréments modifiés"
+                    ),
+                ),
+                (
+                    "deleted_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Agréments supprimés"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Import d'agréments Pôle emploi",
+                "verbose_name_plural": "Imports d'agréments Pôle emploi",
+                "ordering": ["-started_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="poleemploiapproval",
+            name="import_fingerprint",
+            field=models.CharField(
+                blank=True, max_length=32, verbose_name="Empreinte de l'import"
+            ),
+        ),
+        migrations.AddField(
+            model_name="poleemploiapproval",
+            name="import_source",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                max_length=50,
+                verbose_name="Source de l'import",
+            ),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 2.2.10 on 2020-03-04 09:31
+
+from unidecode import unidecode
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 5000
+
+NORMALIZED_FIELDS = [
+    "first_name_normalized",
+    "last_name_normalized",
+    "birth_name_normalized",
+]
+
+
+def format_name_as_pole_emploi(name):
+    # Same as `PoleEmploiApproval.format_name_as_pole_emploi()`.
+    return unidecode((name or "").strip()).upper()
+
+
+def normalize_names(apps, schema_editor):
+    PoleEmploiApproval = apps.get_model("approvals", "PoleEmploiApproval")
+
+    rows = (
+        PoleEmploiApproval.objects.order_by("pk")
+        .values_list("pk", "first_name", "last_name", "birth_name")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    batch = []
+    for pk, first_name, last_name, birth_name in rows:
+        batch.append(
+            PoleEmploiApproval(
+                pk=pk,
+                first_name_normalized=format_name_as_pole_emploi(first_name),
+                last_name_normalized=format_name_as_pole_emploi(last_name),
+                birth_name_normalized=format_name_as_pole_emploi(birth_name),
+            )
+        )
+        if len(batch) == BATCH_SIZE:
+            PoleEmploiApproval.objects.bulk_update(batch, NORMALIZED_FIELDS)
+            batch = []
+    PoleEmploiApproval.objects.bulk_update(batch, NORMALIZED_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("approvals", "0010_pe_approvals_import")]
+
+    operations = [
+        migrations.AddField(
+            model_name="poleemploiapproval",
+            name="first_name_normalized",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=150,
+                verbose_name="Prénom normalisé",
+            ),
+        ),
+        migrations.AddField(
+            model_name="poleemploiapproval",
+            name="last_name_normalized",
+            field=models.CharField(
+                blank=True, editable=False, max_length=150, verbose_name="Nom normalisé"
+            ),
+        ),
+        migrations.AddField(
+            model_name="poleemploiapproval",
+            name="birth_name_normalized",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=150,
+                verbose_name="Nom de naissance normalisé",
+            ),
+        ),
+        migrations.RunPython(normalize_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="poleemploiapproval",
+            index=models.Index(
+                fields=["birthdate", "last_name_normalized", "first_name_normalized"],
+                name="pe_birthdate_and_names_idx",
+            ),
+        ),
+    ]
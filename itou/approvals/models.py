@@ -6,8 +6,9 @@ from unidecode import unidecode
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MinLengthValidator
-from django.db import models
-from django.db.models import Q
+from django.db import IntegrityError, ProgrammingError, connection, models, transaction
+from django.db.models import CharField, Exists, F, Max, OuterRef, Q, Value
+from django.db.models.functions import Left
 from django.utils import timezone
 from django.utils.timesince import timeuntil
 from django.utils.translation import gettext_lazy as _
@@ -118,6 +119,9 @@ class Approval(CommonApprovalMixin):
     # This prefix is used by the ASP system to identify itou as the issuer of a number.
     ASP_ITOU_PREFIX = "99999"
 
+    # Name of the PostgreSQL sequence of numbers for a year (2 chars).
+    NUMBER_SEQUENCE_NAME = "approvals_approval_number_{year}_seq"
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         verbose_name=_("Demandeur d'emploi"),
@@ -151,13 +155,18 @@ class Approval(CommonApprovalMixin):
 
     def save(self, *args, **kwargs):
         self.clean()
-        already_exists = bool(self.pk)
-        # Prevent a database integrity error during automatic creation.
-        if not already_exists and hasattr(self, "number") and hasattr(self, "start_at"):
-            if self.number.startswith(self.ASP_ITOU_PREFIX):
-                while Approval.objects.filter(number=self.number).exists():
-                    self.number = self.get_next_number(self.start_at)
         super().save(*args, **kwargs)
+        self.invalidate_user_approvals_wrapper()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.invalidate_user_approvals_wrapper()
+        return result
+
+    def invalidate_user_approvals_wrapper(self):
+        # Only the instance at hand can hold a memoized `approvals_wrapper`.
+        if Approval.user.is_cached(self):
+            self.user.invalidate_approvals_wrapper()
 
     def clean(self):
         try:
@@ -195,28 +204,113 @@ class Approval(CommonApprovalMixin):
     @staticmethod
     def get_next_number(hiring_start_at=None):
         """
-        Find next "PASS IAE" number.
+        Preview the next "PASS IAE" number without reserving it, e.g. to
+        pre-fill a form: the greatest existing number of the year + 1.
+
+        Numbers given to new approvals must come from `reserve_numbers()`.
+        """
+        hiring_start_at = hiring_start_at or timezone.now().date()
+        year_2_chars = hiring_start_at.strftime("%y")
+        next_value = Approval.get_last_number_value(year_2_chars) + 1
+        return f"{Approval.ASP_ITOU_PREFIX}{year_2_chars}{next_value:05d}"
+
+    @staticmethod
+    def get_last_number_value(year_2_chars):
+        """
+        Returns the last 5 chars of the greatest existing number of the year
+        as an integer, 0 if there is none.
+        """
+        prefix = f"{Approval.ASP_ITOU_PREFIX}{year_2_chars}"
+        last_number = Approval.objects.filter(number__startswith=prefix).aggregate(
+            Max("number")
+        )["number__max"]
+        return int(last_number[len(prefix) :]) if last_number else 0
+
+    @staticmethod
+    def reserve_numbers(hiring_start_at=None, count=1):
+        """
+        Reserve `count` "PASS IAE" numbers at once.
 
         Structure of a 12 chars "PASS IAE" number:
             ASP_ITOU_PREFIX (5 chars) + YEAR WITHOUT CENTURY (2 chars) + NUMBER (5 chars)
 
         Rule:
             The "PASS IAE"'s year is equal to the start year of the `JobApplication.hiring_start_at`.
+
+        Numbers come from a PostgreSQL sequence per year: `nextval()` never
+        blocks nor returns the same value twice, even to concurrent transactions.
+        A reserved number is never handed out again, even if the transaction
+        is rolled back, so there may be gaps.
+
+        Numbers already used (e.g. entered manually ahead of the sequence)
+        are skipped.
         """
         hiring_start_at = hiring_start_at or timezone.now().date()
-        year = hiring_start_at.strftime("%Y")
-        last_itou_approval = (
-            Approval.objects.filter(
-                number__startswith=Approval.ASP_ITOU_PREFIX, start_at__year=year
-            )
-            .order_by("created_at")
-            .last()
-        )
-        if last_itou_approval:
-            next_number = int(last_itou_approval.number) + 1
-            return str(next_number)
         year_2_chars = hiring_start_at.strftime("%y")
-        return f"{Approval.ASP_ITOU_PREFIX}{year_2_chars}00001"
+        sequence = Approval.NUMBER_SEQUENCE_NAME.format(year=year_2_chars)
+        sql = "SELECT nextval(%s) FROM generate_series(1, %s)"
+        numbers = []
+        with connection.cursor() as cursor:
+            while len(numbers) < count:
+                try:
+                    # A savepoint, so that the current transaction remains usable.
+                    with transaction.atomic():
+                        cursor.execute(sql, [sequence, count - len(numbers)])
+                except ProgrammingError:
+                    # First number of the year.
+                    Approval.create_number_sequence(cursor, year_2_chars)
+                    cursor.execute(sql, [sequence, count - len(numbers)])
+                reserved = [
+                    f"{Approval.ASP_ITOU_PREFIX}{year_2_chars}{value:05d}"
+                    for value, in cursor.fetchall()
+                ]
+                used = set(
+                    Approval.objects.filter(number__in=reserved).values_list(
+                        "number", flat=True
+                    )
+                )
+                numbers += [number for number in reserved if number not in used]
+        return numbers
+
+    @staticmethod
+    def create_number_sequence(cursor, year_2_chars):
+        """
+        The sequence starts after the greatest existing number of the year.
+        """
+        start = Approval.get_last_number_value(year_2_chars) + 1
+        sequence = Approval.NUMBER_SEQUENCE_NAME.format(year=year_2_chars)
+        try:
+            with transaction.atomic():
+                cursor.execute(
+                    f"CREATE SEQUENCE {sequence} START WITH %s MAXVALUE 99999", [start]
+                )
+        except (IntegrityError, ProgrammingError):
+            # Created in the meantime by a concurrent transaction.
+            pass
+
+    @staticmethod
+    def sync_number_sequence(number):
+        """
+        Move the sequence of the year past a number entered manually (e.g. in
+        the admin) so that `reserve_numbers()` doesn't hand it out later.
+        """
+        prefix = Approval.ASP_ITOU_PREFIX
+        if len(number) != 12 or not number.startswith(prefix):
+            return
+        year_2_chars, value = number[5:7], number[7:]
+        if not (year_2_chars + value).isdigit():
+            return
+        sequence = Approval.NUMBER_SEQUENCE_NAME.format(year=year_2_chars)
+        with connection.cursor() as cursor:
+            try:
+                with transaction.atomic():
+                    cursor.execute(
+                        f"SELECT setval(%s, GREATEST(%s, last_value)) FROM {sequence}",
+                        [sequence, int(value)],
+                    )
+            except ProgrammingError:
+                # No sequence yet: it will start after the greatest number.
+                pass
 
     @staticmethod
     def get_default_end_date(start_at):
@@ -281,6 +375,35 @@ class PoleEmploiApprovalManager(models.Manager):
             pole_emploi_id=user.pole_emploi_id, birthdate=user.birthdate
         ).order_by("-start_at")
 
+    def find_for_name(self, user):
+        """
+        Find Pôle emploi's approvals which may belong to the given user based
+        on `birthdate` and names, e.g. to help staff members when there is no
+        `pole_emploi_id`.
+
+        Names are compared with the precomputed `*_normalized` columns:
+        - first and last names can be inverted
+        - the last name can be the birth name
+        - names are compared with the `%` trigram similarity operator
+
+        `birthdate` is the leading column of `pe_birthdate_and_names_idx` so that
+        the similarity is only computed for a few rows.
+        """
+        if not user.birthdate or not user.first_name or not user.last_name:
+            return self.none()
+        first_name = PoleEmploiApproval.format_name_as_pole_emploi(user.first_name)
+        last_name = PoleEmploiApproval.format_name_as_pole_emploi(user.last_name)
+        inverted_names = Q(
+            first_name_normalized=last_name, last_name_normalized=first_name
+        )
+        similar_names = Q(first_name_normalized__trigram_similar=first_name) & (
+            Q(last_name_normalized__trigram_similar=last_name)
+            | Q(birth_name_normalized__trigram_similar=last_name)
+        )
+        return self.filter(
+            Q(birthdate=user.birthdate) & (inverted_names | similar_names)
+        ).order_by("-start_at")
+
 
 class PoleEmploiApproval(CommonApprovalMixin):
     """
@@ -318,6 +441,24 @@ class PoleEmploiApproval(CommonApprovalMixin):
     birthdate = models.DateField(
         verbose_name=_("Date de naissance"), default=timezone.now
     )
+    # `format_name_as_pole_emploi()` of names, used by `find_for_name()`.
+    first_name_normalized = models.CharField(
+        _("Prénom normalisé"), max_length=150, blank=True, editable=False
+    )
+    last_name_normalized = models.CharField(
+        _("Nom normalisé"), max_length=150, blank=True, editable=False
+    )
+    birth_name_normalized = models.CharField(
+        _("Nom de naissance normalisé"), max_length=150, blank=True, editable=False
+    )
+    # Set by `import_pe_approvals`: the source file (e.g. a region) the approval
+    # comes from, and a hash of its imported values to detect changes.
+    import_source = models.CharField(
+        verbose_name=_("Source de l'import"), max_length=50, blank=True, db_index=True
+    )
+    import_fingerprint = models.CharField(
+        verbose_name=_("Empreinte de l'import"), max_length=32, blank=True
+    )
 
     objects = PoleEmploiApprovalManager.from_queryset(CommonApprovalQuerySet)()
 
@@ -328,12 +469,22 @@ class PoleEmploiApproval(CommonApprovalMixin):
         indexes = [
             models.Index(
                 fields=["pole_emploi_id", "birthdate"], name="pe_id_and_birthdate_idx"
-            )
+            ),
+            models.Index(
+                fields=["birthdate", "last_name_normalized", "first_name_normalized"],
+                name="pe_birthdate_and_names_idx",
+            ),
         ]
 
     def __str__(self):
         return self.number
 
+    def save(self, *args, **kwargs):
+        self.first_name_normalized = self.format_name_as_pole_emploi(self.first_name)
+        self.last_name_normalized = self.format_name_as_pole_emploi(self.last_name)
+        self.birth_name_normalized = self.format_name_as_pole_emploi(self.birth_name)
+        super().save(*args, **kwargs)
+
     @staticmethod
     def format_name_as_pole_emploi(name):
         """
@@ -404,18 +555,127 @@ class ApprovalsWrapper:
         self.has_valid = self.status == self.VALID
         self.has_in_waiting_period = self.status == self.IN_WAITING_PERIOD
 
+    @staticmethod
+    def _get_merged_columns(model, attnames):
+        """
+        Annotations selecting `attnames` for `model`, NULL for the columns
+        of the other model, so that both sides of the union are aligned.
+        """
+        field_names = {
+            field.attname: field.name for field in model._meta.concrete_fields
+        }
+        columns = {}
+        for attname in attnames:
+            if attname in field_names:
+                column = F(field_names[attname])
+            else:
+                column = Value(None, output_field=CharField())
+            columns[f"merged_{attname}"] = column
+        columns["model"] = Value(model._meta.label, output_field=CharField())
+        return columns
+
     def _merge_approvals(self):
         """
         Returns a list of merged unique `Approval` and `PoleEmploiApproval`
         objects ordered by most recent `start_at` dates.
+
+        Both tables are read at once with a `UNION ALL` query selecting all
+        the columns of both models: returned objects have no deferred field.
         """
-        approvals = list(Approval.objects.filter(user=self.user).order_by("-start_at"))
-        approvals_numbers = [approval.number for approval in approvals]
-        pe_approvals = [
-            pe_approval
-            for pe_approval in list(PoleEmploiApproval.objects.find_for(self.user))
-            # A `PoleEmploiApproval` could already have been copied in `Approval`.
-            if pe_approval not in approvals_numbers
-        ]
-        merged_approvals = approvals + pe_approvals
-        return sorted(merged_approvals, key=lambda x: x.start_at, reverse=True)
+        models = (Approval, PoleEmploiApproval)
+        attnames = []
+        for model in models:
+            for field in model._meta.concrete_fields:
+                if field.attname not in attnames:
+                    attnames.append(field.attname)
+        aliases = [f"merged_{attname}" for attname in attnames]
+
+        # All columns are annotations: Django selects model fields before
+        # annotations, mixing both would misalign the two sides of the union.
+        approvals = (
+            Approval.objects.filter(user=self.user)
+            .annotate(**self._get_merged_columns(Approval, attnames))
+            .order_by()
+            .values_list(*aliases, "model")
+        )
+
+        pe_approvals = (
+            PoleEmploiApproval.objects.find_for(self.user)
+            .annotate(
+                # A `PoleEmploiApproval` could already have been copied in `Approval`
+                # (only the first 12 chars of its number are copied).
+                is_copied=Exists(
+                    Approval.objects.filter(
+                        user=self.user, number=Left(OuterRef("number"), 12)
+                    )
+                )
+            )
+            .filter(is_copied=False)
+            .annotate(**self._get_merged_columns(PoleEmploiApproval, attnames))
+            .order_by()
+            .values_list(*aliases, "model")
+        )
+
+        # `number` breaks ties between approvals starting the same day.
+        merged_approvals = approvals.union(pe_approvals, all=True).order_by(
+            "-merged_start_at", "merged_number"
+        )
+
+        models_by_label = {model._meta.label: model for model in models}
+        results = []
+        for *values, label in merged_approvals:
+            model = models_by_label[label]
+            row = dict(zip(attnames, values))
+            # `from_db()` expects values in the order of the model fields.
+            field_names = [field.attname for field in model._meta.concrete_fields]
+            approval = model.from_db(
+                merged_approvals.db, field_names, [row[name] for name in field_names]
+            )
+            if model is Approval:
+                approval.user = self.user
+            results.append(approval)
+        return results
+
+
+class PoleEmploiApprovalImport(models.Model):
+    """
+    Summary of each run of the `import_pe_approvals` admin command.
+    """
+
+    file_name = models.CharField(verbose_name=_("Fichier"), max_length=255)
+    import_source = models.CharField(
+        verbose_name=_("Source de l'import"), max_length=50, blank=True
+    )
+    is_delta = models.BooleanField(verbose_name=_("Import différentiel"), default=False)
+    started_at = models.DateTimeField(
+        verbose_name=_("Date de début"), default=timezone.now
+    )
+    finished_at = models.DateTimeField(
+        verbose_name=_("Date de fin"), null=True, blank=True
+    )
+    rows_count = models.PositiveIntegerField(
+        verbose_name=_("Lignes valides"), default=0
+    )
+    canceled_count = models.PositiveIntegerField(
+        verbose_name=_("Agréments annulés ignorés"), default=0
+    )
+    invalid_count = models.PositiveIntegerField(
+        verbose_name=_("Lignes invalides ignorées"), default=0
+    )
+    created_count = models.PositiveIntegerField(
+        verbose_name=_("Agréments créés"), default=0
+    )
+    updated_count = models.PositiveIntegerField(
+        verbose_name=_("Agréments modifiés"), default=0
+    )
+    deleted_count = models.PositiveIntegerField(
+        verbose_name=_("Agréments supprimés"), default=0
+    )
+
+    class Meta:
+        verbose_name = _("Import d'agréments Pôle emploi")
+        verbose_name_plural = _("Imports d'agréments Pôle emploi")
+        ordering = ["-started_at"]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.started_at:%d/%m/%Y %H:%M})"
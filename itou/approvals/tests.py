@@ -1,10 +1,17 @@
+import csv
 import datetime
+import io
+import os
+import tempfile
+from unittest import mock
 
 from dateutil.relativedelta import relativedelta
 
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
 from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 from django.urls import reverse
@@ -13,6 +20,7 @@ from django.utils import timezone
 from itou.approvals.factories import ApprovalFactory
 from itou.approvals.factories import PoleEmploiApprovalFactory
 from itou.approvals.models import Approval, PoleEmploiApproval
+from itou.approvals.models import PoleEmploiApprovalImport
 from itou.approvals.models import ApprovalsWrapper
 from itou.job_applications.factories import JobApplicationSentByJobSeekerFactory
 from itou.job_applications.models import JobApplication, JobApplicationWorkflow
@@ -225,6 +233,62 @@ class ApprovalModelTest(TestCase):
         self.assertEqual(Approval.get_next_number(), expected_number)
         Approval.objects.all().delete()
 
+    def test_get_next_number_does_not_reserve(self):
+        PREFIX = Approval.ASP_ITOU_PREFIX
+        hiring_start_at = datetime.date(2020, 3, 1)
+        self.assertEqual(Approval.get_next_number(hiring_start_at), f"{PREFIX}2000001")
+        self.assertEqual(Approval.get_next_number(hiring_start_at), f"{PREFIX}2000001")
+        self.assertEqual(
+            Approval.reserve_numbers(hiring_start_at), [f"{PREFIX}2000001"]
+        )
+
+    def test_reserve_numbers(self):
+        PREFIX = Approval.ASP_ITOU_PREFIX
+        hiring_start_at = datetime.date(2020, 3, 1)
+        ApprovalFactory(number=f"{PREFIX}2000007", start_at=hiring_start_at)
+        self.assertEqual(
+            Approval.reserve_numbers(hiring_start_at), [f"{PREFIX}2000008"]
+        )
+        # Numbers are reserved.
+        self.assertEqual(
+            Approval.reserve_numbers(hiring_start_at, count=3),
+            [f"{PREFIX}2000009", f"{PREFIX}2000010", f"{PREFIX}2000011"],
+        )
+
+    def test_reserve_numbers_skips_used_numbers(self):
+        PREFIX = Approval.ASP_ITOU_PREFIX
+        hiring_start_at = datetime.date(2020, 3, 1)
+        self.assertEqual(
+            Approval.reserve_numbers(hiring_start_at), [f"{PREFIX}2000001"]
+        )
+        # Entered manually ahead of the sequence.
+        ApprovalFactory(number=f"{PREFIX}2000002", start_at=hiring_start_at)
+        ApprovalFactory(number=f"{PREFIX}2000004", start_at=hiring_start_at)
+        self.assertEqual(
+            Approval.reserve_numbers(hiring_start_at, count=2),
+            [f"{PREFIX}2000003", f"{PREFIX}2000005"],
+        )
+
+    def test_sync_number_sequence(self):
+        PREFIX = Approval.ASP_ITOU_PREFIX
+        hiring_start_at = datetime.date(2020, 3, 1)
+        # No sequence yet.
+        Approval.sync_number_sequence(f"{PREFIX}2000010")
+        self.assertEqual(
+            Approval.reserve_numbers(hiring_start_at), [f"{PREFIX}2000001"]
+        )
+        Approval.sync_number_sequence(f"{PREFIX}2000010")
+        self.assertEqual(
+            Approval.reserve_numbers(hiring_start_at), [f"{PREFIX}2000011"]
+        )
+        # The sequence never goes back.
+        Approval.sync_number_sequence(f"{PREFIX}2000005")
+        # Not a "PASS IAE" number.
+        Approval.sync_number_sequence("625741810182")
+        self.assertEqual(
+            Approval.reserve_numbers(hiring_start_at), [f"{PREFIX}2000012"]
+        )
+
     def test_is_valid(self):
 
         # Start today, end in 2 years.
@@ -359,6 +423,40 @@ class PoleEmploiApprovalManagerTest(TestCase):
         self.assertEqual(search_results.first(), pe_approval)
         PoleEmploiApproval.objects.all().delete()
 
+    def test_find_for_name(self):
+
+        user = JobSeekerFactory(
+            first_name="Hélène", last_name="Lefèvre", pole_emploi_id=""
+        )
+        same_names = PoleEmploiApprovalFactory(
+            first_name="HELENE", last_name="LEFEVRE", birthdate=user.birthdate
+        )
+        self.assertEqual(same_names.first_name_normalized, "HELENE")
+        inverted_names = PoleEmploiApprovalFactory(
+            first_name="LEFEVRE", last_name="HELENE", birthdate=user.birthdate
+        )
+        birth_name_with_typo = PoleEmploiApprovalFactory(
+            first_name="HELENE",
+            last_name="MARTIN",
+            birth_name="LEFEBVRE",
+            birthdate=user.birthdate,
+        )
+        # Other birthdate.
+        PoleEmploiApprovalFactory(
+            first_name="HELENE",
+            last_name="LEFEVRE",
+            birthdate=user.birthdate - datetime.timedelta(days=1),
+        )
+        # Other names.
+        PoleEmploiApprovalFactory(
+            first_name="PAUL", last_name="DUPONT", birthdate=user.birthdate
+        )
+
+        search_results = PoleEmploiApproval.objects.find_for_name(user)
+        self.assertCountEqual(
+            search_results, [same_names, inverted_names, birth_name_with_typo]
+        )
+
 
 class ApprovalsWrapperTest(TestCase):
     """
@@ -392,6 +490,71 @@ class ApprovalsWrapperTest(TestCase):
         self.assertEqual(approvals_wrapper.merged_approvals[0], pe_approval)
         self.assertEqual(approvals_wrapper.merged_approvals[1], approval)
 
+    def test_merge_approvals_in_a_single_query(self):
+
+        user = JobSeekerFactory()
+        # A PoleEmploiApproval copied in Approval.
+        pe_approval = PoleEmploiApprovalFactory(
+            pole_emploi_id=user.pole_emploi_id,
+            birthdate=user.birthdate,
+            number="625741810182A01",
+        )
+        approval = ApprovalFactory(
+            user=user,
+            number=pe_approval.number[:12],
+            start_at=pe_approval.start_at,
+            end_at=pe_approval.end_at,
+        )
+        # Another PoleEmploiApproval.
+        start_at = datetime.date.today() - relativedelta(years=4)
+        end_at = start_at + relativedelta(years=2)
+        other_pe_approval = PoleEmploiApprovalFactory(
+            pole_emploi_id=user.pole_emploi_id,
+            birthdate=user.birthdate,
+            start_at=start_at,
+            end_at=end_at,
+        )
+
+        with self.assertNumQueries(1):
+            approvals_wrapper = ApprovalsWrapper(user)
+        self.assertEqual(
+            approvals_wrapper.merged_approvals, [approval, other_pe_approval]
+        )
+        self.assertIsInstance(approvals_wrapper.latest_approval, Approval)
+        self.assertEqual(approvals_wrapper.latest_approval.number, approval.number)
+        self.assertEqual(approvals_wrapper.status, ApprovalsWrapper.VALID)
+        # All fields are loaded.
+        self.assertEqual(approvals_wrapper.latest_approval.get_deferred_fields(), set())
+        self.assertEqual(
+            approvals_wrapper.merged_approvals[1].get_deferred_fields(), set()
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                approvals_wrapper.merged_approvals[1].pole_emploi_id,
+                user.pole_emploi_id,
+            )
+
+    def test_merge_approvals_same_start_date(self):
+        user = JobSeekerFactory()
+        start_at = datetime.date.today()
+        end_at = start_at + relativedelta(years=2)
+        approvals = [
+            PoleEmploiApprovalFactory(
+                pole_emploi_id=user.pole_emploi_id,
+                birthdate=user.birthdate,
+                number=number,
+                start_at=start_at,
+                end_at=end_at,
+            )
+            for number in ["625741810183", "625741810181", "625741810182"]
+        ]
+        approvals_wrapper = ApprovalsWrapper(user)
+        # Ties are broken by number.
+        self.assertEqual(
+            [approval.number for approval in approvals_wrapper.merged_approvals],
+            sorted(approval.number for approval in approvals),
+        )
+
     def test_status_without_approval(self):
         user = JobSeekerFactory()
         approvals_wrapper = ApprovalsWrapper(user)
@@ -523,3 +686,286 @@ class CustomAdminViewsTest(TestCase):
         self.assertEqual(len(mail.outbox), 1)
         email = mail.outbox[0]
         self.assertIn(approval.number_with_spaces, email.body)
+
+
+class ImportPoleEmploiApprovalsCommandTest(TestCase):
+
+    HEADER = [
+        "ID_REGIONAL_BENE",
+        "NOM_BENE",
+        "NOM_USAGE_BENE",
+        "NOM_NAISS_BENE",
+        "PRENOM_BENE",
+        "DATE_NAISS_BENE",
+        "CODE_STRUCT_AFFECT_BENE",
+        "NUM_AGR_DEC",
+        "DATE_DEB_AGR_DEC",
+        "DATE_FIN_AGR_DEC",
+    ]
+
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch(
+            "itou.approvals.management.commands.import_pe_approvals.XLSX_FILE_PATH",
+            self.data_dir.name,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.data_dir.cleanup)
+
+    def write_csv(self, file_name, rows):
+        with open(os.path.join(self.data_dir.name, file_name), "w") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(self.HEADER)
+            writer.writerows(rows)
+
+    def call_command(self, file_name, **kwargs):
+        call_command(
+            "import_pe_approvals",
+            file_name=file_name,
+            stdout=io.StringIO(),
+            stderr=io.StringIO(),
+            **kwargs,
+        )
+
+    def test_import_csv(self):
+        PoleEmploiApprovalFactory(
+            number="625741810181", end_at=datetime.date(2021, 1, 1)
+        )
+        self.write_csv(
+            "approvals.csv",
+            [
+                # Existing number: left untouched.
+                [
+                    "1234567A",
+                    "",
+                    "DUPONT",
+                    "DUPONT",
+                    "JEAN",
+                    "01/02/80",
+                    "62501",
+                    "625741810181",
+                    "01/01/20",
+                    "31/12/21",
+                ],
+                [
+                    "7654321B",
+                    "",
+                    "MARTIN",
+                    "DURAND",
+                    "LEA",
+                    "15/06/92",
+                    "6201",
+                    "625741810182",
+                    "01/01/20",
+                    "31/12/21",
+                ],
+                # Canceled approval.
+                [
+                    "7654321C",
+                    "",
+                    "PETIT",
+                    "PETIT",
+                    "LUC",
+                    "15/06/92",
+                    "6201",
+                    "625741810183",
+                    "01/01/20",
+                    "01/01/20",
+                ],
+                # Invalid number.
+                [
+                    "7654321D",
+                    "",
+                    "PETIT",
+                    "PETIT",
+                    "LUC",
+                    "15/06/92",
+                    "6201",
+                    "6257418",
+                    "01/01/20",
+                    "31/12/21",
+                ],
+            ],
+        )
+
+        self.call_command("approvals.csv", dry_run=True)
+        self.assertEqual(PoleEmploiApproval.objects.count(), 1)
+
+        self.call_command("approvals.csv")
+        self.assertEqual(PoleEmploiApproval.objects.count(), 2)
+
+        existing = PoleEmploiApproval.objects.get(number="625741810181")
+        self.assertEqual(existing.end_at, datetime.date(2021, 1, 1))
+
+        new = PoleEmploiApproval.objects.get(number="625741810182")
+        self.assertEqual(new.pole_emploi_id, "7654321B")
+        self.assertEqual(new.first_name, "LEA")
+        self.assertEqual(new.last_name, "MARTIN")
+        self.assertEqual(new.birth_name, "DURAND")
+        self.assertEqual(new.birthdate, datetime.date(1992, 6, 15))
+        self.assertEqual(new.start_at, datetime.date(2020, 1, 1))
+        self.assertEqual(new.end_at, datetime.date(2021, 12, 31))
+        self.assertIsNotNone(new.created_at)
+
+    def test_import_csv_with_empty_birth_name(self):
+        self.write_csv(
+            "approvals.csv",
+            [
+                [
+                    "7654321B",
+                    "",
+                    "MARTIN",
+                    "",
+                    "LEA",
+                    "15/06/92",
+                    "6201",
+                    "625741810182",
+                    "01/01/20",
+                    "31/12/21",
+                ]
+            ],
+        )
+        self.call_command("approvals.csv")
+        approval = PoleEmploiApproval.objects.get()
+        self.assertEqual(approval.birth_name, "")
+        self.assertEqual(approval.birth_name_normalized, "")
+
+    def test_import_csv_delta(self):
+        # Imported before delta imports existed: claimed by the source.
+        PoleEmploiApprovalFactory(number="625741810181")
+        # Another source: left untouched.
+        PoleEmploiApprovalFactory(number="625741810189", import_source="idf")
+
+        def row(pole_emploi_id, number, end_at):
+            return [
+                pole_emploi_id,
+                "",
+                "MARTIN",
+                "DURAND",
+                "LEA",
+                "15/06/92",
+                "6201",
+                number,
+                "01/01/20",
+                end_at,
+            ]
+
+        self.write_csv(
+            "approvals_1.csv",
+            [
+                row("1234567A", "625741810181", "31/12/21"),
+                row("7654321B", "625741810182", "31/12/21"),
+                row("7654321C", "625741810183", "31/12/21"),
+            ],
+        )
+        self.call_command("approvals_1.csv", delta=True, source="aura")
+        self.assertEqual(
+            PoleEmploiApproval.objects.filter(import_source="aura").count(), 3
+        )
+        summary = PoleEmploiApprovalImport.objects.get()
+        self.assertTrue(summary.is_delta)
+        self.assertEqual(summary.rows_count, 3)
+        self.assertEqual(summary.created_count, 2)
+        self.assertEqual(summary.updated_count, 1)
+        self.assertEqual(summary.deleted_count, 0)
+        self.assertIsNotNone(summary.finished_at)
+
+        self.write_csv(
+            "approvals_2.csv",
+            [
+                # Unchanged.
+                row("1234567A", "625741810181", "31/12/21"),
+                # Changed end date.
+                row("7654321B", "625741810182", "30/06/21"),
+                # 625741810183 removed.
+                # New.
+                row("7654321D", "625741810184", "31/12/21"),
+            ],
+        )
+        self.call_command("approvals_2.csv", delta=True, source="aura")
+        self.assertEqual(
+            list(
+                PoleEmploiApproval.objects.order_by("number").values_list(
+                    "number", flat=True
+                )
+            ),
+            ["625741810181", "625741810182", "625741810184", "625741810189"],
+        )
+        updated = PoleEmploiApproval.objects.get(number="625741810182")
+        self.assertEqual(updated.end_at, datetime.date(2021, 6, 30))
+        summary = PoleEmploiApprovalImport.objects.latest("started_at")
+        self.assertEqual(summary.file_name, "approvals_2.csv")
+        self.assertEqual(summary.created_count, 1)
+        self.assertEqual(summary.updated_count, 1)
+        self.assertEqual(summary.deleted_count, 1)
+
+    def test_delta_requires_source(self):
+        self.write_csv("approvals.csv", [])
+        with self.assertRaises(CommandError):
+            self.call_command("approvals.csv", delta=True)
+
+    def test_import_csv_in_chunks(self):
+        self.write_csv(
+            "approvals.csv",
+            [
+                [
+                    "7654321B",
+                    "",
+                    "MARTIN",
+                    "DURAND",
+                    "LEA",
+                    "15/06/92",
+                    "6201",
+                    f"6257418{i:05d}",
+                    "01/01/20",
+                    "31/12/21",
+                ]
+                for i in range(25)
+            ],
+        )
+        with mock.patch(
+            "itou.approvals.management.commands.import_pe_approvals.PARSE_CHUNK_SIZE",
+            10,
+        ):
+            self.call_command("approvals.csv")
+        self.assertEqual(PoleEmploiApproval.objects.count(), 25)
+
+    def test_rejected_rows_report(self):
+        valid_row = [
+            "7654321B",
+            "",
+            "MARTIN",
+            "DURAND",
+            "LEA",
+            "15/06/92",
+            "6201",
+            "625741810182",
+            "01/01/20",
+            "31/12/21",
+        ]
+        invalid_pole_emploi_id = list(valid_row)
+        invalid_pole_emploi_id[0] = "7654321"
+        invalid_name = list(valid_row)
+        invalid_name[2] = "MARTIN  DURAND"
+        invalid_date = list(valid_row)
+        invalid_date[9] = "31/02/21"
+        self.write_csv(
+            "approvals.csv",
+            [valid_row, invalid_pole_emploi_id, invalid_name, invalid_date],
+        )
+        self.call_command("approvals.csv")
+        self.assertEqual(PoleEmploiApproval.objects.count(), 1)
+        self.assertEqual(PoleEmploiApprovalImport.objects.get().invalid_count, 3)
+
+        with open(os.path.join(self.data_dir.name, "approvals_rejected.csv")) as f:
+            report = list(csv.reader(f, delimiter=";"))
+        self.assertEqual(report[0], ["line", "reason"])
+        self.assertEqual(
+            [row[:3] for row in report[1:]],
+            [
+                ["3", "invalid_pole_emploi_id", "7654321"],
+                ["4", "invalid_name", "7654321B"],
+                ["5", "invalid_date", "7654321B"],
+            ],
+        )
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from itou.cities import models
+from itou.cities.index import invalidate_cities_index
 
 
 @admin.register(models.City)
@@ -8,3 +9,11 @@ class CityAdmin(admin.ModelAdmin):
     list_display = ("name", "department", "post_codes", "code_insee")
     list_filter = ("department",)
     search_fields = ("name", "department", "post_codes", "code_insee")
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_cities_index()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_cities_index()
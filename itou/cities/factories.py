@@ -4,6 +4,7 @@ import os
 from django.contrib.gis.geos import GEOSGeometry
 from django.template.defaultfilters import slugify
 
+from itou.cities.index import invalidate_cities_index
 from itou.cities.models import City
 
 
@@ -59,3 +60,5 @@ def create_test_cities(selected_departments, num_per_department=None):
                 code_insee=item["code"],
                 coords=GEOSGeometry(f"{coords}"),  # Feed `GEOSGeometry` with GeoJSON.
             )
+
+    invalidate_cities_index()
@@ -0,0 +1,121 @@
+import heapq
+import re
+import threading
+from collections import Counter
+
+from itou.cities.models import City
+from itou.utils.indexes import SharedIndexVersion
+
+
+# Same threshold as the former `TrigramSimilarity` query.
+SIMILARITY_THRESHOLD = 0.1
+
+# Like pg_trgm, words are made of alphanumeric characters.
+WORDS_REGEX = re.compile(r"[^\W_]+")
+
+
+def get_trigrams(text):
+    """
+    Mimics `show_trgm()` of pg_trgm: each lowercased word is padded with two
+    spaces at the beginning and one at the end before being split into trigrams.
+    https://www.postgresql.org/docs/11/pgtrgm.html#id-1.11.7.40.5
+    """
+    trigrams = set()
+    for word in WORDS_REGEX.findall(text.lower()):
+        word = f"  {word} "
+        trigrams.update(word[i : i + 3] for i in range(len(word) - 2))
+    return trigrams
+
+
+class CitiesIndex:
+    """
+    In-memory trigram index over the names and slugs of active cities.
+
+    Names and slugs are indexed separately and a city matches with the best
+    of both similarities: on names, it gives the same results as a pg_trgm
+    `similarity()` query without hitting the database.
+    """
+
+    def __init__(self, cities, version=None):
+        self.version = version
+        # Keep cities in the order of the database to break ties consistently.
+        self.cities = []
+        # `(city position, number of trigrams)` of each indexed name or slug.
+        self.entries = []
+        self.entries_by_trigram = {}
+        for position, (name, slug, display_name) in enumerate(cities):
+            self.cities.append({"value": display_name, "slug": slug})
+            for text in (name, slug):
+                trigrams = get_trigrams(text)
+                entry = len(self.entries)
+                self.entries.append((position, len(trigrams)))
+                for trigram in trigrams:
+                    self.entries_by_trigram.setdefault(trigram, []).append(entry)
+
+    @classmethod
+    def build(cls, version=None):
+        cities = (
+            (city.name, city.slug, city.display_name)
+            for city in City.active_objects.order_by("pk").only(
+                "name", "slug", "department"
+            )
+        )
+        return cls(cities, version=version)
+
+    def search(self, term, limit=10):
+        term_trigrams = get_trigrams(term)
+        if not term_trigrams:
+            return []
+
+        common_counts = Counter()
+        for trigram in term_trigrams:
+            common_counts.update(self.entries_by_trigram.get(trigram, ()))
+
+        similarities = {}
+        for entry, common in common_counts.items():
+            position, trigrams_count = self.entries[entry]
+            union = len(term_trigrams) + trigrams_count - common
+            similarity = common / union
+            if similarity > similarities.get(position, SIMILARITY_THRESHOLD):
+                similarities[position] = similarity
+
+        results = heapq.nlargest(
+            limit,
+            ((similarity, -position) for position, similarity in similarities.items()),
+        )
+        # Copies: the index is shared by all the requests of the process.
+        return [
+            dict(self.cities[-negative_position])
+            for _similarity, negative_position in results
+        ]
+
+
+_cities_index = None
+_cities_index_lock = threading.Lock()
+_cities_index_version = SharedIndexVersion("cities")
+
+
+def get_cities_index():
+    """
+    Returns the index of the current process, (re)building it on first use
+    (see `config/wsgi.py`) or when cities have been modified by any process.
+    """
+    global _cities_index
+    version = _cities_index_version.get()
+    index = _cities_index
+    if index is None or index.version != version:
+        with _cities_index_lock:
+            index = _cities_index
+            if index is None or index.version != version:
+                index = CitiesIndex.build(version=version)
+                _cities_index = index
+    return index
+
+
+def invalidate_cities_index():
+    """
+    Must be called each time cities are modified.
+    """
+    global _cities_index
+    _cities_index_version.increment()
+    _cities_index = None
@@ -1,13 +1,17 @@
 import json
 import logging
 import os
+import re
+
+from psycopg2.extras import execute_values
 
-from django.contrib.gis.geos import GEOSGeometry
 from django.core.management.base import BaseCommand
+from django.db import connection
 from django.template.defaultfilters import slugify
 
-from itou.utils.address.departments import DEPARTMENTS
+from itou.cities.index import invalidate_cities_index
 from itou.cities.models import City
+from itou.utils.address.departments import DEPARTMENTS
 
 
 CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -15,6 +19,54 @@ CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
 # Use the data generated by `django-admin generate_cities`.
 CITIES_JSON_FILE = f"{CURRENT_DIR}/data/cities.json"
 
+# Number of cities upserted in a single statement.
+CHUNK_SIZE = 2000
+
+# Conflicting rows are updated, i.e. the equivalent of `update_or_create(slug=…)`.
+UPSERT_SQL = f"""
+    INSERT INTO {City._meta.db_table}
+        (name, slug, department, post_codes, code_insee, coords)
+    VALUES %s
+    ON CONFLICT (slug) DO UPDATE SET
+        name = EXCLUDED.name,
+        department = EXCLUDED.department,
+        post_codes = EXCLUDED.post_codes,
+        code_insee = EXCLUDED.code_insee,
+        coords = EXCLUDED.coords
+"""
+
+# Build points in PostGIS rather than parsing GeoJSON with `GEOSGeometry`.
+UPSERT_TEMPLATE = (
+    "(%s, %s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography)"
+)
+
+
+def iter_json_array(f, chunk_size=64 * 1024):
+    """
+    Yield the objects of a JSON array file one by one without loading
+    the whole file in memory.
+    """
+    decoder = json.JSONDecoder()
+    separators = re.compile(r"[\s,]*")
+    buffer = f.read(chunk_size).lstrip()
+    assert buffer.startswith("["), "A JSON array is expected."
+    pos = 1
+    while True:
+        pos = separators.match(buffer, pos).end()
+        if buffer.startswith("]", pos):
+            return
+        try:
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The object is truncated: read more data.
+            data = f.read(chunk_size)
+            if not data:
+                raise
+            buffer = buffer[pos:] + data
+            pos = 0
+            continue
+        yield item
+
 
 class Command(BaseCommand):
     """
@@ -38,6 +90,22 @@ class Command(BaseCommand):
             help="Only print data to import",
         )
 
+    def upsert(self, cities, dry_run=False):
+        """
+        Insert or update a chunk of cities with a single statement.
+        """
+        cities = list(cities)
+        if cities and not dry_run:
+            with connection.cursor() as cursor:
+                execute_values(
+                    cursor,
+                    UPSERT_SQL,
+                    cities,
+                    template=UPSERT_TEMPLATE,
+                    page_size=len(cities),
+                )
+        return len(cities)
+
     def set_logger(self, verbosity):
         """
         Set logger level based on the verbosity option.
@@ -56,18 +124,12 @@ class Command(BaseCommand):
 
         self.set_logger(options.get("verbosity"))
 
-        with open(CITIES_JSON_FILE, "r") as raw_json_data:
-
-            json_data = json.load(raw_json_data)
-            total_len = len(json_data)
-            last_progress = 0
+        cities = {}
+        total = 0
 
-            for i, item in enumerate(json_data):
+        with open(CITIES_JSON_FILE, "r") as raw_json_data:
 
-                progress = int((100 * i) / total_len)
-                if progress > last_progress + 5:
-                    self.stdout.write(f"Creating cities… {progress}%")
-                    last_progress = progress
+            for item in iter_json_array(raw_json_data):
 
                 name = item["nom"]
 
@@ -77,14 +139,12 @@ class Command(BaseCommand):
                     continue
                 assert department in DEPARTMENTS
 
+                # GeoJSON point, e.g. `{"type": "Point", "coordinates": [lng, lat]}`.
                 coords = item.get("centre")
-                if coords:
-                    coords = GEOSGeometry(
-                        f"{coords}"
-                    )  # Feed `GEOSGeometry` with GeoJSON.
-                else:
+                if not coords:
                     self.stderr.write(f"No coordinates for {name}. Skipping…")
                     continue
+                longitude, latitude = coords["coordinates"]
 
                 post_codes = item["codesPostaux"]
                 code_insee = item["code"]
@@ -98,17 +158,27 @@ class Command(BaseCommand):
                 self.logger.debug(department)
                 self.logger.debug(coords)
 
-                if not dry_run:
-                    City.objects.update_or_create(
-                        slug=slug,
-                        defaults={
-                            "department": department,
-                            "name": name,
-                            "post_codes": post_codes,
-                            "code_insee": code_insee,
-                            "coords": coords,
-                        },
-                    )
+                # A slug can't be upserted twice in the same statement: last one wins.
+                cities[slug] = (
+                    name,
+                    slug,
+                    department,
+                    post_codes,
+                    code_insee,
+                    longitude,
+                    latitude,
+                )
+
+                if len(cities) >= CHUNK_SIZE:
+                    total += self.upsert(cities.values(), dry_run)
+                    cities = {}
+                    self.stdout.write(f"Creating cities… {total}")
+
+            total += self.upsert(cities.values(), dry_run)
+
+        if not dry_run:
+            invalidate_cities_index()
 
         self.stdout.write("-" * 80)
+        self.stdout.write(f"{total} cities imported.")
         self.stdout.write("Done.")
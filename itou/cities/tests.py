@@ -1,7 +1,25 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
 from django.test import TestCase
 
 from itou.cities.factories import create_test_cities
+from itou.cities.index import (
+    CitiesIndex,
+    get_cities_index,
+    get_trigrams,
+    invalidate_cities_index,
+)
+from itou.cities.management.commands.import_cities import (
+    Command as ImportCitiesCommand,
+    iter_json_array,
+)
 from itou.cities.models import City
+from itou.utils.models import IndexVersion
 
 
 class FixturesTest(TestCase):
@@ -11,3 +29,112 @@ class FixturesTest(TestCase):
         self.assertEqual(City.objects.filter(department="62").count(), 10)
         self.assertEqual(City.objects.filter(department="67").count(), 10)
         self.assertEqual(City.objects.filter(department="93").count(), 10)
+
+
+class CitiesIndexTest(TestCase):
+    def test_get_trigrams(self):
+        # Same as `SELECT show_trgm('Saint-Dié');` in PostgreSQL.
+        self.assertEqual(
+            get_trigrams("Saint-Dié"),
+            {"  s", " sa", "sai", "ain", "int", "nt ", "  d", " di", "dié", "ié "},
+        )
+
+    def test_search(self):
+        index = CitiesIndex(
+            [
+                ("Strasbourg", "strasbourg-67", "Strasbourg (67)"),
+                ("Schiltigheim", "schiltigheim-67", "Schiltigheim (67)"),
+            ]
+        )
+        self.assertEqual(
+            index.search("strasbour"),
+            [{"value": "Strasbourg (67)", "slug": "strasbourg-67"}],
+        )
+        self.assertEqual(index.search("paris"), [])
+        # Slugs are indexed too.
+        self.assertEqual(
+            [city["slug"] for city in index.search("67")],
+            ["strasbourg-67", "schiltigheim-67"],
+        )
+        # Results are copies.
+        index.search("strasbour")[0]["value"] = "Paris"
+        self.assertEqual(index.cities[0]["value"], "Strasbourg (67)")
+        self.assertEqual(index.search("-"), [])
+
+    def test_invalidate(self):
+        create_test_cities(["67"], num_per_department=1)
+        index = get_cities_index()
+        self.assertEqual(len(index.cities), 1)
+        # The index is reused while cities are unchanged.
+        with self.assertNumQueries(0):
+            self.assertIs(get_cities_index(), index)
+        City.objects.all().delete()
+        invalidate_cities_index()
+        self.assertEqual(len(get_cities_index().cities), 0)
+
+    def test_shared_version(self):
+        create_test_cities(["67"], num_per_department=1)
+        index = get_cities_index()
+        # Cities modified by another process.
+        IndexVersion.objects.increment("cities")
+        City.objects.all().delete()
+        # The version is only checked every `CHECK_INTERVAL` seconds.
+        self.assertIs(get_cities_index(), index)
+        with mock.patch("itou.utils.indexes.time.monotonic", return_value=10 ** 9):
+            self.assertEqual(len(get_cities_index().cities), 0)
+
+
+class ImportCitiesTest(TestCase):
+    def test_iter_json_array(self):
+        items = [{"nom": "Strasbourg", "code": str(i)} for i in range(10)]
+        content = json.dumps(items, indent=2)
+        # Objects span several chunks.
+        for chunk_size in [1, 7, len(content)]:
+            with self.subTest(chunk_size=chunk_size):
+                f = io.StringIO(content)
+                self.assertEqual(list(iter_json_array(f, chunk_size)), items)
+        self.assertEqual(list(iter_json_array(io.StringIO(" [ ] "))), [])
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_array(io.StringIO('[{"nom": '), chunk_size=4))
+
+    def test_upsert(self):
+        command = ImportCitiesCommand()
+        city = ("Strasbourg", "strasbourg-67", "67", ["67000"], "67482", 7.75, 48.57)
+        self.assertEqual(command.upsert([city]), 1)
+        # Conflicting slugs are updated.
+        city = ("Strasbourg", "strasbourg-67", "67", ["67100"], "67482", 7.76, 48.58)
+        command.upsert([city])
+        city = City.objects.get()
+        self.assertEqual(city.post_codes, ["67100"])
+        self.assertAlmostEqual(city.longitude, 7.76)
+        self.assertAlmostEqual(city.latitude, 48.58)
+        # Nothing is written in dry run mode.
+        city = ("Colmar", "colmar-68", "68", ["68000"], "68066", 7.35, 48.08)
+        self.assertEqual(command.upsert([city], dry_run=True), 1)
+        self.assertEqual(City.objects.count(), 1)
+
+    def test_command(self):
+        items = [
+            {
+                "nom": "Strasbourg",
+                "code": "67482",
+                "codeDepartement": "67",
+                "codesPostaux": ["67000"],
+                "centre": {"type": "Point", "coordinates": [7.75, 48.57]},
+            },
+            # Skipped.
+            {"nom": "Nulle part", "code": "00000", "codesPostaux": []},
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cities.json")
+            with open(path, "w") as f:
+                json.dump(items, f)
+            with mock.patch(
+                "itou.cities.management.commands.import_cities.CITIES_JSON_FILE", path
+            ):
+                call_command(
+                    "import_cities", stdout=io.StringIO(), stderr=io.StringIO()
+                )
+        city = City.objects.get()
+        self.assertEqual(city.slug, "strasbourg-67")
+        self.assertEqual(city.code_insee, "67482")
@@ -0,0 +1,38 @@
+from django.contrib import admin
+from django.utils.translation import gettext as _
+
+from itou.emails import models
+
+
+class SentFilter(admin.SimpleListFilter):
+    title = _("Envoyé")
+    parameter_name = "is_sent"
+
+    def lookups(self, request, model_admin):
+        return (("yes", _("Oui")), ("no", _("Non")))
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == "yes":
+            return queryset.exclude(sent_at=None)
+        if value == "no":
+            return queryset.filter(sent_at=None)
+        return queryset
+
+
+@admin.register(models.OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    date_hierarchy = "created_at"
+    list_display = ("id", "__str__", "created_at", "sent_at", "attempts")
+    list_filter = (SentFilter, "attempts")
+    readonly_fields = (
+        "message",
+        "dedup_key",
+        "created_at",
+        "sent_at",
+        "attempts",
+        "last_error",
+    )
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from itou.emails.models import OutboxEmail
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    Store emails in the outbox table instead of sending them.
+
+    Rows are written with the current database connection, i.e. inside the
+    transaction of the request (`ATOMIC_REQUESTS`), so the user doesn't wait
+    for the email provider. Emails are then sent by the `send_outbox_emails`
+    management command through `settings.OUTBOX_EMAIL_BACKEND`.
+    """
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        outbox_emails = []
+        direct_messages = []
+        for email_message in email_messages:
+            if not email_message.recipients():
+                continue
+            if email_message.attachments:
+                direct_messages.append(email_message)
+                continue
+            outbox_emails.append(OutboxEmail.from_email_message(email_message))
+        OutboxEmail.objects.bulk_create(outbox_emails, ignore_conflicts=True)
+        sent_count = len(outbox_emails)
+        if direct_messages:
+            # Attachments can't be stored in the outbox.
+            connection = get_connection(
+                settings.OUTBOX_EMAIL_BACKEND, fail_silently=self.fail_silently
+            )
+            sent_count += connection.send_messages(direct_messages) or 0
+        return sent_count
@@ -0,0 +1,129 @@
+import logging
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from itou.emails.models import OutboxEmail
+
+
+class Command(BaseCommand):
+    """
+    Send the emails stored in the outbox.
+
+    Meant to be run frequently (e.g. every minute by a cron job). Several
+    workers can run at the same time: rows being sent are locked and skipped
+    by the other workers.
+
+    Failed emails are retried later with an exponential backoff, up to
+    `OutboxEmail.MAX_ATTEMPTS` times. Sent emails are purged after
+    `OutboxEmail.SENT_RETENTION`.
+
+    To debug:
+        django-admin send_outbox_emails --dry-run
+        django-admin send_outbox_emails --dry-run --verbosity=2
+
+    To send emails:
+        django-admin send_outbox_emails
+    """
+
+    help = "Send the emails stored in the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            dest="dry_run",
+            action="store_true",
+            help="Only print emails to send",
+        )
+        parser.add_argument(
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=100,
+            help="Number of emails sent per transaction",
+        )
+
+    def set_logger(self, verbosity):
+        """
+        Set logger level based on the verbosity option.
+        """
+        handler = logging.StreamHandler(self.stdout)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.propagate = False
+        self.logger.addHandler(handler)
+
+        self.logger.setLevel(logging.INFO)
+        if verbosity > 1:
+            self.logger.setLevel(logging.DEBUG)
+
+    def handle(self, dry_run=False, batch_size=100, **options):
+
+        self.set_logger(options.get("verbosity"))
+
+        if dry_run:
+            for outbox_email in OutboxEmail.objects.due().order_by("send_after"):
+                self.logger.info(
+                    f"{outbox_email.id} - {outbox_email.message['to']} - {outbox_email}"
+                )
+            self.logger.info(
+                f"{OutboxEmail.objects.expired().count()} sent emails to purge."
+            )
+            return
+
+        sent_count = failed_count = 0
+        while True:
+            sent, failed = self.send_batch(batch_size)
+            sent_count += sent
+            failed_count += failed
+            if sent + failed < batch_size:
+                break
+
+        purged_count, _ = OutboxEmail.objects.expired().delete()
+
+        self.stdout.write("-" * 80)
+        self.stdout.write(f"{sent_count} emails sent, {failed_count} failed.")
+        self.stdout.write(f"{purged_count} sent emails purged.")
+        self.stdout.write("Done.")
+
+    @transaction.atomic
+    def send_batch(self, batch_size):
+        """
+        Send a batch of due emails and return `(sent_count, failed_count)`.
+
+        Each email is sent separately so that a failure doesn't prevent
+        the others from being sent.
+        """
+        outbox_emails = list(
+            OutboxEmail.objects.due()
+            .select_for_update(skip_locked=True)
+            .order_by("send_after")[:batch_size]
+        )
+        if not outbox_emails:
+            return 0, 0
+
+        connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+        sent, failed = [], []
+        with connection:
+            for outbox_email in outbox_emails:
+                try:
+                    connection.send_messages(
+                        [outbox_email.to_email_message(connection=connection)]
+                    )
+                except Exception as e:
+                    outbox_email.mark_as_failed(repr(e))
+                    failed.append(outbox_email)
+                    self.logger.warning(f"{outbox_email.id} - {e!r}")
+                else:
+                    outbox_email.sent_at = timezone.now()
+                    sent.append(outbox_email)
+                    self.logger.debug(f"{outbox_email.id} - sent")
+
+        OutboxEmail.objects.bulk_update(sent, ["sent_at"])
+        OutboxEmail.objects.bulk_update(
+            failed, ["attempts", "last_error", "send_after"]
+        )
+        return len(sent), len(failed)
@@ -0,0 +1,146 @@
+import datetime
+import hashlib
+import json
+
+from django.contrib.postgres.fields import JSONField
+from django.core.mail import EmailMultiAlternatives
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxEmailQuerySet(models.QuerySet):
+    def pending(self):
+        return self.filter(sent_at=None, attempts__lt=self.model.MAX_ATTEMPTS)
+
+    def due(self):
+        return self.pending().filter(send_after__lte=timezone.now())
+
+    def expired(self):
+        """
+        Sent emails older than `OutboxEmail.SENT_RETENTION`, to be purged.
+        """
+        return self.filter(sent_at__lt=timezone.now() - self.model.SENT_RETENTION)
+
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be sent (transactional outbox).
+
+    Emails are stored in the same transaction as the state change that
+    triggered them: they are never sent if the transaction is rolled back
+    and they can't be lost once it's committed.
+    They are actually sent by the `send_outbox_emails` management command.
+    """
+
+    # Delay before the first retry, doubled at each failed attempt.
+    RETRY_BASE_DELAY = datetime.timedelta(minutes=1)
+    MAX_ATTEMPTS = 8
+
+    # Identical messages enqueued in the same window (e.g. a form submitted
+    # twice) are stored only once.
+    DEDUP_WINDOW = datetime.timedelta(minutes=5)
+
+    # Sent emails are purged by `send_outbox_emails` after this delay.
+    SENT_RETENTION = datetime.timedelta(days=30)
+
+    message = JSONField(verbose_name=_("Message"), encoder=DjangoJSONEncoder)
+    # Shared by identical messages enqueued in the same `DEDUP_WINDOW`.
+    dedup_key = models.CharField(
+        verbose_name=_("Clé de dédoublonnage"), max_length=64, unique=True
+    )
+    created_at = models.DateTimeField(
+        verbose_name=_("Date de création"), default=timezone.now
+    )
+    send_after = models.DateTimeField(
+        verbose_name=_("Envoi à partir du"), default=timezone.now
+    )
+    sent_at = models.DateTimeField(
+        verbose_name=_("Date d'envoi"), null=True, blank=True, db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name=_("Nombre de tentatives"), default=0
+    )
+    last_error = models.TextField(verbose_name=_("Dernière erreur"), blank=True)
+
+    objects = models.Manager.from_queryset(OutboxEmailQuerySet)()
+
+    class Meta:
+        verbose_name = _("Email en attente d'envoi")
+        verbose_name_plural = _("Emails en attente d'envoi")
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["send_after"],
+                name="emails_outbox_pending_idx",
+                condition=models.Q(sent_at=None),
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.message.get('subject', '')}"
+
+    @staticmethod
+    def serialize_message(email_message):
+        """
+        Return a JSON-serializable dict of the given `EmailMessage`.
+        Attachments are not supported.
+        """
+        if email_message.attachments:
+            raise ValueError("Attachments can't be stored in the outbox.")
+        return {
+            "subject": email_message.subject,
+            "body": email_message.body,
+            "from_email": email_message.from_email,
+            "to": list(email_message.to),
+            "cc": list(email_message.cc),
+            "bcc": list(email_message.bcc),
+            "reply_to": list(email_message.reply_to),
+            "headers": email_message.extra_headers,
+            "alternatives": [
+                list(alternative)
+                for alternative in getattr(email_message, "alternatives", [])
+            ],
+        }
+
+    @classmethod
+    def from_email_message(cls, email_message):
+        message = cls.serialize_message(email_message)
+        now = timezone.now()
+        # Index of the window, messages enqueued on both sides of a window
+        # boundary are both sent.
+        window = int(now.timestamp() // cls.DEDUP_WINDOW.total_seconds())
+        dedup_data = json.dumps(
+            [window, message], sort_keys=True, cls=DjangoJSONEncoder
+        )
+        return cls(
+            message=message,
+            dedup_key=hashlib.sha256(dedup_data.encode()).hexdigest(),
+            created_at=now,
+            send_after=now,
+        )
+
+    def to_email_message(self, connection=None):
+        alternatives = [
+            tuple(alternative) for alternative in self.message["alternatives"]
+        ]
+        return EmailMultiAlternatives(
+            subject=self.message["subject"],
+            body=self.message["body"],
+            from_email=self.message["from_email"],
+            to=self.message["to"],
+            cc=self.message["cc"],
+            bcc=self.message["bcc"],
+            reply_to=self.message["reply_to"],
+            headers=self.message["headers"],
+            alternatives=alternatives,
+            connection=connection,
+        )
+
+    def mark_as_failed(self, error):
+        self.attempts += 1
+        self.last_error = error
+        self.send_after = timezone.now() + self.RETRY_BASE_DELAY * 2 ** (
+            self.attempts - 1
+        )
@@ -0,0 +1,87 @@
+import datetime
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from itou.emails.models import OutboxEmail
+
+
+@override_settings(
+    EMAIL_BACKEND="itou.emails.backends.OutboxEmailBackend",
+    OUTBOX_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+)
+class OutboxEmailTest(TestCase):
+    def send_email(self, subject="Sujet", to="jean@example.com"):
+        mail.EmailMessage(subject=subject, body="Corps", to=[to]).send()
+
+    def test_emails_are_stored_in_the_outbox(self):
+        self.send_email()
+        self.assertEqual(len(mail.outbox), 0)
+        outbox_email = OutboxEmail.objects.get()
+        self.assertEqual(outbox_email.message["subject"], "Sujet")
+        self.assertEqual(outbox_email.message["to"], ["jean@example.com"])
+        self.assertIsNone(outbox_email.sent_at)
+
+    def test_duplicated_emails_are_stored_once(self):
+        now = timezone.now()
+        with mock.patch("itou.emails.models.timezone.now", return_value=now):
+            self.send_email()
+            self.send_email()
+            self.send_email(to="marie@example.com")
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+        # The same email sent again later is a legitimate one.
+        later = now + OutboxEmail.DEDUP_WINDOW
+        with mock.patch("itou.emails.models.timezone.now", return_value=later):
+            self.send_email()
+        self.assertEqual(OutboxEmail.objects.count(), 3)
+
+    def test_send_outbox_emails(self):
+        self.send_email()
+        self.send_email(to="marie@example.com")
+        call_command("send_outbox_emails", batch_size=1, stdout=mock.Mock())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].subject, "Sujet")
+        self.assertFalse(OutboxEmail.objects.pending().exists())
+
+        # Sent emails are not sent again.
+        call_command("send_outbox_emails", stdout=mock.Mock())
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_send_outbox_emails_purge(self):
+        self.send_email()
+        self.send_email(to="marie@example.com")
+        call_command("send_outbox_emails", stdout=mock.Mock())
+        OutboxEmail.objects.filter(message__to=["jean@example.com"]).update(
+            sent_at=timezone.now() - OutboxEmail.SENT_RETENTION * 2
+        )
+        call_command("send_outbox_emails", stdout=mock.Mock())
+        self.assertEqual(OutboxEmail.objects.get().message["to"], ["marie@example.com"])
+
+    def test_send_outbox_emails_retry(self):
+        self.send_email()
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=ConnectionError("Mailjet is down"),
+        ):
+            call_command("send_outbox_emails", stdout=mock.Mock())
+
+        outbox_email = OutboxEmail.objects.get()
+        self.assertIsNone(outbox_email.sent_at)
+        self.assertEqual(outbox_email.attempts, 1)
+        self.assertIn("Mailjet is down", outbox_email.last_error)
+        self.assertGreater(outbox_email.send_after, timezone.now())
+
+        # Not due yet.
+        call_command("send_outbox_emails", stdout=mock.Mock())
+        self.assertEqual(len(mail.outbox), 0)
+
+        outbox_email.send_after = timezone.now() - datetime.timedelta(seconds=1)
+        outbox_email.save()
+        call_command("send_outbox_emails", stdout=mock.Mock())
+        self.assertEqual(len(mail.outbox), 1)
+        outbox_email.refresh_from_db()
+        self.assertIsNotNone(outbox_email.sent_at)
@@ -1,4 +1,4 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.translation import gettext as _
 
 from itou.job_applications import models
@@ -41,9 +41,22 @@ class ApprovalNumberSentByEmailFilter(admin.SimpleListFilter):
         return queryset
 
 
+class ManualApprovalDeliveryRequiredFilter(admin.SimpleListFilter):
+    title = _("PASS IAE à délivrer manuellement")
+    parameter_name = "manual_approval_delivery_required"
+
+    def lookups(self, request, model_admin):
+        return (("yes", _("Oui")),)
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.manual_approval_delivery_required()
+        return queryset
+
+
 @admin.register(models.JobApplication)
 class JobApplicationAdmin(admin.ModelAdmin):
-    actions = ("bulk_send_approval_by_email",)
+    actions = ("bulk_send_approval_by_email", "bulk_issue_approvals")
     date_hierarchy = "created_at"
     list_display = ("id", "state", "sender_kind", "created_at")
     raw_id_fields = (
@@ -57,6 +70,7 @@ class JobApplicationAdmin(admin.ModelAdmin):
     exclude = ("selected_jobs",)
     list_filter = (
         ApprovalNumberSentByEmailFilter,
+        ManualApprovalDeliveryRequiredFilter,
         "sender_kind",
         "state",
         "approval_delivery_mode",
@@ -78,6 +92,19 @@ class JobApplicationAdmin(admin.ModelAdmin):
 
     bulk_send_approval_by_email.short_description = _("Envoyer le PASS IAE par email")
 
+    def bulk_issue_approvals(self, request, queryset):
+        issued, skipped = queryset.issue_approvals(deliverer=request.user)
+        if issued:
+            messages.success(
+                request, _(f"{len(issued)} PASS IAE créés et envoyés par email.")
+            )
+        for job_application, reason in skipped:
+            messages.warning(request, f"{job_application.pk} : {reason}")
+
+    bulk_issue_approvals.short_description = _(
+        "Délivrer un PASS IAE et l'envoyer par email"
+    )
+
 
 @admin.register(models.JobApplicationTransitionLog)
 class JobApplicationTransitionLogAdmin(admin.ModelAdmin):
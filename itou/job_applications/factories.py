@@ -84,14 +84,9 @@ class JobApplicationSentByPrescriberOrganizationFactory(JobApplicationFactory):
     sender_prescriber_organization = factory.SubFactory(
         PrescriberOrganizationWithMembershipFactory
     )
-
-    @factory.post_generation
-    def set_sender(self, create, extracted, **kwargs):
-        if not create:
-            # Simple build, do nothing.
-            return
-        self.sender = self.sender_prescriber_organization.members.first()
-        self.save()
+    sender = factory.LazyAttribute(
+        lambda o: o.sender_prescriber_organization.members.first()
+    )
 
 
 class JobApplicationSentByAuthorizedPrescriberOrganizationFactory(
@@ -103,14 +98,9 @@ class JobApplicationSentByAuthorizedPrescriberOrganizationFactory(
     sender_prescriber_organization = factory.SubFactory(
         AuthorizedPrescriberOrganizationWithMembershipFactory
     )
-
-    @factory.post_generation
-    def set_sender(self, create, extracted, **kwargs):
-        if not create:
-            # Simple build, do nothing.
-            return
-        self.sender = self.sender_prescriber_organization.members.first()
-        self.save()
+    sender = factory.LazyAttribute(
+        lambda o: o.sender_prescriber_organization.members.first()
+    )
 
 
 class JobApplicationWithApprovalFactory(JobApplicationFactory):
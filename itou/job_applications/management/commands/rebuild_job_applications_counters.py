@@ -0,0 +1,97 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from itou.job_applications.models import JobApplicationCounter
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the job applications counters of SIAEs.
+
+    Counters are maintained when job applications are saved or deleted but
+    they can drift when job applications are modified without calling these
+    methods (e.g. with a queryset update or a cascade delete).
+
+    To debug:
+        django-admin rebuild_job_applications_counters --dry-run
+        django-admin rebuild_job_applications_counters --dry-run --verbosity=2
+
+    To rebuild counters:
+        django-admin rebuild_job_applications_counters
+    """
+
+    help = "Rebuild the job applications counters of SIAEs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            dest="dry_run",
+            action="store_true",
+            help="Only print counters to fix",
+        )
+
+    def set_logger(self, verbosity):
+        """
+        Set logger level based on the verbosity option.
+        """
+        handler = logging.StreamHandler(self.stdout)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.propagate = False
+        self.logger.addHandler(handler)
+
+        self.logger.setLevel(logging.INFO)
+        if verbosity > 1:
+            self.logger.setLevel(logging.DEBUG)
+
+    @transaction.atomic
+    def handle(self, dry_run=False, **options):
+
+        self.set_logger(options.get("verbosity"))
+
+        if not dry_run:
+            # Block concurrent increments until counters are rebuilt.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOCK TABLE {JobApplicationCounter._meta.db_table} "
+                    f"IN SHARE ROW EXCLUSIVE MODE"
+                )
+
+        actual_counts = JobApplicationCounter.objects.compute()
+        counts = {
+            (siae_id, state): count
+            for siae_id, state, count in JobApplicationCounter.objects.values_list(
+                "siae_id", "state", "count"
+            )
+        }
+
+        missing = 0
+        wrong = 0
+
+        for key, count in actual_counts.items():
+            siae_id, state = key
+            stored_count = counts.pop(key, None)
+            if stored_count is None:
+                missing += 1
+                self.logger.debug(f"Missing counter {siae_id} {state}: {count}")
+            elif stored_count != count:
+                wrong += 1
+                self.logger.debug(
+                    f"Wrong counter {siae_id} {state} {stored_count}: {count}"
+                )
+
+        # Remaining counters have no job applications anymore.
+        for (siae_id, state), stored_count in counts.items():
+            if stored_count:
+                wrong += 1
+                self.logger.debug(f"Wrong counter {siae_id} {state} {stored_count}: 0")
+
+        self.stdout.write(f"{missing} counters to create, {wrong} counters to fix.")
+
+        if not dry_run:
+            JobApplicationCounter.objects.rebuild()
+
+        self.stdout.write("-" * 80)
+        self.stdout.write("Done.")
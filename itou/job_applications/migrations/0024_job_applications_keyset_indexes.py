@@ -0,0 +1,34 @@
+# Generated by Django 2.2.10 on 2020-03-25 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("job_applications", "0023_set_default_approval_number_delivered_by")
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="jobapplication",
+            index=models.Index(
+                fields=["to_siae", "-created_at", "-id"],
+                name="job_app_to_siae_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobapplication",
+            index=models.Index(
+                fields=["sender_prescriber_organization", "-created_at", "-id"],
+                name="job_app_sender_org_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobapplication",
+            index=models.Index(
+                fields=["sender", "-created_at", "-id"],
+                name="job_app_sender_created_idx",
+            ),
+        ),
+    ]
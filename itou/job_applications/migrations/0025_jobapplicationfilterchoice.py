@@ -0,0 +1,118 @@
+# Generated by Django 2.2.10 on 2020-03-26 14:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BACKFILL_SQL = """
+INSERT INTO job_applications_jobapplicationfilterchoice (siae_id, kind, object_id)
+SELECT DISTINCT to_siae_id, 'sender', sender_id
+FROM job_applications_jobapplication WHERE sender_id IS NOT NULL
+UNION
+SELECT DISTINCT to_siae_id, 'job_seeker', job_seeker_id
+FROM job_applications_jobapplication
+UNION
+SELECT DISTINCT to_siae_id, 'sender_prescriber_organization', sender_prescriber_organization_id
+FROM job_applications_jobapplication WHERE sender_prescriber_organization_id IS NOT NULL;
+
+INSERT INTO job_applications_jobapplicationfilterchoice (prescriber_organization_id, kind, object_id)
+SELECT DISTINCT sender_prescriber_organization_id, 'sender', sender_id
+FROM job_applications_jobapplication
+WHERE sender_prescriber_organization_id IS NOT NULL AND sender_id IS NOT NULL
+UNION
+SELECT DISTINCT sender_prescriber_organization_id, 'job_seeker', job_seeker_id
+FROM job_applications_jobapplication
+WHERE sender_prescriber_organization_id IS NOT NULL
+UNION
+SELECT DISTINCT sender_prescriber_organization_id, 'sender_prescriber_organization', sender_prescriber_organization_id
+FROM job_applications_jobapplication
+WHERE sender_prescriber_organization_id IS NOT NULL;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("prescribers", "0009_auto_20191203_1259"),
+        ("siaes", "0016_auto_20200109_1010"),
+        ("job_applications", "0024_job_applications_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobApplicationFilterChoice",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("sender", "Émetteur"),
+                            ("job_seeker", "Candidat"),
+                            (
+                                "sender_prescriber_organization",
+                                "Organisation du prescripteur",
+                            ),
+                        ],
+                        max_length=30,
+                        verbose_name="Type",
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.PositiveIntegerField(verbose_name="ID de l'objet"),
+                ),
+                (
+                    "prescriber_organization",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="prescribers.PrescriberOrganization",
+                        verbose_name="Organisation du prescripteur émettrice",
+                    ),
+                ),
+                (
+                    "siae",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="siaes.Siae",
+                        verbose_name="SIAE destinataire",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Choix des filtres des candidatures",
+                "verbose_name_plural": "Choix des filtres des candidatures",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="jobapplicationfilterchoice",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(siae__isnull=False),
+                fields=("siae", "kind", "object_id"),
+                name="job_app_filter_choice_siae_uniq",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="jobapplicationfilterchoice",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(prescriber_organization__isnull=False),
+                fields=("prescriber_organization", "kind", "object_id"),
+                name="job_app_filter_choice_org_uniq",
+            ),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 2.2.10 on 2020-03-27 11:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BACKFILL_SQL = """
+INSERT INTO job_applications_jobapplicationcounter (siae_id, state, count)
+SELECT to_siae_id, state, COUNT(*)
+FROM job_applications_jobapplication
+GROUP BY to_siae_id, state;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("siaes", "0016_auto_20200109_1010"),
+        ("job_applications", "0025_jobapplicationfilterchoice"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobApplicationCounter",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("new", "Nouvelle candidature"),
+                            ("processing", "Candidature à l'étude"),
+                            ("postponed", "Embauche pour plus tard"),
+                            ("accepted", "Embauche acceptée"),
+                            ("refused", "Embauche déclinée"),
+                            ("obsolete", "Embauché ailleurs"),
+                        ],
+                        max_length=20,
+                        verbose_name="État",
+                    ),
+                ),
+                (
+                    "count",
+                    models.IntegerField(
+                        default=0, verbose_name="Nombre de candidatures"
+                    ),
+                ),
+                (
+                    "siae",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="job_applications_counters",
+                        to="siaes.Siae",
+                        verbose_name="SIAE destinataire",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Compteur de candidatures",
+                "verbose_name_plural": "Compteurs de candidatures",
+                "unique_together": {("siae", "state")},
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
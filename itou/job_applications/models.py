@@ -3,14 +3,16 @@ import uuid
 
 from django.conf import settings
 from django.core import mail
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Prefetch
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from django_xworkflows import models as xwf_models
 
-from itou.approvals.models import Approval
+from itou.approvals.models import Approval, PoleEmploiApproval
+from itou.siaes.models import Siae
 from itou.utils.emails import get_email_text_template
 from itou.utils.perms.user import KIND_JOB_SEEKER, KIND_PRESCRIBER, KIND_SIAE_STAFF
 
@@ -116,6 +118,148 @@ class JobApplicationQuerySet(models.QuerySet):
         past_dt = timezone.now() - timezone.timedelta(hours=hours)
         return self.filter(created_at__gte=past_dt)
 
+    def manual_approval_delivery_required(self):
+        """
+        Accepted job applications waiting for an approval to be delivered
+        by an Itou staff member, see `email_accept_trigger_manual_approval`.
+        """
+        return self.filter(
+            state=JobApplicationWorkflow.STATE_ACCEPTED,
+            approval=None,
+            to_siae__kind__in=Siae.ELIGIBILITY_REQUIRED_KINDS,
+        )
+
+    @transaction.atomic
+    def issue_approvals(self, deliverer):
+        """
+        Deliver an approval for each job application of the batch at once.
+
+        The batch is validated with a few set-based queries, numbers are
+        reserved in one step per year, `Approval` rows are bulk inserted
+        and emails are sent in a single batch.
+
+        Returns a `(issued, skipped)` tuple, `skipped` being a list of
+        `(job_application, reason)` tuples.
+        """
+        job_applications = list(
+            self.select_for_update(of=("self",))
+            .select_related("job_seeker", "to_siae")
+            .prefetch_related(
+                Prefetch(
+                    "logs",
+                    queryset=JobApplicationTransitionLog.objects.filter(
+                        to_state=JobApplicationWorkflow.STATE_ACCEPTED
+                    ).select_related("user"),
+                    to_attr="accepted_logs",
+                )
+            )
+            .order_by("created_at")
+        )
+
+        job_seekers = {ja.job_seeker for ja in job_applications}
+        users_with_approval = set(
+            Approval.objects.filter(user__in=job_seekers)
+            .valid()
+            .values_list("user_id", flat=True)
+        )
+        pe_ids_with_pe_approval = set(
+            PoleEmploiApproval.objects.filter(
+                pole_emploi_id__in={
+                    job_seeker.pole_emploi_id
+                    for job_seeker in job_seekers
+                    if job_seeker.pole_emploi_id
+                }
+            )
+            .valid()
+            .values_list("pole_emploi_id", "birthdate")
+        )
+
+        to_issue = []
+        skipped = []
+        for job_application in job_applications:
+            job_seeker = job_application.job_seeker
+            reason = None
+            if (
+                not job_application.state.is_accepted
+                or job_application.approval_id
+                or not job_application.hiring_start_at
+                or not job_application.to_siae.is_subject_to_eligibility_rules
+            ):
+                reason = _("Aucun PASS IAE à délivrer pour cette candidature.")
+            elif not job_application.accepted_logs:
+                reason = _("Impossible de déterminer qui a accepté la candidature.")
+            elif not job_application.accepted_logs[0].user:
+                # The user has been deleted since.
+                reason = _("L'utilisateur qui a accepté la candidature n'existe plus.")
+            elif job_seeker.pk in users_with_approval:
+                reason = _("Le candidat a déjà un PASS IAE en cours de validité.")
+            elif (job_seeker.pole_emploi_id, job_seeker.birthdate) in (
+                pe_ids_with_pe_approval
+            ):
+                reason = _(
+                    "Le candidat a un agrément Pôle emploi en cours de validité."
+                )
+            if reason:
+                skipped.append((job_application, reason))
+                continue
+            # Only one approval per job seeker.
+            users_with_approval.add(job_seeker.pk)
+            to_issue.append(job_application)
+
+        approvals = []
+        years = sorted({ja.hiring_start_at.year for ja in to_issue})
+        for year in years:
+            batch = [ja for ja in to_issue if ja.hiring_start_at.year == year]
+            numbers = Approval.reserve_numbers(batch[0].hiring_start_at, len(batch))
+            for job_application, number in zip(batch, numbers):
+                job_application.approval = Approval(
+                    start_at=job_application.hiring_start_at,
+                    end_at=Approval.get_default_end_date(
+                        job_application.hiring_start_at
+                    ),
+                    number=number,
+                    user=job_application.job_seeker,
+                    created_by=deliverer,
+                )
+                approvals.append(job_application.approval)
+        Approval.objects.bulk_create(approvals)
+
+        issued = to_issue
+        now = timezone.now()
+        emails = []
+        for job_application in issued:
+            # The approval had no primary key yet when it was assigned.
+            job_application.approval_id = job_application.approval.pk
+            job_application.approval_number_sent_by_email = True
+            job_application.approval_number_sent_at = now
+            job_application.approval_delivery_mode = (
+                JobApplication.APPROVAL_DELIVERY_MODE_MANUAL
+            )
+            job_application.approval_number_delivered_by = deliverer
+            job_application.updated_at = now
+            emails.append(
+                job_application.email_approval_number(
+                    job_application.accepted_logs[0].user
+                )
+            )
+        JobApplication.objects.bulk_update(
+            issued,
+            [
+                "approval",
+                "approval_number_sent_by_email",
+                "approval_number_sent_at",
+                "approval_delivery_mode",
+                "approval_number_delivered_by",
+                "updated_at",
+            ],
+        )
+
+        # Send emails in batch.
+        connection = mail.get_connection()
+        connection.send_messages(emails)
+
+        return issued, skipped
+
 
 class JobApplication(xwf_models.WorkflowEnabled, models.Model):
     """
@@ -315,13 +459,69 @@ class JobApplication(xwf_models.WorkflowEnabled, models.Model):
         verbose_name = _("Candidature")
         verbose_name_plural = _("Candidatures")
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination of the lists of job applications.
+            models.Index(
+                fields=["to_siae", "-created_at", "-id"],
+                name="job_app_to_siae_created_idx",
+            ),
+            models.Index(
+                fields=["sender_prescriber_organization", "-created_at", "-id"],
+                name="job_app_sender_org_created_idx",
+            ),
+            models.Index(
+                fields=["sender", "-created_at", "-id"],
+                name="job_app_sender_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return str(self.id)
 
     def save(self, *args, **kwargs):
         self.updated_at = timezone.now()
-        return super().save(*args, **kwargs)
+        adding = self._state.adding
+        with transaction.atomic():
+            stored_counter_key = None
+            update_fields = kwargs.get("update_fields")
+            if not adding and (
+                update_fields is None
+                or {"state", "to_siae", "to_siae_id"} & set(update_fields)
+            ):
+                # Lock the stored row so that concurrent updates of the same
+                # job application move the counters one after the other.
+                stored_counter_key = (
+                    JobApplication.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list("to_siae_id", "state")
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            if adding:
+                JobApplicationFilterChoice.objects.add_for_job_application(self)
+                JobApplicationCounter.objects.increment(
+                    self.to_siae_id, self.state.name
+                )
+            elif stored_counter_key:
+                self.update_counters(*stored_counter_key)
+
+    def update_counters(self, previous_siae_id, previous_state):
+        """
+        Move the job application from the counter of its previous SIAE and
+        state to the current one, e.g. after a transition or an admin edit.
+        """
+        if (previous_siae_id, previous_state) == (self.to_siae_id, self.state.name):
+            return
+        JobApplicationCounter.objects.increment(
+            previous_siae_id, previous_state, delta=-1
+        )
+        JobApplicationCounter.objects.increment(self.to_siae_id, self.state.name)
+
+    def delete(self, *args, **kwargs):
+        JobApplicationCounter.objects.increment(
+            self.to_siae_id, self.state.name, delta=-1
+        )
+        return super().delete(*args, **kwargs)
 
     @property
     def is_sent_by_proxy(self):
@@ -413,7 +613,7 @@ class JobApplication(xwf_models.WorkflowEnabled, models.Model):
                 new_approval = Approval(
                     start_at=self.hiring_start_at,
                     end_at=Approval.get_default_end_date(self.hiring_start_at),
-                    number=Approval.get_next_number(self.hiring_start_at),
+                    number=Approval.reserve_numbers(self.hiring_start_at)[0],
                     user=self.job_seeker,
                 )
                 new_approval.save()
@@ -569,3 +769,193 @@ class JobApplicationTransitionLog(xwf_models.BaseTransitionLog):
     def pretty_to_state(self):
         choices = dict(JobApplicationWorkflow.STATE_CHOICES)
         return choices[self.to_state]
+
+
+class JobApplicationFilterChoiceQuerySet(models.QuerySet):
+    def add_for_job_application(self, job_application):
+        """
+        Record the sender, job seeker and sender organization of a new
+        job application for its SIAE and its sender organization.
+        """
+        values = [
+            (self.model.KIND_SENDER, job_application.sender_id),
+            (self.model.KIND_JOB_SEEKER, job_application.job_seeker_id),
+            (
+                self.model.KIND_SENDER_PRESCRIBER_ORGANIZATION,
+                job_application.sender_prescriber_organization_id,
+            ),
+        ]
+        scopes = [{"siae_id": job_application.to_siae_id}]
+        if job_application.sender_prescriber_organization_id:
+            scopes.append(
+                {
+                    "prescriber_organization_id": job_application.sender_prescriber_organization_id
+                }
+            )
+        self.bulk_create(
+            [
+                self.model(kind=kind, object_id=object_id, **scope)
+                for scope in scopes
+                for kind, object_id in values
+                if object_id
+            ],
+            ignore_conflicts=True,
+        )
+
+    def object_ids(self, kind):
+        return self.filter(kind=kind).values("object_id")
+
+
+class JobApplicationFilterChoice(models.Model):
+    """
+    Distinct senders, job seekers and sender organizations of the job
+    applications received by an SIAE or sent by a prescriber organization.
+
+    Used to build the choices of the job applications filters without going
+    through the whole history of job applications. Rows are added when a job
+    application is created and are never removed.
+    """
+
+    KIND_SENDER = "sender"
+    KIND_JOB_SEEKER = "job_seeker"
+    KIND_SENDER_PRESCRIBER_ORGANIZATION = "sender_prescriber_organization"
+
+    KIND_CHOICES = (
+        (KIND_SENDER, _("Émetteur")),
+        (KIND_JOB_SEEKER, _("Candidat")),
+        (KIND_SENDER_PRESCRIBER_ORGANIZATION, _("Organisation du prescripteur")),
+    )
+
+    siae = models.ForeignKey(
+        "siaes.Siae",
+        verbose_name=_("SIAE destinataire"),
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    prescriber_organization = models.ForeignKey(
+        "prescribers.PrescriberOrganization",
+        verbose_name=_("Organisation du prescripteur émettrice"),
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    kind = models.CharField(verbose_name=_("Type"), max_length=30, choices=KIND_CHOICES)
+    # Primary key of a user or a prescriber organization, depending on `kind`.
+    object_id = models.PositiveIntegerField(verbose_name=_("ID de l'objet"))
+
+    objects = models.Manager.from_queryset(JobApplicationFilterChoiceQuerySet)()
+
+    class Meta:
+        verbose_name = _("Choix des filtres des candidatures")
+        verbose_name_plural = _("Choix des filtres des candidatures")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["siae", "kind", "object_id"],
+                condition=models.Q(siae__isnull=False),
+                name="job_app_filter_choice_siae_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["prescriber_organization", "kind", "object_id"],
+                condition=models.Q(prescriber_organization__isnull=False),
+                name="job_app_filter_choice_org_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class JobApplicationCounterQuerySet(models.QuerySet):
+    def increment(self, siae_id, state, delta=1):
+        """
+        Add `delta` to the counter of the given SIAE and state in a single
+        upsert query (concurrent transitions can't lose an update).
+        """
+        table = self.model._meta.db_table
+        sql = (
+            f"INSERT INTO {table} (siae_id, state, count) VALUES (%s, %s, %s) "
+            f"ON CONFLICT (siae_id, state) "
+            f"DO UPDATE SET count = {table}.count + EXCLUDED.count"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [siae_id, state, delta])
+
+    def get_count(self, siae, state):
+        return (
+            self.filter(siae=siae, state=state).values_list("count", flat=True).first()
+            or 0
+        )
+
+    def compute(self):
+        """
+        Return a `{(siae_id, state): count}` dict of the actual number of job
+        applications, computed from the `JobApplication` table.
+        """
+        rows = (
+            JobApplication.objects.order_by()
+            .values_list("to_siae_id", "state")
+            .annotate(count=models.Count("pk"))
+        )
+        return {(siae_id, state): count for siae_id, state, count in rows}
+
+    def rebuild(self):
+        """
+        Overwrite counters with the actual number of job applications.
+
+        Must be called in a transaction holding a lock on the counters table,
+        otherwise increments made by concurrent transactions could be lost.
+        """
+        table = self.model._meta.db_table
+        job_applications_table = JobApplication._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET count = 0 WHERE count != 0 AND NOT EXISTS ("
+                f"SELECT 1 FROM {job_applications_table} "
+                f"WHERE to_siae_id = {table}.siae_id AND state = {table}.state)"
+            )
+            cursor.execute(
+                f"INSERT INTO {table} (siae_id, state, count) "
+                f"SELECT to_siae_id, state, COUNT(*) FROM {job_applications_table} "
+                f"GROUP BY to_siae_id, state "
+                f"ON CONFLICT (siae_id, state) "
+                f"DO UPDATE SET count = EXCLUDED.count "
+                f"WHERE {table}.count != EXCLUDED.count"
+            )
+
+
+class JobApplicationCounter(models.Model):
+    """
+    Number of job applications received by an SIAE, per state.
+
+    Denormalized to avoid counting job applications on every dashboard load.
+    Maintained by `JobApplication.save()` (transitions are saved automatically)
+    and `JobApplication.delete()`. Queryset updates and deletes bypass them:
+    counters are rebuilt daily by the `rebuild_job_applications_counters`
+    management command.
+    """
+
+    siae = models.ForeignKey(
+        "siaes.Siae",
+        verbose_name=_("SIAE destinataire"),
+        on_delete=models.CASCADE,
+        related_name="job_applications_counters",
+    )
+    state = models.CharField(
+        verbose_name=_("État"),
+        max_length=20,
+        choices=JobApplicationWorkflow.STATE_CHOICES,
+    )
+    count = models.IntegerField(verbose_name=_("Nombre de candidatures"), default=0)
+
+    objects = models.Manager.from_queryset(JobApplicationCounterQuerySet)()
+
+    class Meta:
+        verbose_name = _("Compteur de candidatures")
+        verbose_name_plural = _("Compteurs de candidatures")
+        unique_together = ("siae", "state")
+
+    def __str__(self):
+        return f"{self.siae_id} {self.state} {self.count}"
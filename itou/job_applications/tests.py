@@ -1,9 +1,11 @@
 import datetime
+from unittest import mock
 
 from dateutil.relativedelta import relativedelta
 
 from django.conf import settings
 from django.core import mail
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import timezone
@@ -23,7 +25,12 @@ from itou.job_applications.factories import (
     JobApplicationSentBySiaeFactory,
     JobApplicationWithApprovalFactory,
 )
-from itou.job_applications.models import JobApplication, JobApplicationWorkflow
+from itou.job_applications.models import (
+    JobApplication,
+    JobApplicationCounter,
+    JobApplicationFilterChoice,
+    JobApplicationWorkflow,
+)
 from itou.siaes.factories import SiaeFactory
 from itou.siaes.models import Siae
 from itou.users.factories import JobSeekerFactory, UserFactory
@@ -141,6 +148,45 @@ class JobApplicationQuerySetTest(TestCase):
         self.assertEqual(len(unique_job_seekers), 2)
         self.assertEqual(type(unique_job_seekers[0]), get_user_model())
 
+    def test_filter_choices_are_added_on_creation(self):
+        job_application = JobApplicationSentByPrescriberOrganizationFactory()
+        JobApplicationSentByPrescriberOrganizationFactory(
+            to_siae=job_application.to_siae,
+            sender=job_application.sender,
+            sender_prescriber_organization=job_application.sender_prescriber_organization,
+        )
+        siae_choices = JobApplicationFilterChoice.objects.filter(
+            siae=job_application.to_siae
+        )
+        org_choices = JobApplicationFilterChoice.objects.filter(
+            prescriber_organization=job_application.sender_prescriber_organization
+        )
+
+        self.assertEqual(
+            list(siae_choices.object_ids(JobApplicationFilterChoice.KIND_SENDER)),
+            [{"object_id": job_application.sender.pk}],
+        )
+        self.assertEqual(
+            siae_choices.object_ids(JobApplicationFilterChoice.KIND_JOB_SEEKER).count(),
+            2,
+        )
+        self.assertEqual(
+            list(
+                siae_choices.object_ids(
+                    JobApplicationFilterChoice.KIND_SENDER_PRESCRIBER_ORGANIZATION
+                )
+            ),
+            [{"object_id": job_application.sender_prescriber_organization.pk}],
+        )
+        self.assertEqual(
+            org_choices.object_ids(JobApplicationFilterChoice.KIND_JOB_SEEKER).count(),
+            2,
+        )
+
+        # Updating a job application doesn't add choices.
+        job_application.save()
+        self.assertEqual(JobApplicationFilterChoice.objects.count(), 8)
+
 
 class JobApplicationFactoriesTest(TestCase):
     def test_job_application_factory(self):
@@ -592,3 +638,121 @@ class JobApplicationWorkflowTest(TestCase):
             self.assertEqual(len(mail.outbox), 1)
             self.assertIn("Candidature déclinée", mail.outbox[0].subject)
             mail.outbox = []
+
+    def test_counters(self):
+        job_application = JobApplicationFactory(state=JobApplicationWorkflow.STATE_NEW)
+        siae = job_application.to_siae
+        JobApplicationFactory(to_siae=siae, state=JobApplicationWorkflow.STATE_NEW)
+        counters = JobApplicationCounter.objects
+        self.assertEqual(counters.get_count(siae, JobApplicationWorkflow.STATE_NEW), 2)
+
+        job_application.process()
+        self.assertEqual(counters.get_count(siae, JobApplicationWorkflow.STATE_NEW), 1)
+        self.assertEqual(
+            counters.get_count(siae, JobApplicationWorkflow.STATE_PROCESSING), 1
+        )
+
+        job_application.refuse()
+        self.assertEqual(
+            counters.get_count(siae, JobApplicationWorkflow.STATE_PROCESSING), 0
+        )
+        self.assertEqual(
+            counters.get_count(siae, JobApplicationWorkflow.STATE_REFUSED), 1
+        )
+
+        # Changes saved outside of the workflow (e.g. in the admin).
+        other_siae = SiaeFactory()
+        job_application.state = JobApplicationWorkflow.STATE_PROCESSING
+        job_application.to_siae = other_siae
+        job_application.save()
+        self.assertEqual(
+            counters.get_count(siae, JobApplicationWorkflow.STATE_REFUSED), 0
+        )
+        self.assertEqual(
+            counters.get_count(other_siae, JobApplicationWorkflow.STATE_PROCESSING), 1
+        )
+        job_application.to_siae = siae
+        job_application.save()
+        job_application.refuse()
+
+        # Queryset updates are fixed by the repair command.
+        JobApplication.objects.filter(pk=job_application.pk).update(
+            state=JobApplicationWorkflow.STATE_ACCEPTED
+        )
+        self.assertEqual(
+            counters.get_count(siae, JobApplicationWorkflow.STATE_REFUSED), 1
+        )
+        call_command("rebuild_job_applications_counters", stdout=mock.Mock())
+        self.assertEqual(
+            counters.get_count(siae, JobApplicationWorkflow.STATE_REFUSED), 0
+        )
+        self.assertEqual(
+            counters.get_count(siae, JobApplicationWorkflow.STATE_ACCEPTED), 1
+        )
+        self.assertEqual(counters.get_count(siae, JobApplicationWorkflow.STATE_NEW), 1)
+
+
+class JobApplicationIssueApprovalsTest(TestCase):
+    def accept_job_application_without_approval(self, **job_seeker_kwargs):
+        job_seeker = JobSeekerFactory(
+            pole_emploi_id="",
+            lack_of_pole_emploi_id_reason=JobSeekerFactory._meta.model.REASON_FORGOTTEN,
+            **job_seeker_kwargs,
+        )
+        job_application = JobApplicationSentByJobSeekerFactory(
+            job_seeker=job_seeker, state=JobApplicationWorkflow.STATE_PROCESSING
+        )
+        job_application.accept(user=job_application.to_siae.members.first())
+        return job_application
+
+    def test_issue_approvals(self):
+        staff_member = UserFactory(is_staff=True)
+        job_application_1 = self.accept_job_application_without_approval()
+        job_application_2 = self.accept_job_application_without_approval()
+        # The job seeker already has a valid approval.
+        job_application_3 = self.accept_job_application_without_approval()
+        ApprovalFactory(user=job_application_3.job_seeker)
+        # Not accepted.
+        JobApplicationSentByJobSeekerFactory()
+
+        queryset = JobApplication.objects.manual_approval_delivery_required()
+        self.assertEqual(queryset.count(), 3)
+
+        mail.outbox = []  # Delete previous emails.
+        issued, skipped = queryset.issue_approvals(deliverer=staff_member)
+
+        self.assertCountEqual(issued, [job_application_1, job_application_2])
+        self.assertEqual([ja for ja, _ in skipped], [job_application_3])
+        self.assertEqual(queryset.count(), 1)
+
+        for job_application in [job_application_1, job_application_2]:
+            job_application.refresh_from_db()
+            self.assertTrue(job_application.approval.number.startswith("99999"))
+            self.assertEqual(job_application.approval.user, job_application.job_seeker)
+            self.assertEqual(
+                job_application.approval.start_at, job_application.hiring_start_at
+            )
+            self.assertEqual(job_application.approval.created_by, staff_member)
+            self.assertTrue(job_application.approval_number_sent_by_email)
+            self.assertEqual(
+                job_application.approval_delivery_mode,
+                JobApplication.APPROVAL_DELIVERY_MODE_MANUAL,
+            )
+            self.assertEqual(job_application.approval_number_delivered_by, staff_member)
+        self.assertNotEqual(
+            job_application_1.approval.number, job_application_2.approval.number
+        )
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_issue_approvals_accepted_by_deleted_user(self):
+        staff_member = UserFactory(is_staff=True)
+        job_application_1 = self.accept_job_application_without_approval()
+        job_application_2 = self.accept_job_application_without_approval()
+        job_application_2.logs.update(user=None)
+
+        queryset = JobApplication.objects.manual_approval_delivery_required()
+        issued, skipped = queryset.issue_approvals(deliverer=staff_member)
+
+        self.assertEqual(issued, [job_application_1])
+        self.assertEqual([ja for ja, _ in skipped], [job_application_2])
+        self.assertEqual(list(queryset), [job_application_2])
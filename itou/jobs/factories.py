@@ -1,6 +1,7 @@
 import json
 import os
 
+from itou.jobs.index import invalidate_appellations_index
 from itou.jobs.models import Appellation, Rome
 
 
@@ -81,3 +82,5 @@ def create_test_romes_and_appellations(rome_codes, appellations_per_rome=30):
             done += 1
             if done == len(rome_codes):
                 break
+
+    invalidate_appellations_index()
@@ -0,0 +1,148 @@
+import bisect
+import re
+import string
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from unidecode import unidecode
+
+from itou.jobs.models import Appellation
+from itou.utils.indexes import SharedIndexVersion
+
+
+PUNCTUATION_REGEX = re.compile(f"[{re.escape(string.punctuation)}]")
+
+
+def get_words(text):
+    """
+    Lowercased and unaccented words, as `french_unaccent` would see them.
+    """
+    return PUNCTUATION_REGEX.sub(" ", unidecode(text).lower()).split()
+
+
+_appellations_index_version = SharedIndexVersion("appellations")
+
+
+def invalidate_appellations_index():
+    """
+    Must be called each time appellations are modified.
+    """
+    global _appellations_index
+    _appellations_index_version.increment()
+    _appellations_index = None
+    _autocomplete_appellations.cache_clear()
+
+
+def autocomplete_appellations(search_string, codes_to_exclude=None, limit=10):
+    """
+    Returns a list of `{"code", "name", "rome"}` dicts matching `search_string`.
+
+    Results are kept in a per-process LRU cache until appellations are
+    modified: they are static between `import_appellations_for_romes` runs.
+    """
+    words = tuple(get_words(search_string))
+    if not words:
+        return []
+    codes_to_exclude = tuple(sorted(set(codes_to_exclude or [])))
+    results = _autocomplete_appellations(
+        _appellations_index_version.get(), words, codes_to_exclude, limit
+    )
+    # Copies: cached results are shared by all the requests of the process.
+    return [dict(item) for item in results]
+
+
+@lru_cache(maxsize=2048)
+def _autocomplete_appellations(version, words, codes_to_exclude, limit):
+    # `version` is only part of the cache key. Results are immutable tuples.
+    if settings.ITOU_APPELLATIONS_IN_MEMORY_INDEX:
+        return tuple(get_appellations_index().search(words, codes_to_exclude, limit))
+    appellations = Appellation.objects.autocomplete(
+        " ".join(words), codes_to_exclude, limit=limit
+    )
+    return tuple(
+        {
+            "code": appellation.code,
+            "name": appellation.name,
+            "rome": appellation.rome.code,
+        }
+        for appellation in appellations
+    )
+
+
+class AppellationsIndex:
+    """
+    In-memory prefix index over the names and ROME codes of appellations,
+    i.e. the content of `Appellation.full_text`.
+
+    All words are kept in a sorted list: the words starting with a given prefix
+    are contiguous and can be found with a binary search, like in a prefix trie.
+
+    Unlike the `french_unaccent` text search configuration, words are neither
+    stemmed nor filtered against stop words, so results can slightly differ.
+    """
+
+    def __init__(self, appellations, version=None):
+        self.version = version
+        # Same order as `Appellation.Meta.ordering`.
+        self.appellations = sorted(appellations, key=lambda item: item["name"])
+        words = set()
+        for position, appellation in enumerate(self.appellations):
+            for word in get_words(f"{appellation['name']} {appellation['rome']}"):
+                words.add((word, position))
+        self.words = sorted(words)
+
+    @classmethod
+    def build(cls, version=None):
+        appellations = [
+            {"code": code, "name": name, "rome": rome_code}
+            for code, name, rome_code in Appellation.objects.values_list(
+                "code", "name", "rome__code"
+            )
+        ]
+        return cls(appellations, version=version)
+
+    def get_positions_for_prefix(self, prefix):
+        positions = set()
+        i = bisect.bisect_left(self.words, (prefix,))
+        while i < len(self.words) and self.words[i][0].startswith(prefix):
+            positions.add(self.words[i][1])
+            i += 1
+        return positions
+
+    def search(self, words, codes_to_exclude=None, limit=10):
+        # Start with the most selective words.
+        positions = None
+        for word in sorted(set(words), key=len, reverse=True):
+            word_positions = self.get_positions_for_prefix(word)
+            positions = (
+                word_positions if positions is None else positions & word_positions
+            )
+            if not positions:
+                return []
+        results = []
+        for position in sorted(positions):
+            appellation = self.appellations[position]
+            if codes_to_exclude and appellation["code"] in codes_to_exclude:
+                continue
+            results.append(appellation)
+            if len(results) == limit:
+                break
+        return results
+
+
+_appellations_index = None
+_appellations_index_lock = threading.Lock()
+
+
+def get_appellations_index():
+    global _appellations_index
+    version = _appellations_index_version.get()
+    index = _appellations_index
+    if index is None or index.version != version:
+        with _appellations_index_lock:
+            index = _appellations_index
+            if index is None or index.version != version:
+                index = AppellationsIndex.build(version=version)
+                _appellations_index = index
+    return index
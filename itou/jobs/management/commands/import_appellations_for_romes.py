@@ -4,6 +4,7 @@ import os
 
 from django.core.management.base import BaseCommand
 
+from itou.jobs.index import invalidate_appellations_index
 from itou.jobs.models import Appellation, Rome
 
 
@@ -90,5 +91,8 @@ class Command(BaseCommand):
                             code=code, defaults={"name": name, "rome": rome}
                         )
 
+        if not dry_run:
+            invalidate_appellations_index()
+
         self.stdout.write("-" * 80)
         self.stdout.write("Done.")
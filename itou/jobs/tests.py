@@ -1,7 +1,16 @@
+from unittest import mock
+
 from django.test import TestCase
 
 from itou.jobs.factories import create_test_romes_and_appellations
+from itou.jobs.index import (
+    AppellationsIndex,
+    autocomplete_appellations,
+    get_words,
+    invalidate_appellations_index,
+)
 from itou.jobs.models import Appellation, Rome
+from itou.utils.models import IndexVersion
 
 
 class FixturesTest(TestCase):
@@ -11,3 +20,55 @@ class FixturesTest(TestCase):
         self.assertEqual(Appellation.objects.count(), 4)
         self.assertEqual(Appellation.objects.filter(rome_id="M1805").count(), 2)
         self.assertEqual(Appellation.objects.filter(rome_id="N1101").count(), 2)
+
+
+class AppellationsAutocompleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_test_romes_and_appellations(["N1101", "N4105"])
+
+    def test_results_are_cached(self):
+        results = autocomplete_appellations("cariste ferroviaire")
+        self.assertEqual([item["code"] for item in results], ["10357"])
+        # Normalized terms share the same cache entry.
+        with self.assertNumQueries(0):
+            self.assertEqual(autocomplete_appellations("Cariste, FERROVIAIRE"), results)
+        self.assertEqual(
+            autocomplete_appellations(
+                "cariste ferroviaire", codes_to_exclude=["10357"]
+            ),
+            [],
+        )
+        # Results are copies.
+        results[0]["name"] = "Pilote"
+        self.assertNotEqual(
+            autocomplete_appellations("cariste ferroviaire")[0]["name"], "Pilote"
+        )
+        invalidate_appellations_index()
+        with self.assertNumQueries(1):
+            autocomplete_appellations("cariste ferroviaire")
+
+    def test_shared_version(self):
+        invalidate_appellations_index()
+        autocomplete_appellations("cariste ferroviaire")
+        # Appellations modified by another process.
+        IndexVersion.objects.increment("appellations")
+        with self.assertNumQueries(0):
+            autocomplete_appellations("cariste ferroviaire")
+        # The version is only checked every `CHECK_INTERVAL` seconds.
+        with mock.patch("itou.utils.indexes.time.monotonic", return_value=10 ** 9):
+            with self.assertNumQueries(2):
+                autocomplete_appellations("cariste ferroviaire")
+
+    def test_in_memory_index(self):
+        index = AppellationsIndex.build()
+        results = index.search(get_words("CHAUFFEUR livreuse n4105"))
+        self.assertEqual([item["code"] for item in results], ["11999"])
+        results = index.search(get_words("conducteur chariot élévateur armée"))
+        self.assertEqual([item["code"] for item in results], ["12918"])
+        results = index.search(
+            get_words("conducteur chariot élévateur armée"), codes_to_exclude=["12918"]
+        )
+        self.assertEqual(results, [])
+        results = index.search(get_words("chauff"), limit=1)
+        self.assertEqual(len(results), 1)
@@ -6,7 +6,7 @@ from django.core.management.base import BaseCommand
 
 from itou.siaes.models import Siae
 from itou.utils.address.departments import DEPARTMENTS
-from itou.utils.apis.geocoding import get_geocoding_data
+from itou.utils.apis.geocoding import get_geocoding_data_in_bulk
 
 
 CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -35,6 +35,9 @@ class Command(BaseCommand):
 
     To populate the database:
         django-admin import_geiq
+
+    To geocode addresses with the BAN bulk CSV endpoint:
+        django-admin import_geiq --geocoding-csv-api
     """
 
     help = "Import the content of the GEIQ csv file into the database."
@@ -46,6 +49,12 @@ class Command(BaseCommand):
             action="store_true",
             help="Only print data to import",
         )
+        parser.add_argument(
+            "--geocoding-csv-api",
+            dest="geocoding_csv_api",
+            action="store_true",
+            help="Geocode all addresses at once with the BAN `/search/csv/` endpoint",
+        )
 
     def set_logger(self, verbosity):
         """
@@ -61,10 +70,13 @@ class Command(BaseCommand):
         if verbosity > 1:
             self.logger.setLevel(logging.DEBUG)
 
-    def handle(self, dry_run=False, **options):
+    def handle(self, dry_run=False, geocoding_csv_api=False, **options):
 
         self.set_logger(options.get("verbosity"))
 
+        # GEIQs are saved once all their addresses have been geocoded in bulk.
+        siaes = []
+
         with open(CSV_FILE) as csvfile:
 
             reader = csv.reader(csvfile, delimiter=";")
@@ -153,68 +165,71 @@ class Command(BaseCommand):
                     siae.city = city
                     siae.department = department
 
-                    if siae.address_on_one_line:
-
-                        geocoding_data = get_geocoding_data(
-                            siae.address_on_one_line, post_code=siae.post_code
-                        )
-
-                        if (
-                            not geocoding_data
-                            or geocoding_data["score"] < API_BAN_RELIABLE_MIN_SCORE
-                        ):
-                            geocoding_data = get_geocoding_data(
-                                siae.address_on_one_line,
-                                post_code=f"{siae.post_code[:2]}000",
-                            )
-
-                        if (
-                            not geocoding_data
-                            or geocoding_data["score"] < API_BAN_RELIABLE_MIN_SCORE
-                        ):
-                            geocoding_data = get_geocoding_data(
-                                siae.address_on_one_line
-                            )
-
-                        if (
-                            not geocoding_data
-                            or geocoding_data["score"] < API_BAN_RELIABLE_MIN_SCORE
-                        ):
-                            geocoding_data = get_geocoding_data(siae.address_line_1)
-
-                        if (
-                            not geocoding_data
-                            or geocoding_data["score"] < API_BAN_RELIABLE_MIN_SCORE
-                        ):
-                            geocoding_data = get_geocoding_data(siae.address_line_2)
-
-                        if not geocoding_data:
-                            self.stderr.write(
-                                f"No geocoding data found for {siae_info}"
-                            )
-                            siae.save()
-                            continue
-
-                        siae.geocoding_score = geocoding_data["score"]
-                        # If the score is greater than API_BAN_RELIABLE_MIN_SCORE, coords are reliable:
-                        # use data returned by the BAN API because it's better written using accents etc.
-                        # while the source data is in all caps etc.
-                        # Otherwise keep the old address (which is probably wrong or incomplete).
-                        if siae.geocoding_score >= API_BAN_RELIABLE_MIN_SCORE:
-                            siae.address_line_1 = geocoding_data["address_line_1"]
-                            siae.city = geocoding_data["city"]
-                        else:
-                            self.stderr.write(
-                                f"Geocoding not reliable for {siae_info}\n{siae.address_on_one_line}"
-                            )
-
-                        self.logger.debug("-" * 40)
-                        self.logger.debug(siae.address_line_1)
-                        self.logger.debug(siae.city)
-
-                        siae.coords = geocoding_data["coords"]
-
-                    siae.save()
+                    siaes.append((siae, siae_info))
+
+        self.stdout.write("Geocoding GEIQs…")
+
+        siaes_to_geocode = [
+            (siae, siae_info) for siae, siae_info in siaes if siae.address_on_one_line
+        ]
+        geocoding_results = [None] * len(siaes_to_geocode)
+
+        # Less and less precise queries are tried until a reliable result is found.
+        queries = [
+            lambda siae: (siae.address_on_one_line, siae.post_code),
+            lambda siae: (siae.address_on_one_line, f"{siae.post_code[:2]}000"),
+            lambda siae: (siae.address_on_one_line, None),
+            lambda siae: (siae.address_line_1, None),
+            lambda siae: (siae.address_line_2, None),
+        ]
+        for query in queries:
+            # Indexes of GEIQs without a reliable result yet.
+            pending = [
+                i
+                for i, geocoding_data in enumerate(geocoding_results)
+                if not geocoding_data
+                or geocoding_data["score"] < API_BAN_RELIABLE_MIN_SCORE
+            ]
+            if not pending:
+                break
+            results = get_geocoding_data_in_bulk(
+                [query(siaes_to_geocode[i][0]) for i in pending],
+                use_csv_api=geocoding_csv_api,
+            )
+            for i, geocoding_data in zip(pending, results):
+                geocoding_results[i] = geocoding_data
+
+        for (siae, siae_info), geocoding_data in zip(
+            siaes_to_geocode, geocoding_results
+        ):
+
+            if not geocoding_data:
+                self.stderr.write(f"No geocoding data found for {siae_info}")
+                continue
+
+            siae.geocoding_score = geocoding_data["score"]
+            # If the score is greater than API_BAN_RELIABLE_MIN_SCORE, coords are reliable:
+            # use data returned by the BAN API because it's better written using accents etc.
+            # while the source data is in all caps etc.
+            # Otherwise keep the old address (which is probably wrong or incomplete).
+            if siae.geocoding_score >= API_BAN_RELIABLE_MIN_SCORE:
+                siae.address_line_1 = geocoding_data["address_line_1"]
+                siae.city = geocoding_data["city"]
+            else:
+                self.stderr.write(
+                    f"Geocoding not reliable for {siae_info}\n{siae.address_on_one_line}"
+                )
+
+            self.logger.debug("-" * 40)
+            self.logger.debug(siae.address_line_1)
+            self.logger.debug(siae.city)
+
+            siae.coords = geocoding_data["coords"]
+
+        self.stdout.write("Saving GEIQs…")
+
+        for siae, _ in siaes:
+            siae.save()
 
         self.stdout.write("-" * 80)
         self.stdout.write("Done.")
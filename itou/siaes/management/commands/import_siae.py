@@ -6,7 +6,7 @@ from django.core.management.base import BaseCommand
 
 from itou.siaes.models import Siae
 from itou.utils.address.departments import DEPARTMENTS
-from itou.utils.apis.geocoding import get_geocoding_data
+from itou.utils.apis.geocoding import get_geocoding_data_in_bulk
 
 
 CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -33,6 +33,9 @@ class Command(BaseCommand):
 
     To populate the database:
         django-admin import_siae
+
+    To geocode addresses with the BAN bulk CSV endpoint:
+        django-admin import_siae --geocoding-csv-api
     """
 
     help = "Import the content of the SIAE csv file into the database."
@@ -44,6 +47,12 @@ class Command(BaseCommand):
             action="store_true",
             help="Only print data to import",
         )
+        parser.add_argument(
+            "--geocoding-csv-api",
+            dest="geocoding_csv_api",
+            action="store_true",
+            help="Geocode all addresses at once with the BAN `/search/csv/` endpoint",
+        )
 
     def set_logger(self, verbosity):
         """
@@ -59,10 +68,13 @@ class Command(BaseCommand):
         if verbosity > 1:
             self.logger.setLevel(logging.DEBUG)
 
-    def handle(self, dry_run=False, **options):
+    def handle(self, dry_run=False, geocoding_csv_api=False, **options):
 
         self.set_logger(options.get("verbosity"))
 
+        # SIAEs are saved once all their addresses have been geocoded in bulk.
+        siaes = []
+
         with open(CSV_FILE) as csvfile:
 
             # Count lines in CSV.
@@ -181,39 +193,52 @@ class Command(BaseCommand):
                     siae.city = city
                     siae.department = department
 
-                    if siae.address_on_one_line:
-
-                        geocoding_data = get_geocoding_data(
-                            siae.address_on_one_line, post_code=siae.post_code
-                        )
-
-                        if not geocoding_data:
-                            self.stderr.write(
-                                f"No geocoding data found for {siae_info}"
-                            )
-                            siae.save()
-                            continue
-
-                        siae.geocoding_score = geocoding_data["score"]
-                        # If the score is greater than API_BAN_RELIABLE_MIN_SCORE, coords are reliable:
-                        # use data returned by the BAN API because it's better written using accents etc.
-                        # while the source data is in all caps etc.
-                        # Otherwise keep the old address (which is probably wrong or incomplete).
-                        if siae.geocoding_score >= API_BAN_RELIABLE_MIN_SCORE:
-                            siae.address_line_1 = geocoding_data["address_line_1"]
-                        else:
-                            self.stderr.write(f"Geocoding not reliable for {siae_info}")
-                        # City is always good due to `postcode` passed in query.
-                        # ST MAURICE DE REMENS => Saint-Maurice-de-Rémens
-                        siae.city = geocoding_data["city"]
-
-                        self.logger.debug("-" * 40)
-                        self.logger.debug(siae.address_line_1)
-                        self.logger.debug(siae.city)
-
-                        siae.coords = geocoding_data["coords"]
-
-                    siae.save()
+                    siaes.append((siae, siae_info))
+
+        self.stdout.write("Geocoding SIAEs…")
+
+        siaes_to_geocode = [
+            (siae, siae_info) for siae, siae_info in siaes if siae.address_on_one_line
+        ]
+        geocoding_results = get_geocoding_data_in_bulk(
+            [
+                (siae.address_on_one_line, siae.post_code)
+                for siae, _ in siaes_to_geocode
+            ],
+            use_csv_api=geocoding_csv_api,
+        )
+
+        for (siae, siae_info), geocoding_data in zip(
+            siaes_to_geocode, geocoding_results
+        ):
+
+            if not geocoding_data:
+                self.stderr.write(f"No geocoding data found for {siae_info}")
+                continue
+
+            siae.geocoding_score = geocoding_data["score"]
+            # If the score is greater than API_BAN_RELIABLE_MIN_SCORE, coords are reliable:
+            # use data returned by the BAN API because it's better written using accents etc.
+            # while the source data is in all caps etc.
+            # Otherwise keep the old address (which is probably wrong or incomplete).
+            if siae.geocoding_score >= API_BAN_RELIABLE_MIN_SCORE:
+                siae.address_line_1 = geocoding_data["address_line_1"]
+            else:
+                self.stderr.write(f"Geocoding not reliable for {siae_info}")
+            # City is always good due to `postcode` passed in query.
+            # ST MAURICE DE REMENS => Saint-Maurice-de-Rémens
+            siae.city = geocoding_data["city"]
+
+            self.logger.debug("-" * 40)
+            self.logger.debug(siae.address_line_1)
+            self.logger.debug(siae.city)
+
+            siae.coords = geocoding_data["coords"]
+
+        self.stdout.write("Saving SIAEs…")
+
+        for siae, _ in siaes:
+            siae.save()
 
         self.stdout.write("-" * 80)
         self.stdout.write("Done.")
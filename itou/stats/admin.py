@@ -0,0 +1,9 @@
+from django.contrib import admin
+
+from itou.stats import models
+
+
+@admin.register(models.StatsSnapshot)
+class StatsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("id", "department", "computed_at")
+    readonly_fields = ("department", "data", "computed_at")
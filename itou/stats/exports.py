@@ -0,0 +1,94 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from itou.job_applications.models import JobApplication, JobApplicationWorkflow
+from itou.stats.utils import get_stats_snapshot
+
+
+EXPORT_JOB_APPLICATIONS = "job_applications"
+EXPORT_HIRINGS = "hirings"
+EXPORT_STATS = "stats"
+
+EXPORT_CHOICES = (EXPORT_JOB_APPLICATIONS, EXPORT_HIRINGS, EXPORT_STATS)
+
+# Number of rows fetched at a time from the database server-side cursor.
+CHUNK_SIZE = 2000
+
+# Job seekers personal data are intentionally left out.
+JOB_APPLICATION_COLUMNS = (
+    ("id", _("Identifiant")),
+    ("created_at", _("Date de création")),
+    ("state", _("État")),
+    ("sender_kind", _("Type de l'émetteur")),
+    ("sender_prescriber_organization__name", _("Organisation du prescripteur")),
+    ("sender_prescriber_organization__is_authorized", _("Prescripteur habilité")),
+    ("to_siae__siret", _("Siret de la SIAE destinataire")),
+    ("to_siae__name", _("SIAE destinataire")),
+    ("to_siae__kind", _("Type de la SIAE destinataire")),
+    ("to_siae__department", _("Département de la SIAE destinataire")),
+    ("hiring_start_at", _("Date de début du contrat")),
+    ("hiring_end_at", _("Date de fin du contrat")),
+    ("approval__number", _("Numéro de PASS IAE")),
+    ("approval_number_sent_at", _("Date d'envoi du PASS IAE")),
+)
+
+
+def get_export(name, department=None):
+    """
+    Returns a `(header, rows)` tuple for the given export, `rows` being
+    a lazy iterable so that memory usage does not depend on its length.
+    """
+    if name in (EXPORT_JOB_APPLICATIONS, EXPORT_HIRINGS):
+        departments = [department] if department else settings.ITOU_TEST_DEPARTMENTS
+        job_applications = JobApplication.objects.filter(
+            to_siae__department__in=departments
+        )
+        if name == EXPORT_HIRINGS:
+            job_applications = job_applications.filter(
+                state=JobApplicationWorkflow.STATE_ACCEPTED
+            )
+        return get_job_applications_export(job_applications)
+    if name == EXPORT_STATS:
+        return get_stats_export(department)
+    raise ValueError(f"Unknown export: {name}")
+
+
+def get_job_applications_export(job_applications):
+    fields, header = zip(*JOB_APPLICATION_COLUMNS)
+    rows = (
+        job_applications.order_by("created_at", "pk")
+        .values_list(*fields)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    return header, (format_row(row) for row in rows)
+
+
+def get_stats_export(department=None):
+    """
+    Only KPIs made of a single value are exported, charts are left out.
+    """
+    header = (_("Indicateur"), _("Valeur"))
+    data = get_stats_snapshot(department).get_data()
+    rows = [
+        format_row((key, value))
+        for key, value in data.items()
+        if isinstance(value, (int, float, str, datetime.timedelta))
+    ]
+    return header, rows
+
+
+def format_row(row):
+    """
+    Spreadsheets do not support timezones: use local time instead.
+    """
+    formatted_row = []
+    for value in row:
+        if isinstance(value, datetime.datetime):
+            value = timezone.localtime(value).replace(tzinfo=None)
+        elif isinstance(value, datetime.timedelta):
+            value = str(value)
+        formatted_row.append(value)
+    return formatted_row
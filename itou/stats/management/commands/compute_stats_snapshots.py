@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from itou.stats.models import WeeklyTotal
+from itou.stats.utils import (
+    compute_stats,
+    compute_stats_snapshot,
+    get_department_choices,
+)
+
+
+class Command(BaseCommand):
+    """
+    Compute the KPIs of the `/stats` page and store them in `StatsSnapshot`.
+
+    One snapshot is stored per test department plus one for all
+    test departments together.
+
+    To debug:
+        django-admin compute_stats_snapshots --dry-run
+
+    To refresh snapshots (e.g. in a cron job):
+        django-admin compute_stats_snapshots
+
+    To recompute weekly totals from scratch instead of only the last weeks:
+        django-admin compute_stats_snapshots --rebuild-weekly-totals
+    """
+
+    help = "Compute and store the KPIs of the stats page."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            dest="dry_run",
+            action="store_true",
+            help="Only compute data, do not store snapshots",
+        )
+        parser.add_argument(
+            "--rebuild-weekly-totals",
+            dest="rebuild_weekly_totals",
+            action="store_true",
+            help="Recompute all weekly totals instead of only the last weeks",
+        )
+
+    def handle(self, dry_run=False, rebuild_weekly_totals=False, **options):
+
+        if rebuild_weekly_totals and not dry_run:
+            WeeklyTotal.objects.all().delete()
+
+        for department, department_name in get_department_choices():
+
+            self.stdout.write(f"Computing stats for {department_name}…")
+
+            if dry_run:
+                compute_stats(department)
+            else:
+                compute_stats_snapshot(department, only_if_stale=False)
+
+        self.stdout.write("-" * 80)
+        self.stdout.write("Done.")
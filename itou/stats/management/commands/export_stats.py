@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from itou.stats.exports import EXPORT_CHOICES, get_export
+from itou.utils.export import FORMAT_CHOICES, FORMAT_CSV, FORMAT_XLSX, iter_export
+
+
+class Command(BaseCommand):
+    """
+    Export job applications, hirings or the KPIs of the `/stats` page
+    as CSV or XLSX. Rows are streamed so that memory usage is constant.
+
+    To export all job applications as CSV to stdout:
+        django-admin export_stats job_applications
+
+    To export hirings of a department as XLSX:
+        django-admin export_stats hirings --format=xlsx --department=67 --output=/tmp/hirings.xlsx
+    """
+
+    help = "Export job applications, hirings or stats KPIs as CSV or XLSX."
+
+    def add_arguments(self, parser):
+        parser.add_argument("export_name", choices=EXPORT_CHOICES)
+        parser.add_argument(
+            "--format",
+            dest="export_format",
+            choices=FORMAT_CHOICES,
+            default=FORMAT_CSV,
+            help="Output format",
+        )
+        parser.add_argument(
+            "--department",
+            dest="department",
+            choices=settings.ITOU_TEST_DEPARTMENTS,
+            help="Only export data of this department",
+        )
+        parser.add_argument(
+            "--output",
+            dest="output",
+            help="Path of the output file, defaults to stdout for CSV",
+        )
+
+    def handle(
+        self,
+        export_name,
+        export_format=FORMAT_CSV,
+        department=None,
+        output=None,
+        **options,
+    ):
+
+        if export_format == FORMAT_XLSX and not output:
+            raise CommandError("An --output file is required for XLSX exports.")
+
+        header, rows = get_export(export_name, department)
+        chunks = iter_export(header, rows, export_format)
+
+        if not output:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        if export_format == FORMAT_XLSX:
+            f = open(output, "wb")
+        else:
+            f = open(output, "w", newline="")
+        with f:
+            for chunk in chunks:
+                f.write(chunk)
+
+        self.stdout.write("-" * 80)
+        self.stdout.write("Done.")
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.10 on 2020-03-03 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("stats", "0001_initial")]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeeklyTotal",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "metric",
+                    models.CharField(
+                        choices=[
+                            ("job_applications", "Candidatures"),
+                            ("hirings", "Embauches"),
+                            ("prescriber_users", "Inscriptions de prescripteurs"),
+                            ("active_prescriber_users", "Prescripteurs actifs"),
+                        ],
+                        max_length=30,
+                        verbose_name="Indicateur",
+                    ),
+                ),
+                (
+                    "department",
+                    models.CharField(
+                        blank=True, max_length=3, verbose_name="Département"
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField(verbose_name="Année")),
+                ("week", models.PositiveSmallIntegerField(verbose_name="Semaine")),
+                ("total", models.PositiveIntegerField(default=0, verbose_name="Total")),
+            ],
+            options={
+                "verbose_name": "Total hebdomadaire",
+                "verbose_name_plural": "Totaux hebdomadaires",
+                "ordering": ["year", "week"],
+                "unique_together": {("metric", "department", "year", "week")},
+            },
+        )
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.10 on 2020-03-18 10:12
+
+from django.db import migrations
+
+
+def delete_weekly_totals(apps, schema_editor):
+    # Totals of the last week of 53-week ISO years were stored with the
+    # calendar year of their Sunday instead of their ISO year: drop them all,
+    # the next run of `compute_stats_snapshots` recomputes every week.
+    WeeklyTotal = apps.get_model("stats", "WeeklyTotal")
+    WeeklyTotal.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("stats", "0002_weeklytotal")]
+
+    operations = [migrations.RunPython(delete_weekly_totals, migrations.RunPython.noop)]
@@ -0,0 +1,155 @@
+import datetime
+
+from django.contrib.postgres.fields import JSONField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_duration
+from django.utils.translation import gettext_lazy as _
+
+
+class StatsSnapshotQuerySet(models.QuerySet):
+    def for_department(self, department=None):
+        return self.filter(department=department or StatsSnapshot.ALL_DEPARTMENTS)
+
+
+class StatsSnapshot(models.Model):
+    """
+    Precomputed KPIs of the `/stats` page.
+
+    Computing those KPIs requires dozens of heavy queries, so they are
+    computed out of the request cycle by the `compute_stats_snapshots`
+    admin command and stored here: one row per department plus one row
+    for all test departments together.
+    """
+
+    # Stands for the "all test departments" view.
+    ALL_DEPARTMENTS = ""
+
+    # Older snapshots are still served but refreshed in the background.
+    MAX_AGE = datetime.timedelta(minutes=30)
+
+    # JSON has no duration type: those keys are stored as ISO 8601
+    # durations and must be converted back into `timedelta` objects.
+    DURATION_KEYS = (
+        "average_delay_from_application_to_hiring",
+        "average_delay_from_hiring_to_pass_delivery",
+        "average_delay_from_pass_delivery_to_contract_start",
+    )
+
+    department = models.CharField(
+        verbose_name=_("Département"), max_length=3, blank=True, unique=True
+    )
+    data = JSONField(verbose_name=_("Données"), encoder=DjangoJSONEncoder)
+    computed_at = models.DateTimeField(
+        verbose_name=_("Date de calcul"), default=timezone.now
+    )
+
+    objects = models.Manager.from_queryset(StatsSnapshotQuerySet)()
+
+    class Meta:
+        verbose_name = _("Instantané des statistiques")
+        verbose_name_plural = _("Instantanés des statistiques")
+
+    def __str__(self):
+        return self.department or "all"
+
+    @classmethod
+    def store(cls, data, department=None):
+        """
+        Concurrent calls for the same department would conflict on the unique
+        `department`: use `compute_stats_snapshot` which serializes them.
+        """
+        snapshot, _created = cls.objects.update_or_create(
+            department=department or cls.ALL_DEPARTMENTS,
+            defaults={"data": data, "computed_at": timezone.now()},
+        )
+        return snapshot
+
+    @property
+    def age(self):
+        return timezone.now() - self.computed_at
+
+    @property
+    def is_stale(self):
+        return self.age > self.MAX_AGE
+
+    def get_data(self):
+        data = dict(self.data)
+        for key in self.DURATION_KEYS:
+            if isinstance(data.get(key), str):
+                data[key] = parse_duration(data[key])
+        return data
+
+
+class WeeklyTotalQuerySet(models.QuerySet):
+    def for_metric(self, metric, department=None):
+        return self.filter(
+            metric=metric, department=department or StatsSnapshot.ALL_DEPARTMENTS
+        )
+
+    def since_week(self, year, week):
+        return self.filter(Q(year__gt=year) | Q(year=year, week__gte=week))
+
+    def get_refresh_start(self):
+        """
+        Returns the local Monday (as an aware datetime) from which totals
+        must be recomputed, or None if everything must be computed.
+        """
+        last_weekly_total = self.order_by("year", "week").last()
+        if not last_weekly_total:
+            return None
+        monday = datetime.datetime.strptime(
+            f"{last_weekly_total.year}-{last_weekly_total.week}-1", "%G-%V-%u"
+        ) - datetime.timedelta(weeks=WeeklyTotal.REFRESH_PAST_WEEKS)
+        return timezone.make_aware(monday)
+
+
+class WeeklyTotal(models.Model):
+    """
+    Weekly totals displayed in the charts of the `/stats` page, keyed by
+    ISO year, ISO week, department and metric.
+
+    Only the last weeks are recomputed on each run of `compute_stats_snapshots`,
+    older weeks are kept as is. Use `--rebuild-weekly-totals` to recompute
+    everything (e.g. after a data migration).
+    """
+
+    METRIC_JOB_APPLICATIONS = "job_applications"
+    METRIC_HIRINGS = "hirings"
+    METRIC_PRESCRIBER_USERS = "prescriber_users"
+    METRIC_ACTIVE_PRESCRIBER_USERS = "active_prescriber_users"
+
+    METRIC_CHOICES = (
+        (METRIC_JOB_APPLICATIONS, _("Candidatures")),
+        (METRIC_HIRINGS, _("Embauches")),
+        (METRIC_PRESCRIBER_USERS, _("Inscriptions de prescripteurs")),
+        (METRIC_ACTIVE_PRESCRIBER_USERS, _("Prescripteurs actifs")),
+    )
+
+    # A week can still change once it's over, e.g. hirings are grouped
+    # by the creation date of the job application which can be accepted
+    # weeks later. Recompute a few weeks before the last stored one.
+    REFRESH_PAST_WEEKS = 8
+
+    metric = models.CharField(
+        verbose_name=_("Indicateur"), max_length=30, choices=METRIC_CHOICES
+    )
+    department = models.CharField(
+        verbose_name=_("Département"), max_length=3, blank=True
+    )
+    year = models.PositiveSmallIntegerField(verbose_name=_("Année"))
+    week = models.PositiveSmallIntegerField(verbose_name=_("Semaine"))
+    total = models.PositiveIntegerField(verbose_name=_("Total"), default=0)
+
+    objects = models.Manager.from_queryset(WeeklyTotalQuerySet)()
+
+    class Meta:
+        verbose_name = _("Total hebdomadaire")
+        verbose_name_plural = _("Totaux hebdomadaires")
+        unique_together = ("metric", "department", "year", "week")
+        ordering = ["year", "week"]
+
+    def __str__(self):
+        return f"{self.metric} {self.department} {self.year}-{self.week}"
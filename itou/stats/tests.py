@@ -0,0 +1,237 @@
+import datetime
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+from django.utils import timezone
+
+from itou.eligibility.factories import EligibilityDiagnosisFactory
+from itou.eligibility.models import EligibilityDiagnosis
+from itou.job_applications.factories import JobApplicationFactory
+from itou.job_applications.models import JobApplication
+from itou.prescribers.factories import (
+    AuthorizedPrescriberOrganizationWithMembershipFactory,
+)
+from itou.siaes.factories import SiaeFactory, SiaeWithMembershipAndJobsFactory
+from itou.siaes.models import Siae
+from itou.stats.models import StatsSnapshot, WeeklyTotal
+from itou.stats.utils import (
+    _refreshing_departments,
+    compute_stats,
+    compute_stats_snapshot,
+    get_donut_chart_data_per_eligibility_author_kind,
+    get_siae_stats,
+    get_stats_snapshot,
+    get_weekly_totals,
+    refresh_stats_snapshot_in_background,
+)
+from itou.users.factories import PrescriberFactory
+
+
+class StatsSnapshotModelTest(TestCase):
+    def test_store(self):
+        StatsSnapshot.store({"total_job_applications": 1})
+        StatsSnapshot.store({"total_job_applications": 2})
+        self.assertEqual(StatsSnapshot.objects.count(), 1)
+        snapshot = StatsSnapshot.objects.for_department(None).get()
+        self.assertEqual(snapshot.department, StatsSnapshot.ALL_DEPARTMENTS)
+        self.assertEqual(snapshot.data, {"total_job_applications": 2})
+
+    def test_get_data(self):
+        delay = datetime.timedelta(days=3, hours=4)
+        StatsSnapshot.store(
+            {"average_delay_from_application_to_hiring": delay}, department="67"
+        )
+        snapshot = StatsSnapshot.objects.for_department("67").get()
+        # Durations are stored as strings in JSON.
+        self.assertIsInstance(
+            snapshot.data["average_delay_from_application_to_hiring"], str
+        )
+        data = snapshot.get_data()
+        self.assertEqual(data["average_delay_from_application_to_hiring"], delay)
+
+
+class StatsSnapshotRefreshTest(TestCase):
+    def tearDown(self):
+        _refreshing_departments.clear()
+
+    @mock.patch("itou.stats.utils.refresh_stats_snapshot_in_background")
+    def test_fresh_snapshot(self, refresh_mock):
+        StatsSnapshot.store({"total_job_applications": 1})
+        snapshot = get_stats_snapshot()
+        self.assertEqual(snapshot.data, {"total_job_applications": 1})
+        refresh_mock.assert_not_called()
+
+    @mock.patch("itou.stats.utils.refresh_stats_snapshot_in_background")
+    def test_stale_snapshot(self, refresh_mock):
+        snapshot = StatsSnapshot.store({"total_job_applications": 1}, department="67")
+        snapshot.computed_at -= StatsSnapshot.MAX_AGE * 2
+        snapshot.save()
+        # The stale snapshot is served while it's refreshed.
+        snapshot = get_stats_snapshot("67")
+        self.assertEqual(snapshot.data, {"total_job_applications": 1})
+        refresh_mock.assert_called_once_with("67")
+
+    @mock.patch("itou.stats.utils.threading.Thread")
+    def test_refresh_lock(self, thread_mock):
+        self.assertTrue(refresh_stats_snapshot_in_background("67"))
+        # A refresh is already running.
+        self.assertFalse(refresh_stats_snapshot_in_background("67"))
+        # Locks are per department.
+        self.assertTrue(refresh_stats_snapshot_in_background(None))
+        self.assertEqual(thread_mock.call_count, 2)
+        # The refresh is over.
+        _refreshing_departments.discard("67")
+        self.assertTrue(refresh_stats_snapshot_in_background("67"))
+
+    @mock.patch("itou.stats.utils.compute_stats", return_value={"total": 2})
+    def test_compute_stats_snapshot(self, compute_stats_mock):
+        # Another process stored a fresh snapshot while we were waiting for the lock.
+        StatsSnapshot.store({"total": 1}, department="67")
+        snapshot = compute_stats_snapshot("67")
+        self.assertEqual(snapshot.data, {"total": 1})
+        compute_stats_mock.assert_not_called()
+
+        snapshot = compute_stats_snapshot("67", only_if_stale=False)
+        self.assertEqual(snapshot.data, {"total": 2})
+        compute_stats_mock.assert_called_once_with("67")
+
+        # Cold path.
+        snapshot = get_stats_snapshot("75")
+        self.assertEqual(snapshot.data, {"total": 2})
+        self.assertEqual(StatsSnapshot.objects.count(), 2)
+
+
+class ComputeStatsSnapshotsCommandTest(TestCase):
+    def test_command(self):
+        call_command("compute_stats_snapshots", stdout=open("/dev/null", "w"))
+        # One snapshot per test department plus one for all departments.
+        self.assertEqual(
+            StatsSnapshot.objects.count(), len(settings.ITOU_TEST_DEPARTMENTS) + 1
+        )
+        for department in settings.ITOU_TEST_DEPARTMENTS:
+            snapshot = StatsSnapshot.objects.for_department(department).get()
+            self.assertIsNone(snapshot.data["siaes_by_dpt"])
+        snapshot = StatsSnapshot.objects.for_department(None).get()
+        self.assertIsNotNone(snapshot.data["siaes_by_dpt"])
+
+
+class WeeklyTotalsTest(TestCase):
+    def get_weekly_totals(self):
+        return get_weekly_totals(
+            WeeklyTotal.METRIC_JOB_APPLICATIONS,
+            None,
+            JobApplication.objects.all(),
+            date_field="created_at",
+            total_expression=Count("pk"),
+        )
+
+    def test_get_weekly_totals(self):
+        now = timezone.now()
+        old_week = now - datetime.timedelta(weeks=WeeklyTotal.REFRESH_PAST_WEEKS + 4)
+        JobApplicationFactory(created_at=old_week)
+        JobApplicationFactory(created_at=now)
+
+        result = self.get_weekly_totals()
+        self.assertEqual(len(result), 2)
+        self.assertEqual([item["total"] for item in result], [1, 1])
+        self.assertEqual(WeeklyTotal.objects.count(), 2)
+
+        # Closed weeks older than the refresh window are not recomputed.
+        JobApplication.objects.filter(created_at=old_week).delete()
+        JobApplicationFactory(created_at=now)
+
+        result = self.get_weekly_totals()
+        self.assertEqual([item["total"] for item in result], [1, 2])
+        self.assertEqual(WeeklyTotal.objects.count(), 2)
+
+    def test_get_weekly_totals_53_weeks_iso_year(self):
+        # Monday December 28th 2020 is in week 53 of ISO year 2020.
+        JobApplicationFactory(
+            created_at=timezone.make_aware(datetime.datetime(2020, 12, 28, 12))
+        )
+        JobApplicationFactory(
+            created_at=timezone.make_aware(datetime.datetime(2021, 1, 4, 12))
+        )
+
+        result = self.get_weekly_totals()
+        self.assertEqual(
+            [(item["year"], item["week"]) for item in result], [(2020, 53), (2021, 1)]
+        )
+        self.assertEqual(
+            WeeklyTotal.objects.get_refresh_start(),
+            timezone.make_aware(datetime.datetime(2021, 1, 4))
+            - datetime.timedelta(weeks=WeeklyTotal.REFRESH_PAST_WEEKS),
+        )
+
+    def test_prescriber_users_totals_are_refreshed_for_all_departments_only(self):
+        PrescriberFactory()
+        prescriber_users_totals = WeeklyTotal.objects.filter(
+            metric=WeeklyTotal.METRIC_PRESCRIBER_USERS
+        )
+
+        data = compute_stats("67")
+        self.assertIsNone(data["prescriber_users_per_creation_week"])
+        self.assertFalse(prescriber_users_totals.exists())
+
+        data = compute_stats()
+        self.assertEqual(len(data["prescriber_users_per_creation_week"]), 1)
+        self.assertEqual(prescriber_users_totals.count(), 1)
+
+
+class SiaeStatsTest(TestCase):
+    def test_get_siae_stats(self):
+        SiaeFactory(department="67")
+        # Memberships and job descriptions multiply joined rows.
+        SiaeWithMembershipAndJobsFactory(department="67", kind=Siae.KIND_ETTI)
+        SiaeWithMembershipAndJobsFactory(department="93")
+
+        with self.assertNumQueries(1):
+            data = get_siae_stats(Siae.objects.all())
+
+        series_by_name = {
+            serie["name"]: serie for serie in data["siaes_by_dpt"]["series"]
+        }
+        known = series_by_name["Structures connues à ce jour"]
+        self.assertEqual(known["total"], 3)
+        registered = series_by_name["Structures inscrites à ce jour"]
+        self.assertEqual(registered["total"], 2)
+        departments = [d for d, _ in data["siaes_by_dpt"]["categories"]]
+        self.assertEqual(known["values"][departments.index("67")], 2)
+
+        series_by_name = {
+            serie["name"]: serie for serie in data["siaes_by_kind"]["series"]
+        }
+        kinds = [k for k, _ in data["siaes_by_kind"]["categories"]]
+        known = series_by_name["Structures connues à ce jour"]
+        self.assertEqual(known["values"][kinds.index(Siae.KIND_ETTI)], 1)
+        self.assertEqual(known["values"][kinds.index(Siae.KIND_EI)], 2)
+
+
+class EligibilityAuthorKindStatsTest(TestCase):
+    def test_latest_diagnosis_only(self):
+        job_application = JobApplicationFactory()
+        job_seeker = job_application.job_seeker
+        authorized_org = AuthorizedPrescriberOrganizationWithMembershipFactory()
+        EligibilityDiagnosisFactory(
+            job_seeker=job_seeker,
+            author_kind=EligibilityDiagnosis.AUTHOR_KIND_SIAE_STAFF,
+            created_at=timezone.now() - datetime.timedelta(days=10),
+        )
+        EligibilityDiagnosisFactory(
+            job_seeker=job_seeker, author_prescriber_organization=authorized_org
+        )
+        # Without any diagnosis.
+        JobApplicationFactory()
+
+        data = get_donut_chart_data_per_eligibility_author_kind(
+            JobApplication.objects.all()
+        )
+        values = {item["name"]: item["value"] for item in data}
+        # The job seeker is not counted twice.
+        self.assertEqual(sum(values.values()), 1)
+        self.assertEqual(values["SIAE"], 0)
+        self.assertEqual(values["Prescripteur habilité"], 1)
+        self.assertEqual(values["Prescripteur non habilité"], 0)
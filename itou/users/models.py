@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.core.validators import MinLengthValidator
 from django.db import models
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 from allauth.utils import generate_unique_username
@@ -97,13 +98,25 @@ class User(AbstractUser):
         ):
             raise ValidationError(self.ERROR_EMAIL_ALREADY_EXISTS)
         super().save(*args, **kwargs)
+        # `pole_emploi_id` or `birthdate` may have changed.
+        self.invalidate_approvals_wrapper()
 
-    @property
+    @cached_property
     def approvals_wrapper(self):
+        """
+        Computed once per instance, i.e. once per request for `request.user`
+        or `job_application.job_seeker`.
+        """
         if not self.is_job_seeker:
             return None
         return ApprovalsWrapper(self)
 
+    def invalidate_approvals_wrapper(self):
+        """
+        Must be called when approvals of the user are modified.
+        """
+        self.__dict__.pop("approvals_wrapper", None)
+
     @property
     def has_eligibility_diagnosis(self):
         """
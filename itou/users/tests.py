@@ -6,7 +6,7 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 
-from itou.approvals.factories import PoleEmploiApprovalFactory
+from itou.approvals.factories import ApprovalFactory, PoleEmploiApprovalFactory
 from itou.eligibility.factories import EligibilityDiagnosisFactory
 from itou.users.factories import JobSeekerFactory
 from itou.users.factories import PrescriberFactory
@@ -119,3 +119,16 @@ class ModelTest(TestCase):
         User = get_user_model()
         self.assertTrue(User.email_already_exists("foo@bar.com"))
         self.assertTrue(User.email_already_exists("FOO@bar.com"))
+
+    def test_approvals_wrapper_is_memoized(self):
+        job_seeker = JobSeekerFactory()
+
+        with self.assertNumQueries(1):
+            approvals_wrapper = job_seeker.approvals_wrapper
+        with self.assertNumQueries(0):
+            self.assertIs(job_seeker.approvals_wrapper, approvals_wrapper)
+        self.assertIsNone(approvals_wrapper.latest_approval)
+
+        # Creating an approval resets the memoized wrapper.
+        approval = ApprovalFactory(user=job_seeker)
+        self.assertEqual(job_seeker.approvals_wrapper.latest_approval, approval)
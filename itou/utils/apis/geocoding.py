@@ -1,40 +1,201 @@
+import csv
+import io
+import json
 import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
+from unidecode import unidecode
 
 from django.conf import settings
 from django.contrib.gis.geos import GEOSGeometry
-from django.utils.http import urlencode
 
 
 logger = logging.getLogger(__name__)
 
 
+# Maximum number of concurrent calls to the BAN API.
+# https://adresse.data.gouv.fr/faq: 50 calls/second/IP.
+GEOCODING_MAX_WORKERS = 8
+
+# Seconds.
+API_BAN_TIMEOUT = 10
+
+# Number of addresses sent to `/search/csv/` in a single call.
+API_BAN_CSV_CHUNK_SIZE = 5000
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    A single `requests.Session` is shared so that connections are reused.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=GEOCODING_MAX_WORKERS)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+    return _session
+
+
+class GeocodingCache:
+    """
+    Persistent on-disk cache of BAN API results, stored in a SQLite file.
+
+    Results are keyed by normalized address and post code. Addresses without
+    any result are cached too, but not network errors.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS geocoding (key TEXT PRIMARY KEY, data TEXT)"
+            )
+
+    @staticmethod
+    def get_key(address, post_code=None, limit=1):
+        address = " ".join(unidecode(address).lower().split())
+        return f"{address}|{post_code or ''}|{limit}"
+
+    def get(self, key):
+        """
+        Returns a `(found, data)` tuple since `None` is a valid cached result.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT data FROM geocoding WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+
+    def set(self, key, data):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO geocoding (key, data) VALUES (?, ?)",
+                (key, json.dumps(data)),
+            )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Returns None when `API_BAN_CACHE_FILE` is not set.
+    """
+    global _cache
+    path = settings.API_BAN_CACHE_FILE
+    if not path:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.path != path:
+            _cache = GeocodingCache(path)
+    return _cache
+
+
 def call_ban_geocoding_api(address, post_code=None, limit=1):
 
+    cache = get_cache()
+    if cache:
+        cache_key = GeocodingCache.get_key(address, post_code=post_code, limit=limit)
+        found, data = cache.get(cache_key)
+        if found:
+            return data
+
     api_url = f"{settings.API_BAN_BASE_URL}/search/"
 
-    args = {"q": address, "limit": limit}
+    params = {"q": address, "limit": limit}
 
     # `post_code` can be used to restrict the scope of the search.
     if post_code:
-        args["postcode"] = post_code
+        params["postcode"] = post_code
 
-    query_string = urlencode(args)
-    url = f"{api_url}?{query_string}"
+    try:
+        r = get_session().get(api_url, params=params, timeout=API_BAN_TIMEOUT)
+        r.raise_for_status()
+        features = r.json()["features"]
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        logger.error("Error while fetching `%s` with %s: %s", api_url, params, e)
+        return None
+
+    data = features[0] if features else None
+    if not data:
+        logger.error(
+            "Geocoding error, no result found for `%s` with %s", api_url, params
+        )
+
+    if cache:
+        cache.set(cache_key, data)
+
+    return data
+
+
+def call_ban_geocoding_csv_api(addresses):
+    """
+    Geocode many `(address, post_code)` tuples at once with the bulk endpoint:
+    https://adresse.data.gouv.fr/api-doc/adresse (`/search/csv/`)
+
+    Returns a list of results in the same format as `call_ban_geocoding_api`,
+    in the same order as `addresses`, or None on errors.
+    """
+    api_url = f"{settings.API_BAN_BASE_URL}/search/csv/"
+
+    csv_file = io.StringIO()
+    writer = csv.writer(csv_file)
+    writer.writerow(["address", "postcode"])
+    writer.writerows([[address, post_code or ""] for address, post_code in addresses])
 
     try:
-        r = requests.get(url)
+        r = get_session().post(
+            api_url,
+            data={"columns": "address", "postcode": "postcode"},
+            files={"data": ("addresses.csv", csv_file.getvalue().encode())},
+            # The BAN processes the whole file before responding.
+            timeout=API_BAN_TIMEOUT * 30,
+        )
+        r.raise_for_status()
     except requests.exceptions.RequestException as e:
-        logger.error("Error while fetching `%s`: %s", url, e)
+        logger.error("Error while fetching `%s`: %s", api_url, e)
         return None
 
-    try:
-        return r.json()["features"][0]
-    except IndexError:
-        logger.error("Geocoding error, no result found for `%s`", url)
+    results = []
+    for row in csv.DictReader(io.StringIO(r.content.decode("utf-8-sig"))):
+        if not row.get("result_score"):
+            results.append(None)
+            continue
+        # Same structure as a feature returned by `/search/`.
+        results.append(
+            {
+                "geometry": {
+                    "coordinates": [float(row["longitude"]), float(row["latitude"])]
+                },
+                "properties": {
+                    "score": float(row["result_score"]),
+                    "name": row["result_name"],
+                    "postcode": row["result_postcode"],
+                    "city": row["result_city"],
+                },
+            }
+        )
+
+    if len(results) != len(addresses):
+        logger.error("Geocoding error, unexpected number of results from `%s`", api_url)
         return None
 
+    return results
+
 
 def process_geocoding_data(data):
 
@@ -60,3 +221,48 @@ def get_geocoding_data(address, post_code=None, limit=1):
     geocoding_data = call_ban_geocoding_api(address, post_code=post_code, limit=limit)
 
     return process_geocoding_data(geocoding_data)
+
+
+def get_geocoding_data_in_bulk(addresses, use_csv_api=False):
+    """
+    Geocode a list of `(address, post_code)` tuples.
+
+    Returns a list of `get_geocoding_data()` results in the same order.
+
+    Cached addresses are not requested again. The others are geocoded either
+    with concurrent calls to `/search/` or in chunks with `/search/csv/`.
+    """
+    addresses = list(addresses)
+    results = [None] * len(addresses)
+
+    cache = get_cache()
+    pending = []
+    for i, (address, post_code) in enumerate(addresses):
+        if cache:
+            found, data = cache.get(GeocodingCache.get_key(address, post_code))
+            if found:
+                results[i] = data
+                continue
+        pending.append(i)
+
+    if use_csv_api:
+        for start in range(0, len(pending), API_BAN_CSV_CHUNK_SIZE):
+            chunk = pending[start : start + API_BAN_CSV_CHUNK_SIZE]
+            chunk_results = call_ban_geocoding_csv_api([addresses[i] for i in chunk])
+            if chunk_results is None:
+                # Network errors are not cached.
+                continue
+            for i, data in zip(chunk, chunk_results):
+                results[i] = data
+                if cache:
+                    address, post_code = addresses[i]
+                    cache.set(GeocodingCache.get_key(address, post_code), data)
+    else:
+        with ThreadPoolExecutor(max_workers=GEOCODING_MAX_WORKERS) as executor:
+            pending_results = executor.map(
+                lambda i: call_ban_geocoding_api(*addresses[i]), pending
+            )
+            for i, data in zip(pending, pending_results):
+                results[i] = data
+
+    return [process_geocoding_data(data) for data in results]
@@ -0,0 +1,70 @@
+import csv
+import tempfile
+
+import openpyxl
+
+
+FORMAT_CSV = "csv"
+FORMAT_XLSX = "xlsx"
+
+FORMAT_CHOICES = (FORMAT_CSV, FORMAT_XLSX)
+
+CONTENT_TYPES = {
+    FORMAT_CSV: "text/csv",
+    FORMAT_XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Size of the chunks yielded when streaming an XLSX file.
+XLSX_CHUNK_SIZE = 64 * 1024
+
+
+class Echo:
+    """
+    An object that implements just the write method of the file-like interface.
+    https://docs.djangoproject.com/en/2.2/howto/outputting-csv/#streaming-large-csv-files
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    """
+    Yields CSV lines one by one: memory usage does not depend on the number of rows.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_xlsx(header, rows):
+    """
+    Yields the bytes of an XLSX file.
+
+    A ZIP archive can't be generated on the fly so the workbook is written to a
+    temporary file first. The write-only mode of openpyxl keeps memory usage
+    constant regardless of the number of rows.
+    https://openpyxl.readthedocs.io/en/stable/optimized.html#write-only-mode
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    with tempfile.TemporaryFile() as f:
+        wb.save(f)
+        f.seek(0)
+        while True:
+            chunk = f.read(XLSX_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_export(header, rows, export_format):
+    if export_format == FORMAT_CSV:
+        return iter_csv(header, rows)
+    if export_format == FORMAT_XLSX:
+        return iter_xlsx(header, rows)
+    raise ValueError(f"Unknown export format: {export_format}")
@@ -0,0 +1,35 @@
+import time
+
+from itou.utils.models import IndexVersion
+
+
+class SharedIndexVersion:
+    """
+    Process-local view of an `IndexVersion`.
+
+    The version is read from the database at most every `CHECK_INTERVAL`
+    seconds so that in-memory indexes don't query PostgreSQL on each
+    keystroke: other processes see a change after this delay at most.
+    """
+
+    CHECK_INTERVAL = 30
+
+    def __init__(self, name):
+        self.name = name
+        self.version = None
+        self.checked_at = None
+
+    def get(self):
+        now = time.monotonic()
+        if self.checked_at is None or now - self.checked_at > self.CHECK_INTERVAL:
+            self.version = IndexVersion.objects.get_version(self.name)
+            self.checked_at = now
+        return self.version
+
+    def increment(self):
+        """
+        Must be called each time the indexed data are modified.
+        """
+        self.version = IndexVersion.objects.increment(self.name)
+        self.checked_at = time.monotonic()
+        return self.version
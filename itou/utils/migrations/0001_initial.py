@@ -0,0 +1,35 @@
+# Generated by Django 2.2.10 on 2020-03-20 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexVersion",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=50,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Nom",
+                    ),
+                ),
+                (
+                    "version",
+                    models.PositiveIntegerField(default=0, verbose_name="Version"),
+                ),
+            ],
+            options={
+                "verbose_name": "Version d'un index",
+                "verbose_name_plural": "Versions des index",
+            },
+        )
+    ]
@@ -2,6 +2,13 @@
 Result for a call to:
 https://api-adresse.data.gouv.fr/search/?q=10+PL+5+MARTYRS+LYCEE+BUFFON&limit=1&postcode=75015
 """
+import csv
+import email
+import http.server
+import io
+import json
+import urllib.parse
+
 
 BAN_GEOCODING_API_RESULT_MOCK = {
     "type": "Feature",
@@ -24,3 +31,84 @@ BAN_GEOCODING_API_RESULT_MOCK = {
         "street": "Pl des Cinq Martyrs du Lycee Buffon",
     },
 }
+
+
+class BanApiStubHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Minimal stub of the BAN API `/search/` and `/search/csv/` endpoints.
+
+    Any address matches BAN_GEOCODING_API_RESULT_MOCK except `UNKNOWN_ADDRESS`.
+
+    Usage:
+    ```
+    server = http.server.HTTPServer(("127.0.0.1", 0), BanApiStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    API_BAN_BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    ```
+    """
+
+    UNKNOWN_ADDRESS = "nowhere"
+
+    # Number of requests received, shared by all instances.
+    requests_count = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, content_type, body):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        BanApiStubHandler.requests_count += 1
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        features = []
+        if query["q"][0] != self.UNKNOWN_ADDRESS:
+            features = [BAN_GEOCODING_API_RESULT_MOCK]
+        body = json.dumps({"type": "FeatureCollection", "features": features})
+        self.send_body("application/json", body.encode())
+
+    def do_POST(self):
+        BanApiStubHandler.requests_count += 1
+        length = int(self.headers["Content-Length"])
+        message = email.message_from_bytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+            + self.rfile.read(length)
+        )
+        for part in message.walk():
+            if part.get_param("name", header="content-disposition") == "data":
+                csv_content = part.get_payload(decode=True).decode()
+
+        properties = BAN_GEOCODING_API_RESULT_MOCK["properties"]
+        longitude, latitude = BAN_GEOCODING_API_RESULT_MOCK["geometry"]["coordinates"]
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(
+            [
+                "address",
+                "postcode",
+                "latitude",
+                "longitude",
+                "result_score",
+                "result_name",
+                "result_postcode",
+                "result_city",
+            ]
+        )
+        for row in csv.DictReader(io.StringIO(csv_content)):
+            result = ["", "", "", "", "", ""]
+            if row["address"] != self.UNKNOWN_ADDRESS:
+                result = [
+                    latitude,
+                    longitude,
+                    properties["score"],
+                    properties["name"],
+                    properties["postcode"],
+                    properties["city"],
+                ]
+            writer.writerow([row["address"], row["postcode"]] + result)
+        self.send_body("text/csv", output.getvalue().encode())
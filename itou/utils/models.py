@@ -0,0 +1,42 @@
+from django.db import connection, models
+from django.utils.translation import gettext_lazy as _
+
+
+class IndexVersionQuerySet(models.QuerySet):
+    def get_version(self, name):
+        return self.filter(name=name).values_list("version", flat=True).first()
+
+    def increment(self, name):
+        """
+        Increment the version of the given index in a single upsert query
+        and return the new version.
+        """
+        table = self.model._meta.db_table
+        sql = (
+            f"INSERT INTO {table} (name, version) VALUES (%s, 1) "
+            f"ON CONFLICT (name) DO UPDATE SET version = {table}.version + 1 "
+            f"RETURNING version"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [name])
+            return cursor.fetchone()[0]
+
+
+class IndexVersion(models.Model):
+    """
+    Version of an in-memory index (e.g. the cities index), shared by all
+    processes through the database: each process rebuilds its own copy
+    of the index when the version changes.
+    """
+
+    name = models.CharField(verbose_name=_("Nom"), max_length=50, primary_key=True)
+    version = models.PositiveIntegerField(verbose_name=_("Version"), default=0)
+
+    objects = models.Manager.from_queryset(IndexVersionQuerySet)()
+
+    class Meta:
+        verbose_name = _("Version d'un index")
+        verbose_name_plural = _("Versions des index")
+
+    def __str__(self):
+        return f"{self.name} {self.version}"
@@ -1,7 +1,16 @@
+import uuid
+
 from django.core.paginator import Paginator, InvalidPage, EmptyPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+# Above this number of results, `keyset_pager` switches from the Google-style
+# pager to next/previous links.
+KEYSET_PAGER_MAX_COUNT = 500
 
 
-def pager(queryset, page, items_per_page=10, pages_num=10):
+def pager(queryset, page, items_per_page=10, pages_num=10, count=None):
     """
     A generic pager built on top of Django core's Paginator.
     https://docs.djangoproject.com/en/dev/topics/pagination/
@@ -11,6 +20,7 @@ def pager(queryset, page, items_per_page=10, pages_num=10):
         page: int, current page number
         items_per_page: int, number of items per page
         pages_num: int, number of pages to display
+        count: int, number of items in the queryset if already known
 
     Returns:
         custom_pager: a django.core.paginator.Page instance with a few additional attributes:
@@ -18,6 +28,9 @@ def pager(queryset, page, items_per_page=10, pages_num=10):
             display_pager: bool, True if there are more than one page to display
     """
     paginator = Paginator(queryset, items_per_page)
+    if count is not None:
+        # Avoid a `COUNT(*)` query.
+        paginator.count = count
 
     try:
         page = int(page)
@@ -47,5 +60,117 @@ def pager(queryset, page, items_per_page=10, pages_num=10):
 
     setattr(custom_pager, "pages_to_display", pages_to_display)
     setattr(custom_pager, "display_pager", total_pages > 1)
+    setattr(custom_pager, "is_keyset", False)
 
     return custom_pager
+
+
+class KeysetPage:
+    """
+    A page of results built by `keyset_pager`, usable like a
+    django.core.paginator.Page in templates.
+    """
+
+    is_keyset = True
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        # Cursors are built from the first and last items.
+        self.has_next = has_next and bool(object_list)
+        self.has_previous = has_previous and bool(object_list)
+        self.display_pager = has_next or has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.object_list[-1]) if self.has_next else ""
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.object_list[0]) if self.has_previous else ""
+
+
+def encode_cursor(obj):
+    return f"{obj.created_at.isoformat()}_{obj.pk}"
+
+
+def decode_cursor(cursor):
+    """
+    Return a `(created_at, pk)` tuple or None if the cursor is invalid.
+    """
+    created_at, _, pk = (cursor or "").rpartition("_")
+    try:
+        created_at = parse_datetime(created_at)
+        pk = uuid.UUID(pk)
+    except ValueError:
+        return None
+    if not created_at:
+        return None
+    return created_at, pk
+
+
+def keyset_pager(
+    queryset, params, items_per_page=10, pages_num=10, max_count=KEYSET_PAGER_MAX_COUNT
+):
+    """
+    A pager for potentially large querysets ordered by `(-created_at, -pk)`.
+
+    Results are counted up to `max_count` only: below that, the usual
+    Google-style pager is used. Above, pages are fetched with a keyset
+    (a.k.a. cursor) on `(created_at, pk)` instead of an OFFSET, so that
+    deep pages are as fast as the first one, and only next/previous links
+    are displayed.
+
+    Arguments:
+        queryset: QuerySet, a queryset of objects having a `created_at` field
+            and a UUID primary key
+        params: QueryDict, request.GET containing `page`, `after` or `before`
+        items_per_page: int, number of items per page
+        pages_num: int, number of pages to display in the Google-style pager
+        max_count: int, maximum number of results displayed with the Google-style pager
+
+    Returns:
+        A django.core.paginator.Page (see `pager`) or a KeysetPage instance.
+    """
+    queryset = queryset.order_by("-created_at", "-pk")
+
+    after = decode_cursor(params.get("after"))
+    before = decode_cursor(params.get("before"))
+
+    if not after and not before:
+        # `SELECT COUNT(*) FROM (SELECT ... LIMIT max_count + 1)`
+        count = queryset[: max_count + 1].count()
+        if count <= max_count:
+            return pager(
+                queryset,
+                params.get("page"),
+                items_per_page=items_per_page,
+                pages_num=pages_num,
+                count=count,
+            )
+
+    if before:
+        created_at, pk = before
+        queryset = queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+        ).order_by("created_at", "pk")
+    elif after:
+        created_at, pk = after
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )
+
+    # Fetch one more item to know if there is another page.
+    object_list = list(queryset[: items_per_page + 1])
+    has_more = len(object_list) > items_per_page
+    object_list = object_list[:items_per_page]
+
+    if before:
+        object_list.reverse()
+        return KeysetPage(object_list, has_next=True, has_previous=has_more)
+    return KeysetPage(object_list, has_next=has_more, has_previous=bool(after))
@@ -1,5 +1,4 @@
-from django.conf import settings
-from django.core.exceptions import PermissionDenied
+from itou.utils.perms.organization import get_current_organization
 
 
 def get_current_organization_and_perms(request):
@@ -8,41 +7,17 @@ def get_current_organization_and_perms(request):
     https://docs.djangoproject.com/en/2.1/ref/templates/api/#using-requestcontext
     """
 
-    prescriber_organization = None
-    siae = None
-    user_is_prescriber_org_admin = False
-    user_is_siae_admin = False
-    user_siae_set = []
-
-    if request.user.is_authenticated:
-
-        siae_pk = request.session.get(settings.ITOU_SESSION_CURRENT_SIAE_KEY)
-        if siae_pk:
-            # Get all info in 1 SQL query.
-            memberships = request.user.siaemembership_set.select_related("siae").all()
-            user_siae_set = [membership.siae for membership in memberships]
-            for membership in memberships:
-                if membership.siae_id == siae_pk:
-                    siae = membership.siae
-                    user_is_siae_admin = membership.is_siae_admin
-                    break
-            if siae is None:
-                raise PermissionDenied
-
-        prescriber_org_pk = request.session.get(
-            settings.ITOU_SESSION_CURRENT_PRESCRIBER_ORG_KEY
-        )
-        if prescriber_org_pk:
-            membership = request.user.prescribermembership_set.select_related(
-                "organization"
-            ).get(organization_id=prescriber_org_pk)
-            prescriber_organization = membership.organization
-            user_is_prescriber_org_admin = membership.is_admin
+    current_organization = get_current_organization(request)
+    is_siae = current_organization.siae is not None
+    is_prescriber_organization = (
+        current_organization.prescriber_organization is not None
+    )
 
     return {
-        "current_prescriber_organization": prescriber_organization,
-        "current_siae": siae,
-        "user_is_prescriber_org_admin": user_is_prescriber_org_admin,
-        "user_is_siae_admin": user_is_siae_admin,
-        "user_siae_set": user_siae_set,
+        "current_prescriber_organization": current_organization.prescriber_organization,
+        "current_siae": current_organization.siae,
+        "user_is_prescriber_org_admin": is_prescriber_organization
+        and current_organization.is_admin,
+        "user_is_siae_admin": is_siae and current_organization.is_admin,
+        "user_siae_set": current_organization.user_siae_set,
     }
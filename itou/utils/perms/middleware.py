@@ -1,10 +1,13 @@
-from django.conf import settings
+from itou.utils.perms.organization import get_current_organization
 
 
 class ItouCurrentOrganizationMiddleware:
     """
     Store the ID of the current organization in session.
     https://docs.djangoproject.com/en/dev/topics/http/middleware/#writing-your-own-middleware
+
+    The current organization is built once per request and shared with
+    the context processor and views (see `get_current_organization`).
     """
 
     def __init__(self, get_response):
@@ -14,23 +17,8 @@ class ItouCurrentOrganizationMiddleware:
 
         # Before the view is called.
 
-        user = request.user
-
-        if user.is_authenticated:
-
-            if user.is_siae_staff and user.siae_set.exists():
-                current_siae_pk = request.session.get(
-                    settings.ITOU_SESSION_CURRENT_SIAE_KEY
-                )
-                if not user.siae_set.filter(pk=current_siae_pk).exists():
-                    request.session[
-                        settings.ITOU_SESSION_CURRENT_SIAE_KEY
-                    ] = user.siae_set.first().pk
-
-            elif user.is_prescriber and user.prescriberorganization_set.exists():
-                request.session[
-                    settings.ITOU_SESSION_CURRENT_PRESCRIBER_ORG_KEY
-                ] = user.prescriberorganization_set.first().pk
+        if request.user.is_authenticated:
+            request.current_organization = get_current_organization(request)
 
         response = self.get_response(request)
 
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+
+
+class CurrentOrganization:
+    """
+    The organization (SIAE or prescriber organization) the user is currently
+    working for, and the user's memberships.
+
+    Built once per request, in a single SQL query, by `get_current_organization`
+    and shared by `ItouCurrentOrganizationMiddleware`, the context processor
+    and views.
+    """
+
+    def __init__(
+        self,
+        siae=None,
+        prescriber_organization=None,
+        is_admin=False,
+        user_siae_set=None,
+    ):
+        self.siae = siae
+        self.prescriber_organization = prescriber_organization
+        self.is_admin = is_admin
+        self.user_siae_set = user_siae_set or []
+
+    def get_siae_or_404(self):
+        """
+        Same checks as `Siae.active_objects.member_required(user)` without
+        any additional query.
+        """
+        if (
+            self.siae is None
+            or self.siae.department not in settings.ITOU_TEST_DEPARTMENTS
+        ):
+            raise Http404
+        return self.siae
+
+    def get_prescriber_organization_or_404(self):
+        if self.prescriber_organization is None:
+            raise Http404
+        return self.prescriber_organization
+
+
+def get_siae_context(request):
+    user = request.user
+    siae_pk = request.session.get(settings.ITOU_SESSION_CURRENT_SIAE_KEY)
+
+    # Get all info in 1 SQL query.
+    memberships = list(user.siaemembership_set.select_related("siae").all())
+    if not memberships:
+        if siae_pk:
+            raise PermissionDenied
+        return CurrentOrganization()
+
+    current_membership = next(
+        (membership for membership in memberships if membership.siae_id == siae_pk),
+        None,
+    )
+    if current_membership is None:
+        if siae_pk and not user.is_siae_staff:
+            raise PermissionDenied
+        # Default to the first SIAE of the user.
+        current_membership = min(memberships, key=lambda m: m.siae_id)
+        request.session[
+            settings.ITOU_SESSION_CURRENT_SIAE_KEY
+        ] = current_membership.siae_id
+
+    return CurrentOrganization(
+        siae=current_membership.siae,
+        is_admin=current_membership.is_siae_admin,
+        user_siae_set=[membership.siae for membership in memberships],
+    )
+
+
+def get_prescriber_organization_context(request):
+    user = request.user
+    organization_pk = request.session.get(
+        settings.ITOU_SESSION_CURRENT_PRESCRIBER_ORG_KEY
+    )
+
+    # Get all info in 1 SQL query.
+    memberships = list(user.prescribermembership_set.select_related("organization"))
+    if not memberships:
+        if organization_pk:
+            raise PermissionDenied
+        return CurrentOrganization()
+
+    if user.is_prescriber:
+        # Prescribers always work for their first organization.
+        current_membership = min(memberships, key=lambda m: m.organization_id)
+    else:
+        current_membership = next(
+            (m for m in memberships if m.organization_id == organization_pk), None
+        )
+        if current_membership is None:
+            raise PermissionDenied
+
+    if current_membership.organization_id != organization_pk:
+        request.session[
+            settings.ITOU_SESSION_CURRENT_PRESCRIBER_ORG_KEY
+        ] = current_membership.organization_id
+
+    return CurrentOrganization(
+        prescriber_organization=current_membership.organization,
+        is_admin=current_membership.is_admin,
+    )
+
+
+def get_current_organization(request):
+    """
+    Return the `CurrentOrganization` of the request, built on first use.
+    """
+    try:
+        return request._current_organization
+    except AttributeError:
+        pass
+
+    user = request.user
+    current_organization = CurrentOrganization()
+
+    if user.is_authenticated:
+        if user.is_siae_staff or request.session.get(
+            settings.ITOU_SESSION_CURRENT_SIAE_KEY
+        ):
+            current_organization = get_siae_context(request)
+        elif user.is_prescriber or request.session.get(
+            settings.ITOU_SESSION_CURRENT_PRESCRIBER_ORG_KEY
+        ):
+            current_organization = get_prescriber_organization_context(request)
+
+    request._current_organization = current_organization
+    return current_organization
@@ -1,10 +1,6 @@
 from collections import namedtuple
 
-from django.conf import settings
-from django.shortcuts import get_object_or_404
-
-from itou.prescribers.models import PrescriberOrganization
-from itou.siaes.models import Siae
+from itou.utils.perms.organization import get_current_organization
 
 
 KIND_JOB_SEEKER = "job_seeker"
@@ -31,18 +27,16 @@ def get_user_info(request):
     if request.user.is_job_seeker:
         kind = KIND_JOB_SEEKER
 
+    current_organization = get_current_organization(request)
+
     if request.user.is_prescriber:
         kind = KIND_PRESCRIBER
-        pk = request.session.get(settings.ITOU_SESSION_CURRENT_PRESCRIBER_ORG_KEY)
-        if pk:
-            queryset = PrescriberOrganization.objects.member_required(user)
-            prescriber_organization = get_object_or_404(queryset, pk=pk)
+        prescriber_organization = current_organization.prescriber_organization
+        if prescriber_organization:
             is_authorized_prescriber = prescriber_organization.is_authorized
 
     if request.user.is_siae_staff:
         kind = KIND_SIAE_STAFF
-        pk = request.session[settings.ITOU_SESSION_CURRENT_SIAE_KEY]
-        queryset = Siae.active_objects.member_required(user)
-        siae = get_object_or_404(queryset, pk=pk)
+        siae = current_organization.get_siae_or_404()
 
     return UserInfo(user, kind, prescriber_organization, is_authorized_prescriber, siae)
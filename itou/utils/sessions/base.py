@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+
+
+# Timestamp of the last expiry date refresh, stored in session data.
+REFRESHED_AT_KEY = "_itou_refreshed_at"
+
+
+class LazyExpiryMixin:
+    """
+    Refresh the expiry date of sessions lazily.
+
+    With `SESSION_SAVE_EVERY_REQUEST = False`, a session is saved only when
+    its data change, so its expiry date would never be pushed back for a user
+    who only browses. Instead of saving it on every request, the session is
+    marked as modified when it is loaded if its expiry date has not been
+    refreshed for `ITOU_SESSION_REFRESH_INTERVAL` seconds.
+    """
+
+    def load(self):
+        session_data = super().load()
+        if session_data:
+            refreshed_at = session_data.get(REFRESHED_AT_KEY, 0)
+            if time.time() - refreshed_at >= settings.ITOU_SESSION_REFRESH_INTERVAL:
+                self.modified = True
+        return session_data
+
+    def save(self, *args, **kwargs):
+        # Each save pushes back the expiry date.
+        self._session[REFRESHED_AT_KEY] = int(time.time())
+        return super().save(*args, **kwargs)
@@ -0,0 +1,10 @@
+from django.contrib.sessions.backends import cached_db
+
+from itou.utils.sessions.base import LazyExpiryMixin
+
+
+class SessionStore(LazyExpiryMixin, cached_db.SessionStore):
+    """
+    Cache-backed sessions (written through to the database) with a lazily
+    refreshed expiry date. Requires a shared cache in `CACHES`.
+    """
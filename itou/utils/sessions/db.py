@@ -0,0 +1,9 @@
+from django.contrib.sessions.backends import db
+
+from itou.utils.sessions.base import LazyExpiryMixin
+
+
+class SessionStore(LazyExpiryMixin, db.SessionStore):
+    """
+    Database-backed sessions with a lazily refreshed expiry date.
+    """
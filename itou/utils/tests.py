@@ -1,3 +1,7 @@
+import http.server
+import os
+import tempfile
+import threading
 from unittest import mock
 
 from django.conf import settings
@@ -5,18 +9,29 @@ from django.contrib.gis.geos import GEOSGeometry
 from django.contrib.sessions.middleware import SessionMiddleware
 from django.core.exceptions import ValidationError
 from django.template import Context, Template
+from django.http import QueryDict
 from django.test import RequestFactory, TestCase
 
+from itou.job_applications.factories import JobApplicationFactory
+from itou.job_applications.models import JobApplication
 from itou.prescribers.factories import PrescriberOrganizationWithMembershipFactory
 from itou.prescribers.models import PrescriberOrganization
 from itou.siaes.factories import SiaeFactory, SiaeWithMembershipFactory
 from itou.users.factories import JobSeekerFactory, PrescriberFactory
-from itou.utils.apis.geocoding import process_geocoding_data
+from itou.utils.apis.geocoding import (
+    get_geocoding_data,
+    get_geocoding_data_in_bulk,
+    process_geocoding_data,
+)
 from itou.utils.apis.siret import process_siret_data
-from itou.utils.mocks.geocoding import BAN_GEOCODING_API_RESULT_MOCK
+from itou.utils.mocks.geocoding import BAN_GEOCODING_API_RESULT_MOCK, BanApiStubHandler
 from itou.utils.mocks.siret import API_INSEE_SIRET_RESULT_MOCK
+from itou.utils.pagination import decode_cursor, encode_cursor, keyset_pager
 from itou.utils.perms.context_processors import get_current_organization_and_perms
+from itou.utils.perms.organization import get_current_organization
 from itou.utils.perms.user import get_user_info
+from itou.utils.sessions.base import REFRESHED_AT_KEY
+from itou.utils.sessions.db import SessionStore
 from itou.utils.perms.user import KIND_JOB_SEEKER, KIND_PRESCRIBER, KIND_SIAE_STAFF
 from itou.utils.templatetags import format_filters
 from itou.utils.urls import get_safe_url
@@ -220,6 +235,75 @@ class UtilsGeocodingTest(TestCase):
         self.assertEqual(result, expected)
 
 
+class UtilsGeocodingStubServerTest(TestCase):
+    """
+    Geocode addresses against a local stub of the BAN API.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = http.server.HTTPServer(("127.0.0.1", 0), BanApiStubHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.api_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        BanApiStubHandler.requests_count = 0
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.cache_dir.name, "geocoding.sqlite3")
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_get_geocoding_data(self):
+        with self.settings(API_BAN_BASE_URL=self.api_url):
+            result = get_geocoding_data("10 PL 5 MARTYRS LYCEE BUFFON", "75015")
+            self.assertEqual(result["city"], "Paris")
+            self.assertIsNone(get_geocoding_data(BanApiStubHandler.UNKNOWN_ADDRESS))
+        self.assertEqual(BanApiStubHandler.requests_count, 2)
+
+    def test_cache(self):
+        with self.settings(
+            API_BAN_BASE_URL=self.api_url, API_BAN_CACHE_FILE=self.cache_file
+        ):
+            get_geocoding_data("10 PL 5 MARTYRS LYCEE BUFFON", "75015")
+            # Normalized addresses share the same cache entry.
+            result = get_geocoding_data("10  pl 5 martyrs lycée buffon", "75015")
+            self.assertEqual(result["city"], "Paris")
+            self.assertEqual(BanApiStubHandler.requests_count, 1)
+            # Results without post code are cached separately.
+            get_geocoding_data("10 PL 5 MARTYRS LYCEE BUFFON")
+            self.assertEqual(BanApiStubHandler.requests_count, 2)
+
+    def test_get_geocoding_data_in_bulk(self):
+        addresses = [
+            ("10 PL 5 MARTYRS LYCEE BUFFON", "75015"),
+            (BanApiStubHandler.UNKNOWN_ADDRESS, None),
+            ("10 PL DES CINQ MARTYRS DU LYCEE BUFFON", "75015"),
+        ]
+        for use_csv_api in [False, True]:
+            with self.subTest(use_csv_api=use_csv_api), self.settings(
+                API_BAN_BASE_URL=self.api_url,
+                API_BAN_CACHE_FILE=f"{self.cache_file}.{use_csv_api}",
+            ):
+                BanApiStubHandler.requests_count = 0
+                results = get_geocoding_data_in_bulk(addresses, use_csv_api=use_csv_api)
+                self.assertEqual(len(results), 3)
+                self.assertEqual(results[0]["city"], "Paris")
+                self.assertIsNone(results[1])
+                self.assertEqual(results[2]["post_code"], "75015")
+                requests_count = BanApiStubHandler.requests_count
+                # Addresses are not requested again, even without result.
+                get_geocoding_data_in_bulk(addresses, use_csv_api=use_csv_api)
+                self.assertEqual(BanApiStubHandler.requests_count, requests_count)
+
+
 class UtilsSiretTest(TestCase):
     @mock.patch(
         "itou.utils.apis.siret.call_insee_api", return_value=API_INSEE_SIRET_RESULT_MOCK
@@ -271,6 +355,114 @@ class UtilsValidatorsTest(TestCase):
         validate_pole_emploi_id("1234567E")
 
 
+class UtilsPaginationTest(TestCase):
+    def test_keyset_pager(self):
+        JobApplicationFactory.create_batch(5)
+        queryset = JobApplication.objects.all()
+        expected = list(queryset.order_by("-created_at", "-pk"))
+
+        # Small result set: Google-style pager.
+        page = keyset_pager(queryset, QueryDict("page=2"), items_per_page=2)
+        self.assertFalse(page.is_keyset)
+        self.assertEqual(page.paginator.num_pages, 3)
+        self.assertEqual(list(page), expected[2:4])
+
+        # Large result set: next/previous links.
+        page = keyset_pager(queryset, QueryDict(), items_per_page=2, max_count=3)
+        self.assertTrue(page.is_keyset)
+        self.assertEqual(list(page), expected[:2])
+        self.assertFalse(page.has_previous)
+        self.assertTrue(page.has_next)
+
+        params = QueryDict(mutable=True)
+        params["after"] = page.next_cursor
+        page = keyset_pager(queryset, params, items_per_page=2, max_count=3)
+        self.assertEqual(list(page), expected[2:4])
+        self.assertTrue(page.has_previous)
+        self.assertTrue(page.has_next)
+
+        params = QueryDict(mutable=True)
+        params["after"] = page.next_cursor
+        page = keyset_pager(queryset, params, items_per_page=2, max_count=3)
+        self.assertEqual(list(page), expected[4:])
+        self.assertTrue(page.has_previous)
+        self.assertFalse(page.has_next)
+
+        params = QueryDict(mutable=True)
+        params["before"] = page.previous_cursor
+        page = keyset_pager(queryset, params, items_per_page=2, max_count=3)
+        self.assertEqual(list(page), expected[2:4])
+        self.assertTrue(page.has_previous)
+        self.assertTrue(page.has_next)
+
+        # An invalid cursor leads to the first page.
+        page = keyset_pager(
+            queryset, QueryDict("after=foo"), items_per_page=2, max_count=3
+        )
+        self.assertEqual(list(page), expected[:2])
+
+    def test_decode_cursor(self):
+        job_application = JobApplicationFactory()
+        self.assertEqual(
+            decode_cursor(encode_cursor(job_application)),
+            (job_application.created_at, job_application.pk),
+        )
+        created_at = job_application.created_at.isoformat()
+        for cursor in [
+            None,
+            "",
+            "foo",
+            f"{created_at}_",
+            f"{created_at}_foo",
+            f"{created_at}_1234",
+            f"2020-13-01T00:00:00+00:00_{job_application.pk}",
+            f"_{job_application.pk}",
+        ]:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+
+    def test_keyset_pager_with_malformed_cursor(self):
+        JobApplicationFactory.create_batch(3)
+        queryset = JobApplication.objects.all()
+        expected = list(queryset.order_by("-created_at", "-pk"))
+        created_at = expected[0].created_at.isoformat()
+        # Would raise a `ValidationError` with a non-UUID pk.
+        page = keyset_pager(
+            queryset,
+            QueryDict(f"after={created_at}_1234"),
+            items_per_page=2,
+            max_count=1,
+        )
+        self.assertEqual(list(page), expected[:2])
+
+
+class UtilsSessionsTest(TestCase):
+    def test_lazy_expiry(self):
+        session = SessionStore()
+        session["foo"] = "bar"
+        session.save()
+
+        # A session refreshed recently is not saved again.
+        session = SessionStore(session.session_key)
+        self.assertEqual(session["foo"], "bar")
+        self.assertFalse(session.modified)
+
+        # Its expiry date is refreshed once the interval has elapsed.
+        refreshed_at = session[REFRESHED_AT_KEY]
+        with mock.patch(
+            "itou.utils.sessions.base.time.time",
+            return_value=refreshed_at + settings.ITOU_SESSION_REFRESH_INTERVAL,
+        ):
+            session = SessionStore(session.session_key)
+            self.assertEqual(session["foo"], "bar")
+            self.assertTrue(session.modified)
+            session.save()
+        self.assertEqual(
+            SessionStore(session.session_key)[REFRESHED_AT_KEY],
+            refreshed_at + settings.ITOU_SESSION_REFRESH_INTERVAL,
+        )
+
+
 class UtilsTemplateTagsTestCase(TestCase):
     def test_url_add_query(self):
         """Test `url_add_query` template tag."""
@@ -337,6 +529,41 @@ class UtilsEmailsTestCase(TestCase):
         self.assertEqual(url, expected)
 
 
+class PermsOrganizationTest(TestCase):
+    def test_get_current_organization(self):
+        siae1 = SiaeWithMembershipFactory()
+        user = siae1.members.first()
+        siae2 = SiaeFactory()
+        siae2.members.add(user)
+
+        factory = RequestFactory()
+        request = factory.get("/")
+        request.user = user
+        middleware = SessionMiddleware()
+        middleware.process_request(request)
+
+        # Built once per request, the first SIAE is selected by default.
+        with self.assertNumQueries(1):
+            current_organization = get_current_organization(request)
+            get_current_organization_and_perms(request)
+            get_user_info(request)
+        self.assertEqual(current_organization.siae, siae1)
+        self.assertEqual(current_organization.user_siae_set, [siae1, siae2])
+        self.assertTrue(current_organization.is_admin)
+        self.assertEqual(
+            request.session[settings.ITOU_SESSION_CURRENT_SIAE_KEY], siae1.pk
+        )
+
+        # An SIAE of the user selected in session.
+        request = factory.get("/")
+        request.user = user
+        middleware.process_request(request)
+        request.session[settings.ITOU_SESSION_CURRENT_SIAE_KEY] = siae2.pk
+        current_organization = get_current_organization(request)
+        self.assertEqual(current_organization.siae, siae2)
+        self.assertFalse(current_organization.is_admin)
+
+
 class PermsUserTest(TestCase):
     def test_get_user_info_for_siae_staff(self):
         siae = SiaeWithMembershipFactory()
@@ -12,7 +12,11 @@ from django_select2.forms import Select2MultipleWidget
 
 from itou.prescribers.models import PrescriberOrganization
 from itou.approvals.models import Approval
-from itou.job_applications.models import JobApplication, JobApplicationWorkflow
+from itou.job_applications.models import (
+    JobApplication,
+    JobApplicationFilterChoice,
+    JobApplicationWorkflow,
+)
 from itou.utils.widgets import DatePickerField
 
 
@@ -368,14 +372,24 @@ class SiaePrescriberFilterJobApplicationsForm(FilterJobApplicationsForm):
         required=False, label=_("Candidat"), widget=Select2MultipleWidget
     )
 
-    def __init__(self, job_applications_qs, *args, **kwargs):
+    def __init__(self, job_applications_qs, *args, filter_choices=None, **kwargs):
+        """
+        `filter_choices` is an optional `JobApplicationFilterChoice` queryset
+        used instead of `job_applications_qs` to build the choices.
+        """
         self.job_applications_qs = job_applications_qs
+        self.filter_choices = filter_choices
         super().__init__(*args, **kwargs)
         self.fields["senders"].choices += self._get_choices_for("sender")
         self.fields["job_seekers"].choices = self._get_choices_for("job_seeker")
 
     def _get_choices_for(self, user_type):
-        users = self.job_applications_qs.get_unique_fk_objects(user_type)
+        if self.filter_choices is not None:
+            users = get_user_model().objects.filter(
+                pk__in=self.filter_choices.object_ids(user_type)
+            )
+        else:
+            users = self.job_applications_qs.get_unique_fk_objects(user_type)
         users = [user for user in users if user.get_full_name()]
         users = [(user.id, user.get_full_name().title()) for user in users]
         return sorted(users, key=lambda l: l[1])
@@ -433,8 +447,10 @@ class SiaeFilterJobApplicationsForm(SiaePrescriberFilterJobApplicationsForm):
         required=False, label=_("Prescripteur"), widget=Select2MultipleWidget
     )
 
-    def __init__(self, job_applications_qs, *args, **kwargs):
-        super().__init__(job_applications_qs, *args, **kwargs)
+    def __init__(self, job_applications_qs, *args, filter_choices=None, **kwargs):
+        super().__init__(
+            job_applications_qs, *args, filter_choices=filter_choices, **kwargs
+        )
         self.fields[
             "sender_organizations"
         ].choices += self.get_sender_organization_choices()
@@ -451,9 +467,16 @@ class SiaeFilterJobApplicationsForm(SiaePrescriberFilterJobApplicationsForm):
         return qs_list
 
     def get_sender_organization_choices(self):
-        sender_orgs = self.job_applications_qs.get_unique_fk_objects(
-            "sender_prescriber_organization"
-        )
+        if self.filter_choices is not None:
+            sender_orgs = PrescriberOrganization.objects.filter(
+                pk__in=self.filter_choices.object_ids(
+                    JobApplicationFilterChoice.KIND_SENDER_PRESCRIBER_ORGANIZATION
+                )
+            )
+        else:
+            sender_orgs = self.job_applications_qs.get_unique_fk_objects(
+                "sender_prescriber_organization"
+            )
         sender_orgs = [sender for sender in sender_orgs if sender.display_name]
         sender_orgs = [
             (sender.id, sender.display_name.title()) for sender in sender_orgs
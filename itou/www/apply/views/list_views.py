@@ -1,11 +1,10 @@
-from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.decorators import user_passes_test
-from django.shortcuts import get_object_or_404, render
+from django.shortcuts import render
 
-from itou.prescribers.models import PrescriberOrganization
-from itou.siaes.models import Siae
-from itou.utils.pagination import pager
+from itou.job_applications.models import JobApplicationFilterChoice
+from itou.utils.pagination import keyset_pager, pager
+from itou.utils.perms.organization import get_current_organization
 from itou.www.apply.forms import (
     FilterJobApplicationsForm,
     PrescriberFilterJobApplicationsForm,
@@ -53,20 +52,20 @@ def list_for_prescriber(request, template_name="apply/list_for_prescriber.html")
     List of applications for a prescriber.
     """
 
-    prescriber_organization = None
-    pk = request.session.get(settings.ITOU_SESSION_CURRENT_PRESCRIBER_ORG_KEY)
-    if pk:
-        queryset = PrescriberOrganization.objects.member_required(request.user)
-        prescriber_organization = get_object_or_404(queryset, pk=pk)
+    prescriber_organization = get_current_organization(request).prescriber_organization
 
+    filter_choices = None
     if prescriber_organization:
         # Show all applications organization-wide.
         job_applications = prescriber_organization.jobapplication_set
+        filter_choices = JobApplicationFilterChoice.objects.filter(
+            prescriber_organization=prescriber_organization
+        )
     else:
         job_applications = request.user.job_applications_sent
 
     filters_form = PrescriberFilterJobApplicationsForm(
-        job_applications, request.GET or None
+        job_applications, request.GET or None, filter_choices=filter_choices
     )
     filters = None
 
@@ -82,8 +81,8 @@ def list_for_prescriber(request, template_name="apply/list_for_prescriber.html")
         "to_siae",
     ).prefetch_related("selected_jobs__appellation")
 
-    job_applications_page = pager(
-        job_applications, request.GET.get("page"), items_per_page=10
+    job_applications_page = keyset_pager(
+        job_applications, request.GET, items_per_page=10
     )
 
     context = {
@@ -100,12 +99,14 @@ def list_for_siae(request, template_name="apply/list_for_siae.html"):
     List of applications for an SIAE.
     """
 
-    pk = request.session[settings.ITOU_SESSION_CURRENT_SIAE_KEY]
-    queryset = Siae.active_objects.member_required(request.user)
-    siae = get_object_or_404(queryset, pk=pk)
+    siae = get_current_organization(request).get_siae_or_404()
     job_applications = siae.job_applications_received
 
-    filters_form = SiaeFilterJobApplicationsForm(job_applications, request.GET or None)
+    filter_choices = JobApplicationFilterChoice.objects.filter(siae=siae)
+
+    filters_form = SiaeFilterJobApplicationsForm(
+        job_applications, request.GET or None, filter_choices=filter_choices
+    )
     filters = None
 
     if filters_form.is_valid():
@@ -119,8 +120,8 @@ def list_for_siae(request, template_name="apply/list_for_siae.html"):
         "sender_prescriber_organization",
         "to_siae",
     ).prefetch_related("selected_jobs__appellation")
-    job_applications_page = pager(
-        job_applications, request.GET.get("page"), items_per_page=10
+    job_applications_page = keyset_pager(
+        job_applications, request.GET, items_per_page=10
     )
 
     context = {
@@ -1,11 +1,10 @@
 import json
 
-from django.contrib.postgres.search import TrigramSimilarity
 from django.http import HttpResponse
 from django.template.defaultfilters import slugify
 
-from itou.cities.models import City
-from itou.jobs.models import Appellation
+from itou.cities.index import get_cities_index
+from itou.jobs.index import autocomplete_appellations
 from itou.utils.swear_words import get_city_swear_words_slugs
 
 
@@ -20,14 +19,8 @@ def cities_autocomplete(request):
 
     if term and slugify(term) not in get_city_swear_words_slugs():
 
-        cities = (
-            City.active_objects.annotate(similarity=TrigramSimilarity("name", term))
-            .filter(similarity__gt=0.1)
-            .order_by("-similarity")
-        )
-        cities = cities[:10]
-
-        cities = [{"value": city.display_name, "slug": city.slug} for city in cities]
+        # Use an in-memory trigram index instead of a `TrigramSimilarity` query.
+        cities = get_cities_index().search(term, limit=10)
 
     return HttpResponse(json.dumps(cities), "application/json")
 
@@ -45,12 +38,12 @@ def jobs_autocomplete(request):
         codes_to_exclude = request.GET.getlist("code", [])
         appellations = [
             {
-                "value": f"{appellation.name} ({appellation.rome.code})",
-                "code": appellation.code,
-                "rome": appellation.rome.code,
-                "name": appellation.name,
+                "value": f"{appellation['name']} ({appellation['rome']})",
+                "code": appellation["code"],
+                "rome": appellation["rome"],
+                "name": appellation["name"],
             }
-            for appellation in Appellation.objects.autocomplete(
+            for appellation in autocomplete_appellations(
                 term, codes_to_exclude, limit=10
             )
         ]
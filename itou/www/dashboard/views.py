@@ -9,8 +9,9 @@ from django.views.decorators.http import require_POST
 
 from allauth.account.views import PasswordChangeView
 
-from itou.job_applications.models import JobApplicationWorkflow
+from itou.job_applications.models import JobApplicationCounter, JobApplicationWorkflow
 from itou.siaes.models import Siae
+from itou.utils.perms.organization import get_current_organization
 from itou.utils.urls import get_safe_url
 from itou.www.dashboard.forms import EditUserInfoForm
 
@@ -20,12 +21,10 @@ def dashboard(request, template_name="dashboard/dashboard.html"):
     job_applications_counter = 0
 
     if request.user.is_siae_staff:
-        pk = request.session[settings.ITOU_SESSION_CURRENT_SIAE_KEY]
-        queryset = Siae.active_objects.member_required(request.user)
-        siae = get_object_or_404(queryset, pk=pk)
-        job_applications_counter = siae.job_applications_received.filter(
-            state=JobApplicationWorkflow.STATE_NEW
-        ).count()
+        siae = get_current_organization(request).get_siae_or_404()
+        job_applications_counter = JobApplicationCounter.objects.get_count(
+            siae, JobApplicationWorkflow.STATE_NEW
+        )
 
     context = {"job_applications_counter": job_applications_counter}
     return render(request, template_name, context)
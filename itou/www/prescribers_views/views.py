@@ -1,13 +1,12 @@
-from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponseRedirect
-from django.shortcuts import get_object_or_404, render
+from django.shortcuts import render
 from django.urls import reverse_lazy
 from django.utils.translation import gettext as _
 
-from itou.prescribers.models import PrescriberOrganization
+from itou.utils.perms.organization import get_current_organization
 from itou.www.prescribers_views.forms import CreatePrescriberOrganizationForm
 from itou.www.prescribers_views.forms import EditPrescriberOrganizationForm
 
@@ -37,9 +36,9 @@ def edit_organization(request, template_name="prescribers/edit_organization.html
     """
     Edit a prescriber organization.
     """
-    pk = request.session[settings.ITOU_SESSION_CURRENT_PRESCRIBER_ORG_KEY]
-    queryset = PrescriberOrganization.objects.member_required(request.user)
-    organization = get_object_or_404(queryset, pk=pk)
+    organization = get_current_organization(
+        request
+    ).get_prescriber_organization_or_404()
 
     form = EditPrescriberOrganizationForm(
         instance=organization, data=request.POST or None
@@ -8,6 +8,7 @@ from django.utils.translation import gettext as _
 
 from itou.jobs.models import Appellation
 from itou.siaes.models import Siae, SiaeJobDescription
+from itou.utils.perms.organization import get_current_organization
 from itou.utils.urls import get_safe_url
 from itou.www.siaes_views.forms import CreateSiaeForm, EditSiaeForm
 
@@ -125,8 +126,7 @@ def create_siae(request, template_name="siaes/create_siae.html"):
     """
     Create a new SIAE (Agence / Etablissement in French).
     """
-    current_siae_pk = request.session.get(settings.ITOU_SESSION_CURRENT_SIAE_KEY)
-    current_siae = request.user.siae_set.get(pk=current_siae_pk)
+    current_siae = get_current_organization(request).siae
     form = CreateSiaeForm(
         current_siae=current_siae,
         data=request.POST or None,
@@ -148,9 +148,7 @@ def edit_siae(request, template_name="siaes/edit_siae.html"):
     """
     Edit an SIAE.
     """
-    pk = request.session[settings.ITOU_SESSION_CURRENT_SIAE_KEY]
-    queryset = Siae.active_objects.member_required(request.user)
-    siae = get_object_or_404(queryset, pk=pk)
+    siae = get_current_organization(request).get_siae_or_404()
 
     form = EditSiaeForm(instance=siae, data=request.POST or None)
 
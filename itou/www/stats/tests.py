@@ -2,6 +2,11 @@ from django.conf import settings
 from django.test import TestCase
 from django.urls import reverse
 
+from itou.job_applications.factories import JobApplicationFactory
+from itou.stats.models import StatsSnapshot
+from itou.stats.utils import compute_stats
+from itou.users.factories import DEFAULT_PASSWORD, UserFactory
+
 
 class StatsViewTest(TestCase):
     def test_stats(self):
@@ -14,3 +19,62 @@ class StatsViewTest(TestCase):
             url = reverse("stats:index")
             response = self.client.post(url, data={"department": department})
             self.assertEqual(response.status_code, 200)
+
+    def test_stats_reads_snapshot(self):
+
+        data = compute_stats()
+        data["total_job_applications"] = 12345
+        StatsSnapshot.store(data)
+
+        url = reverse("stats:index")
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["data"]["total_job_applications"], 12345)
+
+
+class StatsExportViewTest(TestCase):
+    def test_export_requires_staff(self):
+        user = UserFactory()
+        self.client.login(username=user.email, password=DEFAULT_PASSWORD)
+        url = reverse(
+            "stats:export",
+            kwargs={"export_name": "job_applications", "export_format": "csv"},
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_job_applications(self):
+        job_application = JobApplicationFactory(to_siae__department="67")
+        JobApplicationFactory(to_siae__department="93")
+
+        user = UserFactory(is_staff=True)
+        self.client.login(username=user.email, password=DEFAULT_PASSWORD)
+
+        url = reverse(
+            "stats:export",
+            kwargs={"export_name": "job_applications", "export_format": "csv"},
+        )
+        response = self.client.get(url, {"department": "67"})
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        # Header + 1 row.
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f"{job_application.pk},"))
+
+        url = reverse(
+            "stats:export", kwargs={"export_name": "stats", "export_format": "xlsx"}
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # An XLSX file is a ZIP archive.
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"PK"))
+
+    def test_export_unknown(self):
+        user = UserFactory(is_staff=True)
+        self.client.login(username=user.email, password=DEFAULT_PASSWORD)
+        url = reverse(
+            "stats:export", kwargs={"export_name": "users", "export_format": "csv"}
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
@@ -7,4 +7,7 @@ from itou.www.stats import views
 app_name = "stats"
 
 
-urlpatterns = [path("", views.stats, name="index")]
+urlpatterns = [
+    path("", views.stats, name="index"),
+    path("export/<str:export_name>.<str:export_format>", views.export, name="export"),
+]